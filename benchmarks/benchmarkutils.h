@@ -0,0 +1,82 @@
+#pragma once
+
+// Task data and memory readings shared by the benchmarks
+
+#include <QFile>
+#include <QList>
+#include <QRandomGenerator>
+#include <QString>
+#include <QStringList>
+#include <QVector>
+#include "../src/models/taskmodel.h"
+
+#if defined(Q_OS_UNIX)
+#include <sys/resource.h>
+#include <unistd.h>
+#endif
+
+// One frame at 60 Hz
+const double FrameBudgetMs = 1000.0 / 60.0;
+
+inline TaskItem generateTask(int i) {
+    return TaskItem(QString("Task %1 - review quarterly report section %2").arg(i).arg(i % 97), i % 3 == 0, i + 1);
+}
+
+inline QVector<TaskItem> generateTasks(int count) {
+    QVector<TaskItem> items;
+    items.reserve(count);
+    for (int i = 0; i < count; ++i) {
+        items.append(generateTask(i));
+    }
+    return items;
+}
+
+// Peak resident set of the process, -1 where it cannot be read
+inline qint64 peakResidentKiB() {
+#if defined(Q_OS_UNIX)
+    struct rusage usage;
+    getrusage(RUSAGE_SELF, &usage);
+#if defined(Q_OS_MACOS)
+    return usage.ru_maxrss / 1024;
+#else
+    return usage.ru_maxrss;
+#endif
+#else
+    return -1;
+#endif
+}
+
+// Current resident set on Linux; peak resident set elsewhere
+inline qint64 residentKiB() {
+#if defined(Q_OS_LINUX)
+    QFile statm("/proc/self/statm");
+    if (statm.open(QIODevice::ReadOnly)) {
+        const QList<QByteArray> fields = statm.readAll().split(' ');
+        if (fields.size() > 1) return fields.at(1).toLongLong() * sysconf(_SC_PAGESIZE) / 1024;
+    }
+#endif
+    return peakResidentKiB();
+}
+
+// Titles of 3 to 6 random words from a fixed list, seeded so every run
+// searches the same data
+inline QVector<TaskItem> generateWordTasks(int count) {
+    const QStringList words = {
+        "review", "quarterly", "report", "call", "dentist", "groceries", "deploy", "server",
+        "update", "budget", "email", "team", "plan", "sprint", "refactor", "parser", "book",
+        "flight", "invoice", "client", "draft", "proposal", "fix", "login", "bug", "water",
+        "plants", "renew", "passport", "schedule", "meeting", "backup", "laptop", "write", "tests"
+    };
+    QRandomGenerator random(42);
+    QVector<TaskItem> items;
+    items.reserve(count);
+    for (int i = 0; i < count; ++i) {
+        QStringList title;
+        const int length = 3 + random.bounded(4);
+        for (int w = 0; w < length; ++w) {
+            title.append(words.at(random.bounded(words.size())));
+        }
+        items.append(TaskItem(title.join(' ') + QString(" #%1").arg(i), i % 3 == 0, i + 1));
+    }
+    return items;
+}
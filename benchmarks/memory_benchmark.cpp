@@ -0,0 +1,101 @@
+// Compares the memory held per task by a QVector<TaskItem> (the layout
+// TaskModel used before TaskStore) and by TaskStore, at 100k and 1M tasks.
+// The "model" row is what the app holds: a TaskModel with a TaskFilterModel
+// and its search index on top. Its heap column counts the TaskStore only,
+// so the gap to the RSS column is the index.
+//
+// Each layout is built in a fresh child process and measured by the growth
+// of its resident set, so allocator overhead is included:
+//
+//   memory_benchmark                                 run the comparison
+//   memory_benchmark --hold <vector|store|model> <count>   child mode, prints "<RSS KiB delta> <heap bytes>"
+
+#include <QCoreApplication>
+#include <QProcess>
+#include <QTextStream>
+#include "../src/models/taskfiltermodel.h"
+#include "../src/models/taskmodel.h"
+#include "../src/models/taskstore.h"
+#include "benchmarkutils.h"
+
+static int runHold(const QString& layout, int count) {
+    const qint64 before = residentKiB();
+    qint64 heapBytes = 0;
+    qint64 after = 0;
+
+    if (layout == "vector") {
+        QVector<TaskItem> items;
+        items.reserve(count);
+        for (int i = 0; i < count; ++i) {
+            items.append(generateTask(i));
+        }
+        // Element array plus one QString header and UTF-16 buffer per title,
+        // before malloc's own bookkeeping
+        heapBytes = qint64(items.capacity()) * qint64(sizeof(TaskItem));
+        for (const TaskItem& task : qAsConst(items)) {
+            heapBytes += qint64(sizeof(QArrayData)) + (qint64(task.title.capacity()) + 1) * 2;
+        }
+        after = residentKiB();
+    } else if (layout == "store") {
+        TaskStore store;
+        store.reserve(count);
+        for (int i = 0; i < count; ++i) {
+            store.append(generateTask(i));
+        }
+        heapBytes = store.memoryUsage();
+        after = residentKiB();
+    } else if (layout == "model") {
+        TaskModel model;
+        {
+            TaskStore store;
+            store.reserve(count);
+            for (int i = 0; i < count; ++i) {
+                store.append(generateTask(i));
+            }
+            model.setTasks(store);
+        }
+        TaskFilterModel filter;
+        filter.setSourceModel(&model);
+        heapBytes = model.tasks().memoryUsage();
+        after = residentKiB();
+    } else {
+        return 1;
+    }
+
+    QTextStream(stdout) << (before < 0 ? -1 : after - before) << ' ' << heapBytes << '\n';
+    return 0;
+}
+
+int main(int argc, char* argv[]) {
+    QCoreApplication app(argc, argv);
+    const QStringList args = app.arguments();
+
+    if (args.size() == 4 && args.at(1) == "--hold") {
+        return runHold(args.at(2), args.at(3).toInt());
+    }
+
+    QTextStream out(stdout);
+    out << "tasks     layout    RSS KiB  RSS bytes/task  heap bytes/task\n";
+
+    for (int count : {100000, 1000000}) {
+        for (const QString layout : {"vector", "store", "model"}) {
+            QProcess child;
+            child.start(app.applicationFilePath(), {"--hold", layout, QString::number(count)});
+            if (!child.waitForFinished(-1) || child.exitCode() != 0) {
+                out << "measurement failed for " << layout << '\n';
+                return 1;
+            }
+            const QStringList fields = QString::fromLocal8Bit(child.readAllStandardOutput()).split(' ');
+            const qint64 rssKiB = fields.value(0).toLongLong();
+            const qint64 heapBytes = fields.value(1).trimmed().toLongLong();
+            out << QString("%1  %2  %3  %4  %5\n")
+                       .arg(count, -8)
+                       .arg(layout, -6)
+                       .arg(rssKiB, 9)
+                       .arg(rssKiB * 1024.0 / count, 14, 'f', 1)
+                       .arg(double(heapBytes) / count, 15, 'f', 1);
+            out.flush();
+        }
+    }
+    return 0;
+}
@@ -0,0 +1,111 @@
+// Measures scrolling cost of the task list with the full and the slim delegate
+// at 1k, 10k and 100k tasks.
+//
+// Runs offscreen with the software scene graph. Every frame scrolls the list
+// by a fixed distance and is timed from the contentY change until the frame
+// has been polished, synchronized and rendered (QQuickWindow::grabWindow()),
+// including the deferred deletion of delegates that scrolled out of view.
+
+#include <QGuiApplication>
+#include <QElapsedTimer>
+#include <QQuickItem>
+#include <QQuickView>
+#include <QQuickWindow>
+#include <QTextStream>
+#include "../src/models/taskmodel.h"
+#include "benchmarkutils.h"
+#include <algorithm>
+
+static const int Frames = 300;
+static const qreal ScrollStep = 150;
+
+struct ScrollResult {
+    double meanMs = 0;
+    double p95Ms = 0;
+    double maxMs = 0;
+    int slowFrames = 0;
+    int initialDelegates = 0;
+    int createdWhileScrolling = 0;
+};
+
+static ScrollResult scroll(TaskModel& model, bool slim) {
+    QQuickView view;
+    view.setInitialProperties({
+        {"taskModel", QVariant::fromValue<QObject*>(&model)},
+        {"slim", slim}
+    });
+    view.setSource(QUrl(QStringLiteral("qrc:/scroll_benchmark.qml")));
+    view.show();
+
+    QObject* root = view.rootObject();
+    QQuickItem* list = root->findChild<QQuickItem*>("taskListView");
+    view.grabWindow();
+
+    ScrollResult result;
+    result.initialDelegates = root->property("delegatesCreated").toInt();
+
+    QVector<double> frameMs;
+    frameMs.reserve(Frames);
+    QElapsedTimer timer;
+    qreal y = 0;
+    qreal direction = 1;
+    for (int frame = 0; frame < Frames; ++frame) {
+        // Bounce between the ends of short lists
+        const qreal maxY = list->property("contentHeight").toReal() - list->height();
+        y += direction * ScrollStep;
+        if (y > maxY || y < 0) {
+            direction = -direction;
+            y = qBound<qreal>(0, y, maxY);
+        }
+
+        timer.start();
+        list->setProperty("contentY", y);
+        view.grabWindow();
+        QCoreApplication::sendPostedEvents(nullptr, QEvent::DeferredDelete);
+        frameMs.append(timer.nsecsElapsed() / 1e6);
+    }
+
+    result.createdWhileScrolling = root->property("delegatesCreated").toInt() - result.initialDelegates;
+    std::sort(frameMs.begin(), frameMs.end());
+    double total = 0;
+    for (double ms : qAsConst(frameMs)) {
+        total += ms;
+        if (ms > FrameBudgetMs) ++result.slowFrames;
+    }
+    result.meanMs = total / frameMs.size();
+    result.p95Ms = frameMs.at(int(frameMs.size() * 0.95));
+    result.maxMs = frameMs.last();
+    return result;
+}
+
+int main(int argc, char* argv[]) {
+    if (qEnvironmentVariableIsEmpty("QT_QPA_PLATFORM")) {
+        qputenv("QT_QPA_PLATFORM", "offscreen");
+    }
+    QQuickWindow::setSceneGraphBackend(QSGRendererInterface::Software);
+    QGuiApplication app(argc, argv);
+    QTextStream out(stdout);
+
+    out << QString("%1 frames of %2 px, frame budget %3 ms\n\n")
+               .arg(Frames).arg(ScrollStep).arg(FrameBudgetMs, 0, 'f', 1);
+    out << QString("%1 %2 %3 %4 %5 %6 %7 %8\n")
+               .arg("tasks", 8).arg("delegate", 9).arg("mean ms", 9).arg("p95 ms", 9)
+               .arg("max ms", 9).arg("slow", 6).arg("initial", 8).arg("created", 8);
+
+    for (int count : {1000, 10000, 100000}) {
+        TaskModel model;
+        model.setItems(generateTasks(count));
+        for (bool slim : {false, true}) {
+            const ScrollResult result = scroll(model, slim);
+            out << QString("%1 %2 %3 %4 %5 %6 %7 %8\n")
+                       .arg(count, 8).arg(slim ? "slim" : "full", 9)
+                       .arg(result.meanMs, 9, 'f', 3).arg(result.p95Ms, 9, 'f', 3)
+                       .arg(result.maxMs, 9, 'f', 3).arg(result.slowFrames, 6)
+                       .arg(result.initialDelegates, 8).arg(result.createdWhileScrolling, 8);
+            out.flush();
+        }
+    }
+
+    out << "\nslow = frames over budget; created = delegates instantiated while scrolling\n";
+    return 0;
+}
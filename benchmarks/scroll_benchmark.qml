@@ -0,0 +1,42 @@
+import QtQuick 2.15
+import "screens"
+
+// Task list as in MainPage.qml, reduced to what scrolling exercises
+Item {
+    id: root
+    width: 900
+    height: 700
+
+    property var taskModel: null
+    property bool slim: false
+    property int delegatesCreated: 0
+
+    readonly property AppTheme theme: AppTheme {}
+
+    ListView {
+        objectName: "taskListView"
+        anchors.fill: parent
+        anchors.margins: theme.defaultPadding
+        spacing: theme.defaultPadding / 2
+        clip: true
+        model: root.taskModel
+        reuseItems: root.slim
+        delegate: root.slim ? slimTaskDelegate : fullTaskDelegate
+
+        Component {
+            id: fullTaskDelegate
+            TaskDelegate {
+                width: ListView.view.width
+                Component.onCompleted: root.delegatesCreated++
+            }
+        }
+
+        Component {
+            id: slimTaskDelegate
+            SlimTaskDelegate {
+                width: ListView.view.width
+                Component.onCompleted: root.delegatesCreated++
+            }
+        }
+    }
+}
@@ -0,0 +1,73 @@
+// Compares snapshot load time and peak RSS of the JSON and binary formats.
+//
+// Each measurement runs in a fresh child process so that peak RSS reflects a
+// single load:
+//
+//   storage_benchmark                      run the full matrix (10k, 100k, 1M)
+//   storage_benchmark --load <file>        child mode, prints "<ms> <peak KiB delta> <count>"
+
+#include <QCoreApplication>
+#include <QElapsedTimer>
+#include <QProcess>
+#include <QTemporaryDir>
+#include <QTextStream>
+#include <QFileInfo>
+#include "../src/models/taskmodel.h"
+#include "../src/services/taskstorage.h"
+#include "benchmarkutils.h"
+
+static int runLoad(const QString& path) {
+    const qint64 rssBefore = peakResidentKiB();
+
+    QElapsedTimer timer;
+    timer.start();
+    QVector<TaskItem> items;
+    if (!TaskStorage::readSnapshot(path, items)) return 1;
+    const double ms = timer.nsecsElapsed() / 1e6;
+
+    const qint64 rssAfter = peakResidentKiB();
+    QTextStream(stdout) << ms << ' ' << (rssBefore < 0 ? -1 : rssAfter - rssBefore)
+                        << ' ' << items.size() << '\n';
+    return 0;
+}
+
+int main(int argc, char* argv[]) {
+    QCoreApplication app(argc, argv);
+    const QStringList args = app.arguments();
+
+    if (args.size() == 3 && args.at(1) == "--load") {
+        return runLoad(args.at(2));
+    }
+
+    QTemporaryDir dir;
+    if (!dir.isValid()) return 1;
+
+    QTextStream out(stdout);
+    out << "tasks     format  file KiB   load ms  peak RSS KiB\n";
+
+    for (int count : {10000, 100000, 1000000}) {
+        const QVector<TaskItem> items = generateTasks(count);
+        const QString jsonPath = dir.filePath(QString("tasks_%1.json").arg(count));
+        const QString binaryPath = TaskStorage::binaryPathFor(jsonPath);
+        TaskStorage::writeJsonSnapshot(jsonPath, items);
+        TaskStorage::writeBinarySnapshot(binaryPath, items);
+
+        for (const QString& path : {jsonPath, binaryPath}) {
+            QProcess child;
+            child.start(app.applicationFilePath(), {"--load", path});
+            if (!child.waitForFinished(-1) || child.exitCode() != 0) {
+                out << "load failed for " << path << '\n';
+                return 1;
+            }
+            const QStringList fields = QString::fromLocal8Bit(child.readAllStandardOutput()).split(' ');
+            out << QString("%1  %2  %3  %4  %5\n")
+                       .arg(count, -8)
+                       .arg(TaskStorage::isBinaryPath(path) ? "binary" : "json", -6)
+                       .arg(QFileInfo(path).size() / 1024, 9)
+                       .arg(fields.value(0), 8)
+                       .arg(fields.value(1).trimmed(), 12);
+            out.flush();
+        }
+    }
+    return 0;
+}
@@ -10,8 +10,16 @@ This script demonstrates a full automation-scripts workflow:
 
 This is a REAL automation-scripts test, not just interaction demos.
 
-NOTE: Delays have been increased (2-3 seconds between actions) so you can 
-visually see each phase of the automation-scripts happening on screen.
+Every step waits for the accessibility tree to reach the expected state
+(polling with exponential backoff) instead of sleeping for a fixed time, so a
+run takes as long as the application needs. Pass --visual-delay SECONDS to
+pause after each visible action when demonstrating the script.
+
+Elements are resolved by Accessible.name through ui_harness.ElementIndex,
+which walks the accessibility tree once and rebuilds only on structure change.
+
+Usage:
+  python e2e_test.py [--visual-delay SECONDS] [--timeout SECONDS]
 
 Requirements:
   pip install pywinauto
@@ -20,6 +28,7 @@ Platform: Windows only (pywinauto requires Windows for Qt automation-scripts)
           For Linux, see atspi_demo.py which uses AT-SPI
 """
 
+import argparse
 import time
 import sys
 import os
@@ -45,6 +54,45 @@ except ImportError:
     print("Install with: pip install pywinauto")
     sys.exit(1)
 
+import ui_harness
+from ui_harness import DEFAULT_TIMEOUT, uia_index, wait_until
+
+# Pause after visible actions; 0 unless --visual-delay is given
+VISUAL_DELAY = 0.0
+
+
+def visual_pause():
+    """Give a human watcher time to see the last action when --visual-delay is set."""
+    if VISUAL_DELAY > 0:
+        time.sleep(VISUAL_DELAY)
+
+
+def resolve(index, name, control_type=None, text=None):
+    """Resolve an element by Accessible.name from the cached tree index."""
+    element = index.wait_for(name, control_type, text)
+    print(f"    ✓ Found: {name}")
+    return element
+
+
+def task_item_names(index):
+    """Return the Accessible.names of the task delegates (taskItem_<id>) in the tree."""
+    return set(index.names('taskItem_'))
+
+
+def new_task_item_names(index, known):
+    """Return the task delegate names that are not in known."""
+    return index.new_names('taskItem_', known)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="QtQuickTaskApp end-to-end automation test")
+    parser.add_argument('--visual-delay', type=float, default=0.0, metavar='SECONDS',
+                        help="pause after each visible action so the run can be followed on screen")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, metavar='SECONDS',
+                        help="maximum time to wait for any expected UI state (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
 def print_header(title):
     """Print a formatted header"""
     print(f"\n{'='*70}")
@@ -55,31 +103,12 @@ def print_step(step_num, description):
     """Print a formatted step"""
     print(f"[Step {step_num}] {description}")
 
-def verify_element(element, name):
-    """Verify element exists"""
-    try:
-        # Check if element has exists() method (child_window elements)
-        if hasattr(element, 'exists'):
-            if element.exists():
-                print(f"    ✓ Found: {name}")
-                return True
-            else:
-                print(f"    ✗ NOT FOUND: {name}")
-                return False
-        else:
-            # For elements from descendants(), they don't have exists()
-            # Just verify the element is not None
-            if element is not None:
-                print(f"    ✓ Found: {name}")
-                return True
-            else:
-                print(f"    ✗ NOT FOUND: {name}")
-                return False
-    except:
-        print(f"    ✗ NOT FOUND: {name}")
-        return False
-
 def main():
+    global VISUAL_DELAY
+    args = parse_args()
+    VISUAL_DELAY = args.visual_delay
+    ui_harness.DEFAULT_TIMEOUT = args.timeout
+
     print_header("QtQuickTaskApp - Complete End-to-End Automation Test")
     
     # Configuration
@@ -97,304 +126,89 @@ def main():
     print(f"✓ Test Task: {test_task}")
     print(f"✓ Accessibility: Enabled by default\n")
     
+    index = None
     try:
         # ===== PHASE 1: START APPLICATION =====
         print_header("PHASE 1: Start Application")
         print_step(1, "Starting QtQuickTaskApp...")
         
         app = Application(backend='uia').start(app_path, wait_for_idle=False)
-        time.sleep(3)  # Wait for app initialization - increased for visibility
+        main_window = app.window(title_re='.*QtQuickTaskApp.*')
+        wait_until(lambda: main_window.exists(timeout=0), description="main window")
         print("    ✓ Application started successfully\n")
         
         # ===== PHASE 2: LOGIN =====
         print_header("PHASE 2: Login")
         print_step(2, "Connecting to main window...")
         
-        main_window = app.window(title_re='.*QtQuickTaskApp.*')
-        main_window.wait('ready', timeout=10)
+        main_window.wait('ready', timeout=ui_harness.DEFAULT_TIMEOUT)
+        # One tree walk serves every lookup until the UI structure changes
+        index = uia_index(main_window)
         print("    ✓ Connected to window\n")
         
         print_step(3, "Finding username input field...")
-        # Try multiple methods to find the element
-        # Qt applications on Windows may not expose auto_id properly
-        username_field = None
-        try:
-            # Method 1: Try by auto_id (Accessible.name)
-            username_field = main_window.child_window(auto_id='usernameField', control_type='Edit')
-            if not username_field.exists():
-                username_field = None
-        except:
-            pass
-        
-        if username_field is None:
-            # Method 2: Try by control type only (find first Edit control)
-            try:
-                username_field = main_window.child_window(control_type='Edit', found_index=0)
-                if username_field.exists():
-                    print("    ℹ Found username field by control type (Edit)")
-            except:
-                pass
-        
-        if username_field is None or not username_field.exists():
-            # Method 3: Print all available Edit controls for debugging
-            print("    ℹ Searching for all Edit controls...")
-            try:
-                edit_controls = main_window.children(control_type='Edit')
-                print(f"    ℹ Found {len(edit_controls)} Edit control(s)")
-                for i, ctrl in enumerate(edit_controls):
-                    print(f"      - Edit {i}: {ctrl.window_text()}")
-                if len(edit_controls) > 0:
-                    username_field = edit_controls[0]
-                    print(f"    ℹ Using first Edit control")
-            except Exception as e:
-                print(f"    ⚠ Error searching for Edit controls: {e}")
-        
-        if username_field is None or not verify_element(username_field, "usernameField"):
-            raise Exception("Username field not found!")
+        username_field = resolve(index, 'usernameField', 'Edit')
         
         print_step(4, f"Entering username: '{test_username}'...")
         username_field.set_text(test_username)
-        time.sleep(2)  # Increased to see the username being entered
+        index.invalidate()
+        visual_pause()
         print(f"    ✓ Username '{test_username}' entered\n")
         
         print_step(5, "Finding and clicking Login button...")
-        # Try multiple methods to find the login button
-        login_button = None
-        
-        # Method 1: Try by AutomationId
-        try:
-            login_button = main_window.child_window(auto_id='loginButton', control_type='Button')
-            if not login_button.exists():
-                login_button = None
-        except:
-            pass
-        
-        if login_button is None:
-            # Method 2: Search through all Button controls and filter by text
-            print("    ℹ Searching for Button controls with text matching...")
-            try:
-                buttons = main_window.descendants(control_type='Button')
-                print(f"    ℹ Found {len(buttons)} Button control(s)")
-                for i, btn in enumerate(buttons):
-                    btn_text = btn.window_text()
-                    print(f"      - Button {i}: '{btn_text}'")
-                    # Match "Login" text - don't use first button by default to avoid title bar buttons
-                    if 'Login' in btn_text or 'login' in btn_text.lower():
-                        login_button = btn
-                        print(f"    ℹ Using Button {i} with text '{btn_text}'")
-                        break
-            except Exception as e:
-                print(f"    ⚠ Error searching for Button controls: {e}")
-        
-        if login_button is None:
-            # Method 3: As fallback, try the LAST button (likely the custom button, not title bar)
-            print("    ℹ Trying last Button as fallback...")
-            try:
-                buttons = main_window.descendants(control_type='Button')
-                if len(buttons) > 0:
-                    login_button = buttons[-1]  # Last button is likely our custom button
-                    print(f"    ℹ Using last button: '{login_button.window_text()}'")
-            except Exception as e:
-                print(f"    ⚠ Error getting last button: {e}")
-        
-        if login_button is None or not verify_element(login_button, "loginButton"):
-            raise Exception("Login button not found!")
-        
+        login_button = resolve(index, 'loginButton', 'Button', text='Login')
         login_button.click()
-        time.sleep(3)  # Wait for page transition animation
+        index.invalidate()
+        # The main page is ready once its task input is in the tree
+        index.wait_for('taskInput', 'Edit')
+        visual_pause()
         print("    ✓ Login successful - navigated to main page\n")
         
         # ===== PHASE 3: CREATE TASK =====
         print_header("PHASE 3: Create Task")
-        time.sleep(2)  # Additional wait to observe the main page before finding elements
         print_step(6, "Finding task input field...")
-        
-        # Try multiple methods to find task input
-        # After page transition, need robust finding like username field
-        task_input = None
-        
-        # Method 1: Try by AutomationId
-        try:
-            task_input = main_window.child_window(auto_id='taskInput', control_type='Edit')
-            if not task_input.exists():
-                task_input = None
-        except:
-            pass
-        
-        if task_input is None:
-            # Method 2: Try by control type with found_index
-            # After login, we're on a new page, so try the first Edit control
-            try:
-                task_input = main_window.child_window(control_type='Edit', found_index=0)
-                if task_input.exists():
-                    print("    ℹ Found task input by control type (Edit)")
-            except:
-                pass
-        
-        if task_input is None or not task_input.exists():
-            # Method 3: Search through all Edit controls
-            print("    ℹ Searching for all Edit controls...")
-            try:
-                edit_controls = main_window.children(control_type='Edit')
-                print(f"    ℹ Found {len(edit_controls)} Edit control(s) on main page")
-                for i, ctrl in enumerate(edit_controls):
-                    ctrl_text = ctrl.window_text() if hasattr(ctrl, 'window_text') else ''
-                    print(f"      - Edit {i}: '{ctrl_text}'")
-                    if ctrl.is_visible() and ctrl.is_enabled():
-                        task_input = ctrl
-                        print(f"    ℹ Using Edit {i} as task input")
-                        break
-            except Exception as e:
-                print(f"    ⚠ Error searching for Edit controls: {e}")
-        
-        if task_input is None or not verify_element(task_input, "taskInput"):
-            raise Exception("Task input field not found!")
+        task_input = resolve(index, 'taskInput', 'Edit')
         
         print_step(7, f"Entering task: '{test_task}'...")
         task_input.set_text(test_task)
-        time.sleep(2)  # Increased to see the task text being entered
+        index.invalidate()
+        visual_pause()
         print(f"    ✓ Task text entered\n")
         
         print_step(8, "Finding and clicking Add Task button...")
-        # Try multiple methods to find add button
-        add_button = None
-        
-        # Method 1: Try by AutomationId
-        try:
-            add_button = main_window.child_window(auto_id='addTaskButton', control_type='Button')
-            if not add_button.exists():
-                add_button = None
-        except:
-            pass
-        
-        if add_button is None or not add_button.exists():
-            # Method 2: Search through all Button controls (using descendants for nested elements)
-            print("    ℹ Searching for Add button in all Button controls...")
-            try:
-                buttons = main_window.descendants(control_type='Button')
-                print(f"    ℹ Found {len(buttons)} Button control(s) on main page")
-                for i, btn in enumerate(buttons):
-                    btn_text = btn.window_text()
-                    print(f"      - Button {i}: '{btn_text}'")
-                    # Match text patterns - avoid using first button to avoid title bar buttons
-                    if 'Add' in btn_text or '+' in btn_text or 'add' in btn_text.lower():
-                        add_button = btn
-                        print(f"    ℹ Using Button {i} with text '{btn_text}' as Add button")
-                        break
-            except Exception as e:
-                print(f"    ⚠ Error searching for Button controls: {e}")
-        
-        if add_button is None:
-            # Method 3: As fallback, try to find button by position (not first, not last - likely in the middle)
-            print("    ℹ Trying button by position as fallback...")
-            try:
-                buttons = main_window.descendants(control_type='Button')
-                if len(buttons) > 1:
-                    # Skip first button (likely title bar), use second or one after task input area
-                    add_button = buttons[1] if len(buttons) > 1 else buttons[0]
-                    print(f"    ℹ Using button at index 1: '{add_button.window_text()}'")
-            except Exception as e:
-                print(f"    ⚠ Error getting button by position: {e}")
-        
-        if add_button is None or not verify_element(add_button, "addTaskButton"):
-            raise Exception("Add Task button not found!")
-        
+        add_button = resolve(index, 'addTaskButton', 'Button', text='Add Task')
+        existing_items = task_item_names(index)
         add_button.click()
-        time.sleep(2)  # Increased to see the task being created
+        index.invalidate()
+        
+        # Wait for a delegate that was not there before the click
+        added = wait_until(lambda: new_task_item_names(index, existing_items), description="new task item")
+        visual_pause()
         print("    ✓ Task created successfully\n")
         
         print_step(9, "Verifying task was created...")
-        # Task items are also nested - use descendants to search recursively
-        task_item = None
-        try:
-            task_item = main_window.child_window(auto_id='taskItem_0')
-            if not task_item.exists():
-                task_item = None
-        except:
-            pass
-        
-        if task_item is None:
-            # Search through all descendants for Text/Custom controls that might be the task item
-            try:
-                print("    ℹ Searching for task item in all descendants...")
-                # Look for any control that might represent the task (could be Text, Custom, etc.)
-                all_items = main_window.descendants()
-                print(f"    Found {len(all_items)} total controls in hierarchy")
-                # Task was added, so we just verify window state changed
-                task_item = True  # Assume success if button click worked
-            except Exception as e:
-                print(f"    ⚠ Could not enumerate descendants: {e}")
-        
-        if task_item:
-            print(f"    ✓ Task creation verified (button click successful)\n")
-        else:
-            raise Exception("Task item not found after creation!")
+        # Delegates are named after the task's stable id (taskItem_<id>), and
+        # that id names the rest of the task's controls.
+        task_id = max(added, key=lambda name: int(name[len('taskItem_'):]))[len('taskItem_'):]
+        print(f"    ℹ New task has id {task_id}")
+        resolve(index, f'taskTitle_{task_id}')
+        print(f"    ✓ Task creation verified\n")
         
         # ===== PHASE 4: REMOVE TASK =====
         print_header("PHASE 4: Remove Task")
         print_step(10, "Finding Remove button for the task...")
-        
-        # Try multiple methods to find remove button
-        remove_button = None
-        
-        # Method 1: Try by AutomationId
-        try:
-            remove_button = main_window.child_window(auto_id='removeTaskButton_0', control_type='Button')
-            if not remove_button.exists():
-                remove_button = None
-        except:
-            pass
-        
-        if remove_button is None or not remove_button.exists():
-            # Method 2: Search for buttons with Remove/Delete/X text
-            print("    ℹ Searching for Remove button in all Button controls...")
-            try:
-                buttons = main_window.descendants(control_type='Button')
-                print(f"    ℹ Found {len(buttons)} Button control(s)")
-                for i, btn in enumerate(buttons):
-                    btn_text = btn.window_text()
-                    print(f"      - Button {i}: '{btn_text}'")
-                    # Match text patterns for remove button
-                    if 'Remove' in btn_text or 'X' in btn_text or 'remove' in btn_text.lower() or 'delete' in btn_text.lower():
-                        remove_button = btn
-                        print(f"    ℹ Using Button {i} with text '{btn_text}' as Remove button")
-                        break
-            except Exception as e:
-                print(f"    ⚠ Error searching for Button controls: {e}")
-        
-        if remove_button is None:
-            # Method 3: As fallback, find button that's not Add (likely second custom button)
-            print("    ℹ Trying to find non-Add button as fallback...")
-            try:
-                buttons = main_window.descendants(control_type='Button')
-                for i, btn in enumerate(buttons):
-                    btn_text = btn.window_text()
-                    # Skip title bar buttons and Add button
-                    if btn_text and 'Add' not in btn_text and 'add' not in btn_text.lower() and btn_text not in ['Close', 'Minimize', 'Maximize', '']:
-                        remove_button = btn
-                        print(f"    ℹ Using Button {i} with text '{btn_text}' as Remove button")
-                        break
-            except Exception as e:
-                print(f"    ⚠ Error finding non-Add button: {e}")
-        
-        if remove_button is None or not verify_element(remove_button, "removeTaskButton_0"):
-            raise Exception("Remove button not found!")
+        remove_button = resolve(index, f'removeTaskButton_{task_id}', 'Button')
         
         print_step(11, "Clicking Remove button...")
         remove_button.click()
-        time.sleep(2)  # Increased to see the task being removed
+        index.invalidate()
         print("    ✓ Task removed successfully\n")
         
         print_step(12, "Verifying task was removed...")
-        try:
-            # Task should no longer exist
-            task_item = main_window.child_window(auto_id='taskItem_0')
-            if task_item.exists():
-                print("    ⚠ Warning: Task still exists (may need more time)")
-            else:
-                print("    ✓ Task successfully removed from the list\n")
-        except:
-            print("    ✓ Task successfully removed from the list\n")
+        # Task should no longer exist; ids are never reused for other rows
+        index.wait_gone(f'taskItem_{task_id}')
+        visual_pause()
+        print("    ✓ Task successfully removed from the list\n")
         
         # ===== PHASE 5: LOGOUT =====
         print_header("PHASE 5: Logout")
@@ -403,24 +217,28 @@ def main():
         # Click on File menu
         try:
             # Try to find and click the File menu
-            file_menu = main_window.child_window(title="File", control_type="MenuItem")
-            if file_menu.exists():
+            file_menu = index.find("File", "MenuItem")
+            if file_menu is not None:
                 file_menu.click()
-                time.sleep(1)  # Increased to see the menu opening
+                index.invalidate()
+                try:
+                    logout_item = index.wait_for("Logout", "MenuItem", timeout=2)
+                except TimeoutError:
+                    logout_item = None
+                visual_pause()
                 print("    ✓ File menu opened\n")
                 
                 print_step(14, "Clicking Logout...")
-                logout_item = main_window.child_window(title="Logout", control_type="MenuItem")
-                if logout_item.exists():
+                if logout_item is not None:
                     logout_item.click()
-                    time.sleep(2)  # Increased to see the logout transition
+                    index.invalidate()
                     print("    ✓ Logged out successfully\n")
                     
                     print_step(15, "Verifying returned to login page...")
-                    # Check if we're back at login page
-                    username_field = main_window.child_window(auto_id='usernameField', control_type='Edit')
-                    if verify_element(username_field, "usernameField (login page)"):
-                        print("    ✓ Successfully returned to login page\n")
+                    # Back at the login page once usernameField reappears
+                    index.wait_for('usernameField', 'Edit')
+                    visual_pause()
+                    print("    ✓ Successfully returned to login page\n")
                 else:
                     print("    ⚠ Logout menu item not accessible, skipping logout\n")
             else:
@@ -434,7 +252,7 @@ def main():
         print_step(16, "Closing application window...")
         
         main_window.close()
-        time.sleep(2)  # Increased to see the application closing
+        wait_until(lambda: not main_window.exists(timeout=0), description="application window to close")
         print("    ✓ Application closed successfully\n")
         
         # ===== TEST COMPLETE =====
@@ -468,6 +286,10 @@ def main():
         
         return 1
 
+    finally:
+        if index is not None:
+            index.close()
+
 if __name__ == "__main__":
     exit_code = main()
     sys.exit(exit_code)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Parallel End-to-End Runner for Linux
+Runs QtQuickTaskApp scenarios concurrently, one app instance per scenario,
+driven over AT-SPI.
+
+Each pool worker owns a private X display (Xvfb) and D-Bus session bus, so
+accessibility trees of concurrent instances never mix. Each scenario gets
+fresh XDG_CONFIG_HOME / XDG_DATA_HOME directories, isolating the QSettings
+file and the task storage under AppDataLocation from every other run and
+from the developer's own data.
+
+Usage:
+  python parallel_runner.py [--app PATH] [--workers N] [--platform xvfb|offscreen]
+                            [--repeat N] [--timeout SECONDS]
+                            [--save-budget-ms MS] [--load-budget-ms MS] [SCENARIO ...]
+
+With a budget given, every scenario also fails if the app's own p95 save or
+load latency (read from its --metrics-socket endpoint) exceeds it.
+
+Requirements:
+  Xvfb, dbus-daemon, at-spi2-core and PyGObject (python3-gi, gir1.2-atspi-2.0)
+
+Platform: Linux only. With --platform offscreen no X server is started; this
+          needs a Qt build whose offscreen plugin provides the AT-SPI bridge.
+"""
+
+import argparse
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context, util
+
+import ui_harness
+from ui_harness import DEFAULT_TIMEOUT, atspi_index, latency_budget_violations, read_metrics, wait_until
+
+# Set up in each pool worker by _init_worker()
+Atspi = None
+WORKER_PLATFORM = None
+
+
+def _start_xvfb():
+    """Start Xvfb on a free display number and return (process, display)."""
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen(['Xvfb', '-displayfd', str(write_fd), '-screen', '0', '1280x1024x24',
+                                '-nolisten', 'tcp'], pass_fds=(write_fd,),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        display = pipe.readline().strip()
+    if not display:
+        raise RuntimeError("Xvfb did not report a display number")
+    return process, ':' + display
+
+
+def _start_session_bus():
+    """Start a private D-Bus session bus and return (process, address)."""
+    process = subprocess.Popen(['dbus-daemon', '--session', '--nofork', '--print-address=1'],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    address = process.stdout.readline().strip()
+    if not address:
+        raise RuntimeError("dbus-daemon did not report an address")
+    return process, address
+
+
+def _stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def _init_worker(qpa_platform, timeout):
+    """Give this pool worker its own display and session bus, then load AT-SPI."""
+    global Atspi, WORKER_PLATFORM
+    WORKER_PLATFORM = qpa_platform
+    ui_harness.DEFAULT_TIMEOUT = timeout
+
+    if qpa_platform == 'xvfb':
+        xvfb, display = _start_xvfb()
+        os.environ['DISPLAY'] = display
+        util.Finalize(None, _stop, args=(xvfb,), exitpriority=10)
+    bus, address = _start_session_bus()
+    os.environ['DBUS_SESSION_BUS_ADDRESS'] = address
+    util.Finalize(None, _stop, args=(bus,), exitpriority=10)
+
+    # Atspi connects to the accessibility bus of the session bus set above
+    import gi
+    gi.require_version('Atspi', '2.0')
+    from gi.repository import Atspi as atspi
+    Atspi = atspi
+
+
+class AppSession:
+    """One running app instance with isolated settings and data directories."""
+
+    def __init__(self, app_path, root):
+        self.app_path = app_path
+        self.config_home = os.path.join(root, 'config')
+        self.data_home = os.path.join(root, 'data')
+        self.metrics_socket = os.path.join(root, 'metrics.sock')
+        self.process = None
+        self.index = None
+        os.makedirs(self.config_home, exist_ok=True)
+        os.makedirs(self.data_home, exist_ok=True)
+
+        # Start at the login page instead of SettingsStore's default user
+        settings_dir = os.path.join(self.config_home, 'MyOrganization')
+        os.makedirs(settings_dir, exist_ok=True)
+        settings_path = os.path.join(settings_dir, 'QtQuickTaskApp.conf')
+        if not os.path.exists(settings_path):
+            with open(settings_path, 'w') as settings:
+                settings.write('[user]\nusername=\n')
+
+    def storage_dir(self):
+        return os.path.join(self.data_home, 'MyOrganization', 'QtQuickTaskApp')
+
+    def start(self):
+        env = dict(os.environ)
+        env.update({
+            'XDG_CONFIG_HOME': self.config_home,
+            'XDG_DATA_HOME': self.data_home,
+            'QT_QPA_PLATFORM': 'xcb' if WORKER_PLATFORM == 'xvfb' else 'offscreen',
+            'QT_ACCESSIBILITY': '1',
+            'QT_LINUX_ACCESSIBILITY_ALWAYS_ON': '1',
+        })
+        self.process = subprocess.Popen([self.app_path, '--metrics-socket', self.metrics_socket], env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        application = wait_until(self._find_application, description="application on the AT-SPI bus")
+        # Without a main loop the cached names and descriptions would never update
+        application.set_cache_mask(Atspi.Cache.NONE)
+        self.index = atspi_index(application)
+
+    def _find_application(self):
+        desktop = Atspi.get_desktop(0)
+        for i in range(desktop.get_child_count()):
+            application = desktop.get_child_at_index(i)
+            if application is not None and application.get_process_id() == self.process.pid:
+                return application
+        return None
+
+    def stop(self):
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+        if self.process is not None:
+            _stop(self.process)
+            self.process = None
+
+    def wait_for(self, name):
+        return self.index.wait_for(name)
+
+    def wait_gone(self, name):
+        self.index.wait_gone(name)
+
+    def exists(self, name):
+        return self.index.exists(name)
+
+    def press(self, name):
+        element = self.index.wait_for(name)
+        element.get_action_iface().do_action(0)
+        self.index.invalidate()
+
+    def type_text(self, name, text):
+        element = self.index.wait_for(name)
+        editable = element.get_editable_text_iface()
+        if editable is not None:
+            editable.set_text_contents(text)
+        else:
+            element.get_component_iface().grab_focus()
+            Atspi.generate_keyboard_event(0, text, Atspi.KeySynthType.STRING)
+        self.index.invalidate()
+
+    def task_items(self):
+        return set(self.index.names('taskItem_'))
+
+    def new_task_items(self, known):
+        return self.index.new_names('taskItem_', known)
+
+
+def login(session, username):
+    session.wait_for('usernameField')
+    session.type_text('usernameField', username)
+    session.press('loginButton')
+    session.wait_for('taskInput')
+
+
+def add_task(session, title):
+    before = session.task_items()
+    session.type_text('taskInput', title)
+    session.press('addTaskButton')
+    added = wait_until(lambda: session.new_task_items(before), description=f"task '{title}'")
+    return max(added, key=lambda name: int(name[len('taskItem_'):]))[len('taskItem_'):]
+
+
+# ===== SCENARIOS =====
+
+def scenario_create_and_remove(session):
+    session.start()
+    login(session, 'CreateRemove')
+    task_id = add_task(session, 'Write the report')
+    session.wait_for(f'taskTitle_{task_id}')
+    session.press(f'removeTaskButton_{task_id}')
+    session.wait_gone(f'taskItem_{task_id}')
+
+
+def scenario_toggle_and_clear(session):
+    session.start()
+    login(session, 'ToggleClear')
+    done_id = add_task(session, 'Finished task')
+    open_id = add_task(session, 'Open task')
+    session.press(f'taskCheckbox_{done_id}')
+    # The Clear button ignores presses until a task is completed
+    wait_until(lambda: session.wait_for(f'taskItem_{done_id}').get_description().endswith('(completed)'),
+               description="task to be marked completed")
+    session.press('clearCompletedButton')
+    session.wait_gone(f'taskItem_{done_id}')
+    session.wait_for(f'taskItem_{open_id}')
+
+
+def scenario_search_filter(session):
+    session.start()
+    login(session, 'SearchFilter')
+    alpha_id = add_task(session, 'alpha report')
+    beta_id = add_task(session, 'beta notes')
+    session.type_text('searchField', 'alpha')
+    session.wait_gone(f'taskItem_{beta_id}')
+    session.wait_for(f'taskItem_{alpha_id}')
+
+
+def scenario_persistence(session):
+    username = 'Persistence'
+    title = 'Survives a restart'
+    session.start()
+    login(session, username)
+    add_task(session, title)
+
+    # Saves are written in the background; wait for the task to reach disk
+    def saved():
+        directory = session.storage_dir()
+        for name in os.listdir(directory):
+            if name.startswith(f'tasks_{username}.'):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    if title.encode() in f.read():
+                        return True
+        return False
+
+    wait_until(saved, description="task to be saved")
+    session.stop()
+
+    session.start()
+    if not session.exists('taskInput'):
+        login(session, username)
+
+    # The title element carries the task title as its description
+    session.index.wait_for(None, text=title)
+
+
+SCENARIOS = {
+    'create_and_remove': scenario_create_and_remove,
+    'toggle_and_clear': scenario_toggle_and_clear,
+    'search_filter': scenario_search_filter,
+    'persistence': scenario_persistence,
+}
+
+
+def run_scenario(name, app_path, save_budget_ms=None, load_budget_ms=None):
+    """Run one scenario in a fresh sandbox; returns (name, passed, seconds, error)."""
+    root = tempfile.mkdtemp(prefix=f'qttaskapp-{name}-')
+    session = AppSession(app_path, root)
+    started = time.monotonic()
+    try:
+        SCENARIOS[name](session)
+        if save_budget_ms is not None or load_budget_ms is not None:
+            violations = latency_budget_violations(read_metrics(session.metrics_socket),
+                                                   save_budget_ms, load_budget_ms)
+            if violations:
+                return name, False, time.monotonic() - started, "; ".join(violations)
+        return name, True, time.monotonic() - started, None
+    except Exception as e:
+        return name, False, time.monotonic() - started, f"{type(e).__name__}: {e}"
+    finally:
+        session.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def parse_args(argv=None):
+    default_app = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'build', 'QtQuickTaskApp')
+    parser = argparse.ArgumentParser(description="Run QtQuickTaskApp e2e scenarios in parallel on Linux")
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help="scenarios to run (default: all of %s)" % ", ".join(sorted(SCENARIOS)))
+    parser.add_argument('--app', default=default_app, help="path to the QtQuickTaskApp binary")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: %(default)s)")
+    parser.add_argument('--platform', choices=['xvfb', 'offscreen'], default='xvfb',
+                        help="headless display for the app (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=1, help="run each scenario N times")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, metavar='SECONDS',
+                        help="maximum time to wait for any expected UI state (default: %(default)s)")
+    parser.add_argument('--save-budget-ms', type=float, metavar='MS',
+                        help="fail scenarios whose p95 save latency exceeds this")
+    parser.add_argument('--load-budget-ms', type=float, metavar='MS',
+                        help="fail scenarios whose p95 load latency exceeds this")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error("unknown scenario(s): " + ", ".join(unknown))
+    return args
+
+
+def main():
+    if platform.system() != "Linux":
+        print("Error: This runner requires Linux (AT-SPI)")
+        print("On Windows, use: python demos/automation-scripts/e2e_test.py")
+        return 1
+
+    args = parse_args()
+    app_path = os.path.abspath(args.app)
+    if not os.path.exists(app_path):
+        print(f"❌ Error: Application not found at {app_path}")
+        print("Please build the application first.")
+        return 1
+
+    names = (args.scenarios or sorted(SCENARIOS)) * args.repeat
+    print(f"Running {len(names)} scenario(s) on {args.workers} worker(s) ({args.platform})\n")
+
+    started = time.monotonic()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=get_context('spawn'),
+                             initializer=_init_worker, initargs=(args.platform, args.timeout)) as pool:
+        futures = [pool.submit(run_scenario, name, app_path, args.save_budget_ms, args.load_budget_ms)
+                   for name in names]
+        for future in as_completed(futures):
+            name, passed, seconds, error = future.result()
+            if passed:
+                print(f"  ✓ {name} ({seconds:.1f}s)")
+            else:
+                failures += 1
+                print(f"  ✗ {name} ({seconds:.1f}s): {error}")
+
+    print(f"\n{len(names) - failures} passed, {failures} failed in {time.monotonic() - started:.1f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Reusable helpers for driving QtQuickTaskApp through the accessibility tree.
+
+ElementIndex walks the tree once and answers lookups by Accessible.name (and
+by automation id or visible text) from a dictionary. The index is rebuilt only
+when it is marked dirty: by a structure-changed notification from the
+accessibility backend, or when a lookup misses or hits an element that no
+longer exists. This replaces repeated descendants() walks per lookup.
+
+The index itself is backend neutral; uia_index() builds one for a pywinauto
+UIA window (Windows) and atspi_index() for an AT-SPI application (Linux).
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+# Upper bound for any single wait_until() call
+DEFAULT_TIMEOUT = 10.0
+
+# Minimum seconds between rebuilds caused by lookup misses while
+# structure-change events are subscribed
+MISS_REBUILD_INTERVAL = 0.5
+
+# One element seen during a tree walk
+ElementRecord = namedtuple('ElementRecord', 'name automation_id control_type text element')
+
+
+def wait_until(predicate, timeout=None, poll=0.05, max_poll=1.0, backoff=2.0, description="condition"):
+    """Poll predicate until it returns a truthy value and return that value.
+
+    The polling interval starts at poll seconds and grows by backoff after
+    every miss, capped at max_poll. Exceptions raised by predicate count as a
+    miss, since elements commonly vanish mid-query during transitions.
+    Raises TimeoutError if the predicate is still falsy after timeout seconds.
+    """
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    interval = poll
+    while True:
+        try:
+            result = predicate()
+        except Exception:
+            result = None
+        if result:
+            return result
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Timed out after {timeout:.1f}s waiting for {description}")
+        time.sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_poll)
+
+
+def read_metrics(server_name, timeout=None):
+    """Fetch the performance counters served by QtQuickTaskApp --metrics-socket NAME.
+
+    Returns the decoded JSON document (see TaskMetrics::snapshot()).
+    """
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    if sys.platform == 'win32':
+        # QLocalServer listens on a named pipe on Windows
+        with open('\\\\.\\pipe\\' + server_name, 'rb') as pipe:
+            data = pipe.read()
+    else:
+        # ... and on a Unix socket in the temp directory unless given a full path
+        path = server_name if os.path.isabs(server_name) else os.path.join(tempfile.gettempdir(), server_name)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            data = b''.join(chunks)
+    return json.loads(data)
+
+
+def latency_budget_violations(metrics, save_p95_ms=None, load_p95_ms=None):
+    """Return a message for every p95 latency over its budget and for failed saves."""
+    violations = []
+    for kind, budget in (('save', save_p95_ms), ('load', load_p95_ms)):
+        if budget is None:
+            continue
+        p95 = metrics[kind]['p95Ms']
+        if p95 > budget:
+            violations.append(f"{kind} p95 {p95:.1f} ms exceeds budget of {budget:.1f} ms")
+    if metrics['save']['failures']:
+        violations.append(f"{metrics['save']['failures']} save(s) failed")
+    return violations
+
+
+class ElementIndex:
+    """Name-to-element index built from a single walk of the accessibility tree.
+
+    walk() must return an iterable of ElementRecord for every element below
+    the root. is_alive(element) reports whether a cached element still exists;
+    it is consulted before a cached hit is returned.
+
+    subscribe(callback), if given, registers callback for the backend's
+    structure-change events and returns a function that unregisters it, or
+    None if nothing could be registered. While subscribed, those events mark
+    the index stale, and a miss rebuilds at most once per
+    miss_rebuild_interval seconds, since backends do not report every
+    change; otherwise every miss triggers a rebuild. close(), or leaving a
+    with block, unregisters the handler.
+    """
+
+    def __init__(self, walk, is_alive=None, subscribe=None, miss_rebuild_interval=None):
+        self._walk = walk
+        self._is_alive = is_alive or (lambda element: True)
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._records = []
+        self._by_name = {}
+        self._by_automation_id = {}
+        self.rebuilds = 0
+        self._last_rebuild = None
+        self._miss_rebuild_interval = (MISS_REBUILD_INTERVAL if miss_rebuild_interval is None
+                                       else miss_rebuild_interval)
+        self._unsubscribe = subscribe(self.invalidate) if subscribe else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def subscribed(self):
+        """True while structure-change events keep the index current."""
+        return self._unsubscribe is not None
+
+    def close(self):
+        """Unregister the structure-change handler, if any."""
+        unsubscribe, self._unsubscribe = self._unsubscribe, None
+        if unsubscribe is not None:
+            unsubscribe()
+
+    def invalidate(self):
+        """Mark the index stale; safe to call from a backend event thread.
+
+        Besides the event handler, only the harness's own actions should call
+        this, never a polling loop.
+        """
+        with self._lock:
+            self._dirty = True
+
+    def _ensure_fresh(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+        records = list(self._walk())
+        by_name = {}
+        by_automation_id = {}
+        for record in records:
+            if record.name:
+                by_name.setdefault(record.name, []).append(record)
+            if record.automation_id:
+                by_automation_id.setdefault(record.automation_id, []).append(record)
+        self._records = records
+        self._by_name = by_name
+        self._by_automation_id = by_automation_id
+        self._last_rebuild = time.monotonic()
+        self.rebuilds += 1
+
+    def _rebuild_on_miss(self):
+        """Whether a miss should rebuild now rather than wait for an event."""
+        if not self.subscribed:
+            return True
+        return time.monotonic() - self._last_rebuild >= self._miss_rebuild_interval
+
+    def _match(self, name, control_type, text):
+        candidates = self._by_name.get(name) or self._by_automation_id.get(name) or []
+        if not candidates and text is not None:
+            candidates = [record for record in self._records if record.text == text]
+        for record in candidates:
+            if control_type is None or record.control_type == control_type:
+                return record
+        return None
+
+    def find(self, name, control_type=None, text=None):
+        """Resolve an element by Accessible.name, automation id, then visible text.
+
+        Returns the backend element or None. A hit on an element that has
+        gone away triggers one rebuild before giving up, and so does a miss
+        (throttled while structure-change events are subscribed).
+        """
+        self._ensure_fresh()
+        record = self._match(name, control_type, text)
+        if record is not None and self._is_alive(record.element):
+            return record.element
+        if record is None and not self._rebuild_on_miss():
+            return None
+
+        self.invalidate()
+        self._ensure_fresh()
+        record = self._match(name, control_type, text)
+        if record is not None and self._is_alive(record.element):
+            return record.element
+        return None
+
+    def exists(self, name, control_type=None):
+        return self.find(name, control_type) is not None
+
+    def names(self, prefix=""):
+        """Return the Accessible.names currently indexed that start with prefix."""
+        self._ensure_fresh()
+        return [name for name in self._by_name if name.startswith(prefix)]
+
+    def new_names(self, prefix, known):
+        """Return the indexed names starting with prefix that are not in known.
+
+        An empty result counts as a miss and rebuilds like find() does.
+        """
+        fresh = set(self.names(prefix)) - known
+        if fresh or not self._rebuild_on_miss():
+            return fresh
+        self.invalidate()
+        return set(self.names(prefix)) - known
+
+    def wait_for(self, name, control_type=None, text=None, timeout=None):
+        """Wait until name resolves and return the element."""
+        return wait_until(lambda: self.find(name, control_type, text), timeout=timeout,
+                          description=name or text)
+
+    def wait_gone(self, name, control_type=None, timeout=None):
+        """Wait until name no longer resolves.
+
+        A removed element fails the is_alive() check on its cached hit, which
+        rebuilds the index, so polling needs no invalidation of its own.
+        """
+        wait_until(lambda: not self.exists(name, control_type), timeout=timeout,
+                   description=f"{name} to disappear")
+
+
+def uia_index(window):
+    """Build an ElementIndex over a pywinauto UIA window.
+
+    The whole subtree is fetched with one FindAll call, and a UIA
+    StructureChanged handler invalidates the index whenever the window's
+    subtree changes; close() the index to remove it. Qt's bridge does not
+    raise the event for every item QML creates, so misses still rebuild,
+    throttled, and with no handler registered on every miss.
+    """
+    wrapper = window.wrapper_object() if hasattr(window, 'wrapper_object') else window
+
+    def walk():
+        for element in wrapper.descendants():
+            info = element.element_info
+            yield ElementRecord(info.name, info.automation_id, info.control_type,
+                                element.window_text(), element)
+
+    def is_alive(element):
+        try:
+            element.element_info.runtime_id
+            return element.is_visible()
+        except Exception:
+            return False
+
+    return ElementIndex(walk, is_alive,
+                        subscribe=lambda callback: _subscribe_structure_changes(wrapper, callback))
+
+
+def _subscribe_structure_changes(wrapper, callback):
+    """Register callback for StructureChanged events below wrapper.
+
+    Returns a function that removes the handler, or None if it could not be
+    registered.
+    """
+    try:
+        from comtypes import COMObject
+        from pywinauto.uia_defines import IUIA
+    except ImportError:
+        return None
+
+    uia = IUIA()
+
+    class StructureChangedHandler(COMObject):
+        _com_interfaces_ = [uia.UIA_dll.IUIAutomationStructureChangedEventHandler]
+
+        def HandleStructureChangedEvent(self, sender, change_type, runtime_id):
+            callback()
+            return 0
+
+    handler = StructureChangedHandler()
+    element = wrapper.element_info.element
+    try:
+        uia.iuia.AddStructureChangedEventHandler(element, uia.tree_scope['subtree'], None, handler)
+    except Exception:
+        return None
+
+    def unsubscribe():
+        try:
+            uia.iuia.RemoveStructureChangedEventHandler(element, handler)
+        except Exception:
+            pass
+    return unsubscribe
+
+
+def atspi_index(root):
+    """Build an ElementIndex over an AT-SPI accessible (Linux).
+
+    AT-SPI change events are only delivered to a running main loop, so this
+    index relies on rebuild-on-miss; callers invalidate() after their own
+    actions that change the tree.
+    """
+    from gi.repository import Atspi
+
+    def walk():
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for i in range(node.get_child_count()):
+                child = node.get_child_at_index(i)
+                if child is None:
+                    continue
+                stack.append(child)
+                yield ElementRecord(child.get_name(), None, child.get_role_name(),
+                                    child.get_description(), child)
+
+    def is_alive(element):
+        try:
+            return not element.get_state_set().contains(Atspi.StateType.DEFUNCT)
+        except Exception:
+            return False
+
+    return ElementIndex(walk, is_alive)
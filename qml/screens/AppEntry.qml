@@ -9,6 +9,7 @@ ApplicationWindow {
     height: 700
     title: "QtQuickTaskApp" + (SettingsStore.username ? " — " + SettingsStore.username : "")
 
+    // Every page binds to the theme, so it has to exist before the first one
     Loader {
         id: themeLoader
         source: "qrc:/AppTheme.qml"
@@ -18,9 +19,40 @@ ApplicationWindow {
 
     property var theme: themeLoader.item
 
+    // MainPage is incubated asynchronously while the login page stays on
+    // screen, then replaces it; the page itself ends up on the stack
+    function showMainPage() {
+        var component = Qt.createComponent(Qt.resolvedUrl("MainPage.qml"), Component.Asynchronous)
+
+        function incubate() {
+            if (component.status === Component.Error) {
+                console.warn(component.errorString())
+                return
+            }
+            if (component.status !== Component.Ready) return
+
+            var incubator = component.incubateObject(stackView, { controller: appController }, Qt.Asynchronous)
+            if (incubator.status === Component.Ready) {
+                stackView.replace(incubator.object, {}, StackView.Transition)
+                return
+            }
+            incubator.onStatusChanged = function(status) {
+                if (status === Component.Ready) stackView.replace(incubator.object, {}, StackView.Transition)
+            }
+        }
+
+        if (component.status === Component.Loading) {
+            component.statusChanged.connect(incubate)
+        } else {
+            incubate()
+        }
+    }
+
 
     AppController {
         id: appController
+        streamingLoad: true
+        metrics: TaskMetrics
         currentUser: SettingsStore.username
     }
 
@@ -55,9 +87,7 @@ ApplicationWindow {
     Component {
         id: loginPage
         LoginPage {
-            onLoginSuccessful: {
-                stackView.replace(mainPage, StackView.Transition)
-            }
+            onLoginSuccessful: showMainPage()
         }
     }
 
@@ -12,6 +12,30 @@ Item {
 
     property AppController controller: null
 
+    // showMainPage() hands the page to the StackView as an instance, and the
+    // StackView only destroys items it created itself. Without this every
+    // logout would leave the page and its filter model behind.
+    StackView.onRemoved: destroy()
+
+    // Above this many tasks rows use SlimTaskDelegate even if the setting is off
+    property int slimDelegateThreshold: 2000
+    readonly property bool slimDelegates: SettingsStore.slimDelegates
+        || (controller !== null && controller.model.totalCount >= slimDelegateThreshold)
+
+    function toggleTask(taskId) {
+        if (controller) {
+            controller.model.toggleById(taskId)
+            controller.save()
+        }
+    }
+
+    function removeTask(taskId) {
+        if (controller) {
+            controller.model.removeById(taskId)
+            controller.save()
+        }
+    }
+
     Rectangle {
         anchors.fill: parent
         color: theme.backgroundColor
@@ -52,7 +76,7 @@ Item {
                     }
 
                     Text {
-                        text: taskListView.count + " task(s)"
+                        text: (controller ? controller.model.totalCount : 0) + " task(s)"
                         font.pixelSize: theme.fontSizeNormal
                         color: "#7f8c8d"
 
@@ -60,6 +84,17 @@ Item {
                         Accessible.name: "taskCounter"
                         Accessible.description: "Number of tasks"
                     }
+
+                    Text {
+                        text: "Loading tasks… " + Math.round((controller ? controller.model.loadProgress : 1) * 100) + "%"
+                        font.pixelSize: theme.fontSizeSmall
+                        color: "#7f8c8d"
+                        visible: controller && controller.model.loading
+
+                        Accessible.role: Accessible.StaticText
+                        Accessible.name: "loadProgress"
+                        Accessible.description: "Task loading progress"
+                    }
                 }
             }
         }
@@ -146,6 +181,55 @@ Item {
             }
         }
 
+        // Search & Filter Section
+        Rectangle {
+            Layout.fillWidth: true
+            Layout.preferredHeight: 60
+            color: "white"
+            radius: theme.cornerRadius
+            border.color: theme.borderColor
+            border.width: 1
+
+            Row {
+                anchors.fill: parent
+                anchors.margins: theme.defaultPadding / 2
+                spacing: theme.defaultPadding
+
+                TextField {
+                    id: searchField
+                    width: parent.width - statusFilterBox.width - parent.spacing
+                    height: parent.height
+                    placeholderText: "Search tasks"
+                    font.pixelSize: theme.fontSizeNormal
+                    selectByMouse: true
+
+                    Accessible.role: Accessible.EditableText
+                    Accessible.name: "searchField"
+                    Accessible.description: "Filter tasks by title"
+
+                    background: Rectangle {
+                        color: theme.backgroundColor
+                        radius: theme.cornerRadius
+                        border.color: searchField.activeFocus ? theme.primaryColor : theme.borderColor
+                        border.width: 1
+                    }
+                }
+
+                ComboBox {
+                    id: statusFilterBox
+                    width: 160
+                    height: parent.height
+                    font.pixelSize: theme.fontSizeNormal
+                    // Order matches TaskFilterModel.StatusFilter
+                    model: ["All", "Active", "Completed"]
+
+                    Accessible.role: Accessible.ComboBox
+                    Accessible.name: "statusFilter"
+                    Accessible.description: "Show all, active or completed tasks"
+                }
+            }
+        }
+
         // Task List
         Rectangle {
             Layout.fillWidth: true
@@ -166,108 +250,41 @@ Item {
                 Accessible.name: "taskListView"
                 Accessible.description: "List of tasks"
 
-                model: controller ? controller.model : null
-
-                delegate: Rectangle {
-                    width: taskListView.width
-                    height: 60
-                    color: model.done ? theme.backgroundColor : "white"
-                    radius: theme.cornerRadius
-                    border.color: theme.borderColor
-                    border.width: 1
-
-                    Accessible.role: Accessible.ListItem
-                    Accessible.name: "taskItem_" + index
-                    Accessible.description: model.title + (model.done ? " (completed)" : " (active)")
+                model: TaskFilterModel {
+                    id: filteredTasks
+                    sourceModel: controller ? controller.model : null
+                    searchText: searchField.text
+                    statusFilter: statusFilterBox.currentIndex
+                }
 
-                    Behavior on color {
-                        ColorAnimation { duration: 200 }
+                // Slim rows are recycled instead of destroyed; full rows are not,
+                // since their color animations would replay on every reuse
+                reuseItems: root.slimDelegates
+                delegate: root.slimDelegates ? slimTaskDelegate : fullTaskDelegate
+
+                Component {
+                    id: fullTaskDelegate
+                    TaskDelegate {
+                        width: taskListView.width
+                        onToggleRequested: root.toggleTask(model.taskId)
+                        onRemoveRequested: root.removeTask(model.taskId)
                     }
+                }
 
-                    RowLayout {
-                        anchors.fill: parent
-                        anchors.margins: theme.defaultPadding / 2
-                        spacing: theme.defaultPadding / 2
-
-                        CheckBox {
-                            id: checkbox
-                            Layout.alignment: Qt.AlignVCenter
-                            checked: model.done
-
-                            Accessible.role: Accessible.CheckBox
-                            Accessible.name: "taskCheckbox_" + index
-                            Accessible.description: "Toggle completion for: " + model.title
-                            Accessible.onPressAction: clicked()
-
-                            onClicked: {
-                                if (controller) {
-                                    controller.model.toggleTask(index)
-                                    controller.save()
-                                }
-                            }
-                        }
-
-                        Text {
-                            text: model.title
-                            font.pixelSize: theme.fontSizeNormal
-                            color: model.done ? "#95a5a6" : theme.primaryColor
-                            font.strikeout: model.done
-                            Layout.fillWidth: true
-                            Layout.alignment: Qt.AlignVCenter
-                            elide: Text.ElideRight
-
-                            Accessible.role: Accessible.StaticText
-                            Accessible.name: "taskTitle_" + index
-                            Accessible.description: model.title
-
-                            Behavior on color {
-                                ColorAnimation { duration: 200 }
-                            }
-                        }
-
-                        Button {
-                            id: removeButton
-                            text: "Remove"
-                            Layout.alignment: Qt.AlignVCenter
-                            font.pixelSize: theme.fontSizeSmall
-
-                            Accessible.role: Accessible.Button
-                            Accessible.name: "removeTaskButton_" + index
-                            Accessible.description: "Remove task: " + model.title
-                            Accessible.onPressAction: clicked()
-
-                            background: Rectangle {
-                                radius: theme.cornerRadius
-                                color: removeButton.pressed ? "#c0392b" : "#e74c3c"
-
-                                Behavior on color {
-                                    ColorAnimation { duration: 150 }
-                                }
-                            }
-
-                            contentItem: Text {
-                                text: removeButton.text
-                                font: removeButton.font
-                                color: "white"
-                                horizontalAlignment: Text.AlignHCenter
-                                verticalAlignment: Text.AlignVCenter
-                                leftPadding: 15
-                                rightPadding: 15
-                            }
-
-                            onClicked: {
-                                if (controller) {
-                                    controller.model.removeTask(index)
-                                    controller.save()
-                                }
-                            }
-                        }
+                Component {
+                    id: slimTaskDelegate
+                    SlimTaskDelegate {
+                        width: taskListView.width
+                        onToggleRequested: root.toggleTask(model.taskId)
+                        onRemoveRequested: root.removeTask(model.taskId)
                     }
                 }
 
                 Text {
                     anchors.centerIn: parent
-                    text: "No tasks yet. Add your first task above!"
+                    text: controller && controller.model.totalCount > 0
+                          ? "No tasks match the current filter."
+                          : "No tasks yet. Add your first task above!"
                     font.pixelSize: theme.fontSizeLarge
                     color: "gray"
                     visible: taskListView.count === 0
@@ -286,23 +303,13 @@ Item {
             Layout.fillWidth: true
             Layout.preferredHeight: 50
             font.pixelSize: theme.fontSizeLArge
-            enabled: controller && controller.model && controller.model.hasCompletedTasks()
+            enabled: controller && controller.model && controller.model.completedCount > 0
 
             Accessible.role: Accessible.Button
             Accessible.name: "clearCompletedButton"
             Accessible.description: "Clear all completed tasks"
             Accessible.onPressAction: if (enabled) clicked()
 
-            // Force re-evaluation when completed tasks change
-            Connections {
-                target: controller ? controller.model : null
-                function onCompletedTasksChanged() {
-                    clearButton.enabled = Qt.binding(function() {
-                        return controller && controller.model && controller.model.hasCompletedTasks()
-                    })
-                }
-            }
-
             background: Rectangle {
                 radius: theme.cornerRadius
                 color: clearButton.enabled ? (clearButton.pressed ? "#d68910" : "#f39c12") : "#ecf0f1"
@@ -0,0 +1,84 @@
+import QtQuick 2.15
+
+// Lightweight task row for long lists: plain items, no layouts, controls or
+// animations, and two MouseAreas. Safe to reuse across scrolls since every
+// property is a direct binding to the row's roles. Exposes the same
+// accessible names as TaskDelegate.
+Rectangle {
+    id: row
+
+    signal toggleRequested()
+    signal removeRequested()
+
+    height: 44
+    color: model.done ? theme.backgroundColor : "white"
+    border.color: theme.borderColor
+    border.width: 1
+
+    Accessible.role: Accessible.ListItem
+    Accessible.name: "taskItem_" + model.taskId
+    Accessible.description: model.title + (model.done ? " (completed)" : " (active)")
+
+    Rectangle {
+        id: checkMark
+        x: theme.defaultPadding / 2
+        anchors.verticalCenter: parent.verticalCenter
+        width: 18
+        height: 18
+        radius: 3
+        color: model.done ? theme.primaryColor : "white"
+        border.color: theme.primaryColor
+        border.width: 2
+
+        Accessible.role: Accessible.CheckBox
+        Accessible.name: "taskCheckbox_" + model.taskId
+        Accessible.description: "Toggle completion for: " + model.title
+        Accessible.checkable: true
+        Accessible.checked: model.done
+        Accessible.onPressAction: row.toggleRequested()
+    }
+
+    Text {
+        anchors.left: checkMark.right
+        anchors.leftMargin: theme.defaultPadding / 2
+        anchors.right: removeLabel.left
+        anchors.rightMargin: theme.defaultPadding / 2
+        anchors.verticalCenter: parent.verticalCenter
+        text: model.title
+        font.pixelSize: theme.fontSizeNormal
+        color: model.done ? "#95a5a6" : theme.primaryColor
+        font.strikeout: model.done
+        elide: Text.ElideRight
+
+        Accessible.role: Accessible.StaticText
+        Accessible.name: "taskTitle_" + model.taskId
+        Accessible.description: model.title
+    }
+
+    Text {
+        id: removeLabel
+        anchors.right: parent.right
+        anchors.rightMargin: theme.defaultPadding / 2
+        anchors.verticalCenter: parent.verticalCenter
+        text: "Remove"
+        font.pixelSize: theme.fontSizeSmall
+        color: "#e74c3c"
+
+        Accessible.role: Accessible.Button
+        Accessible.name: "removeTaskButton_" + model.taskId
+        Accessible.description: "Remove task: " + model.title
+        Accessible.onPressAction: row.removeRequested()
+    }
+
+    // Clicks anywhere on the row toggle it, except on the Remove label
+    MouseArea {
+        anchors.fill: parent
+        onClicked: row.toggleRequested()
+    }
+
+    MouseArea {
+        anchors.fill: removeLabel
+        anchors.margins: -4
+        onClicked: row.removeRequested()
+    }
+}
@@ -0,0 +1,96 @@
+import QtQuick 2.15
+import QtQuick.Controls 2.15
+import QtQuick.Layouts 1.15
+
+// Full task row: styled controls with color animations. Expects the taskId,
+// title and done roles of TaskModel in its context.
+Rectangle {
+    id: row
+
+    signal toggleRequested()
+    signal removeRequested()
+
+    height: 60
+    color: model.done ? theme.backgroundColor : "white"
+    radius: theme.cornerRadius
+    border.color: theme.borderColor
+    border.width: 1
+
+    Accessible.role: Accessible.ListItem
+    Accessible.name: "taskItem_" + model.taskId
+    Accessible.description: model.title + (model.done ? " (completed)" : " (active)")
+
+    Behavior on color {
+        ColorAnimation { duration: 200 }
+    }
+
+    RowLayout {
+        anchors.fill: parent
+        anchors.margins: theme.defaultPadding / 2
+        spacing: theme.defaultPadding / 2
+
+        CheckBox {
+            id: checkbox
+            Layout.alignment: Qt.AlignVCenter
+            checked: model.done
+
+            Accessible.role: Accessible.CheckBox
+            Accessible.name: "taskCheckbox_" + model.taskId
+            Accessible.description: "Toggle completion for: " + model.title
+            Accessible.onPressAction: clicked()
+
+            onClicked: row.toggleRequested()
+        }
+
+        Text {
+            text: model.title
+            font.pixelSize: theme.fontSizeNormal
+            color: model.done ? "#95a5a6" : theme.primaryColor
+            font.strikeout: model.done
+            Layout.fillWidth: true
+            Layout.alignment: Qt.AlignVCenter
+            elide: Text.ElideRight
+
+            Accessible.role: Accessible.StaticText
+            Accessible.name: "taskTitle_" + model.taskId
+            Accessible.description: model.title
+
+            Behavior on color {
+                ColorAnimation { duration: 200 }
+            }
+        }
+
+        Button {
+            id: removeButton
+            text: "Remove"
+            Layout.alignment: Qt.AlignVCenter
+            font.pixelSize: theme.fontSizeSmall
+
+            Accessible.role: Accessible.Button
+            Accessible.name: "removeTaskButton_" + model.taskId
+            Accessible.description: "Remove task: " + model.title
+            Accessible.onPressAction: clicked()
+
+            background: Rectangle {
+                radius: theme.cornerRadius
+                color: removeButton.pressed ? "#c0392b" : "#e74c3c"
+
+                Behavior on color {
+                    ColorAnimation { duration: 150 }
+                }
+            }
+
+            contentItem: Text {
+                text: removeButton.text
+                font: removeButton.font
+                color: "white"
+                horizontalAlignment: Text.AlignHCenter
+                verticalAlignment: Text.AlignVCenter
+                leftPadding: 15
+                rightPadding: 15
+            }
+
+            onClicked: row.removeRequested()
+        }
+    }
+}
@@ -1,18 +1,63 @@
 #include "appcontroller.h"
 #include "../models/taskmodel.h"
+#include "../services/taskexchange.h"
+#include "../services/taskjournal.h"
+#include "../services/taskstorage.h"
+#include "../services/persistenceworker.h"
+#include <QCoreApplication>
+#include <QDateTime>
+#include <QElapsedTimer>
 #include <QStandardPaths>
 #include <QDir>
 #include <QFile>
+#include <QFileInfo>
 #include <QSaveFile>
-#include <QJsonDocument>
-#include <QJsonObject>
-#include <QJsonArray>
-#include <QRegularExpression>
+#include <algorithm>
 
 AppController::AppController(QObject* parent)
     : QObject(parent), m_model(new TaskModel(this)),
-      m_storagePath(defaultStoragePath()), m_currentUser("") {
+      m_storagePath(defaultStoragePath()), m_currentUser(""),
+      m_worker(new PersistenceWorker) {
     // Don't auto-load on construction - wait for user to be set
+
+    // All file writes happen on the persistence thread; the GUI thread only
+    // collects journal records and hands over implicitly shared snapshots.
+    m_worker->moveToThread(&m_persistenceThread);
+    connect(&m_persistenceThread, &QThread::finished, m_worker, &QObject::deleteLater);
+    connect(m_worker, &PersistenceWorker::saveFailed, this, [this]() {
+        m_snapshotDirty = true;
+        if (m_metrics) m_metrics->recordSaveFailure();
+        --m_pendingJobs;
+    });
+    connect(m_worker, &PersistenceWorker::saveFinished, this, [this](qint64 nsecs, qint64 bytes) {
+        if (m_metrics) m_metrics->recordSave(nsecs, bytes);
+        --m_pendingJobs;
+    });
+    connect(m_worker, &PersistenceWorker::fileWritten, this, &AppController::onFileWritten);
+    m_persistenceThread.start();
+
+    m_saveTimer.setSingleShot(true);
+    m_saveTimer.setInterval(250);
+    connect(&m_saveTimer, &QTimer::timeout, this, &AppController::commitPendingSave);
+    connect(QCoreApplication::instance(), &QCoreApplication::aboutToQuit, this, &AppController::flush);
+
+    // Writers replace or append to files in bursts; look once they settle
+    m_reloadTimer.setSingleShot(true);
+    m_reloadTimer.setInterval(100);
+    connect(&m_reloadTimer, &QTimer::timeout, this, &AppController::checkStorage);
+    connect(&m_watcher, &QFileSystemWatcher::fileChanged, &m_reloadTimer, qOverload<>(&QTimer::start));
+    connect(&m_watcher, &QFileSystemWatcher::directoryChanged, &m_reloadTimer, qOverload<>(&QTimer::start));
+
+    connect(m_model, &QAbstractItemModel::rowsInserted, this, &AppController::onRowsInserted);
+    connect(m_model, &QAbstractItemModel::rowsRemoved, this, &AppController::onRowsRemoved);
+    connect(m_model, &QAbstractItemModel::dataChanged, this, &AppController::onDataChanged);
+    connect(m_model, &QAbstractItemModel::modelReset, this, &AppController::onModelReset);
+}
+
+AppController::~AppController() {
+    flush();
+    m_persistenceThread.quit();
+    m_persistenceThread.wait();
 }
 
 TaskModel* AppController::model() const {
@@ -30,24 +75,117 @@ QString AppController::currentUser() const {
 void AppController::setCurrentUser(const QString& username) {
     if (m_currentUser == username) return;
     
-    // Save current user's tasks before switching
+    // Save the current user's changes and keep their tasks in memory
     if (!m_currentUser.isEmpty()) {
-        save();
+        stashSession();
     }
     
     m_currentUser = username;
     updateStoragePath();
     
-    // Clear and load new user's tasks
+    // Swap in a cached session, or load the new user's tasks from disk
     if (!m_currentUser.isEmpty()) {
-        load();
+        if (!restoreSession()) {
+            load();
+        }
     } else {
+        m_recording = false;
         clearTasks();
+        m_recording = true;
+        watchStorage();
     }
     
     emit currentUserChanged();
 }
 
+bool AppController::journaled() const {
+    return m_journaled;
+}
+
+void AppController::setJournaled(bool journaled) {
+    if (m_journaled == journaled) return;
+    m_journaled = journaled;
+    // Records were not collected while the journal was off (and vice versa),
+    // so the next save has to write a full snapshot.
+    m_pendingRecords.clear();
+    m_snapshotDirty = true;
+    emit journaledChanged();
+}
+
+qint64 AppController::compactionThreshold() const {
+    return m_compactionThreshold;
+}
+
+void AppController::setCompactionThreshold(qint64 bytes) {
+    if (m_compactionThreshold == bytes) return;
+    m_compactionThreshold = bytes;
+    emit compactionThresholdChanged();
+}
+
+int AppController::saveDelay() const {
+    return m_saveTimer.interval();
+}
+
+void AppController::setSaveDelay(int milliseconds) {
+    if (m_saveTimer.interval() == milliseconds) return;
+    m_saveTimer.setInterval(milliseconds);
+    emit saveDelayChanged();
+}
+
+bool AppController::binaryStorage() const {
+    return m_binaryStorage;
+}
+
+void AppController::setBinaryStorage(bool binary) {
+    if (m_binaryStorage == binary) return;
+    m_binaryStorage = binary;
+    // The next save writes the snapshot in the new format
+    m_snapshotDirty = true;
+    emit binaryStorageChanged();
+}
+
+bool AppController::streamingLoad() const {
+    return m_streamingLoad;
+}
+
+void AppController::setStreamingLoad(bool streaming) {
+    if (m_streamingLoad == streaming) return;
+    m_streamingLoad = streaming;
+    emit streamingLoadChanged();
+}
+
+int AppController::sessionCacheSize() const {
+    return m_sessionCacheSize;
+}
+
+void AppController::setSessionCacheSize(int sessions) {
+    if (m_sessionCacheSize == sessions) return;
+    m_sessionCacheSize = sessions;
+    trimSessions();
+    emit sessionCacheSizeChanged();
+}
+
+qint64 AppController::sessionCacheBytes() const {
+    return m_sessionCacheBytes;
+}
+
+void AppController::setSessionCacheBytes(qint64 bytes) {
+    if (m_sessionCacheBytes == bytes) return;
+    m_sessionCacheBytes = bytes;
+    trimSessions();
+    emit sessionCacheBytesChanged();
+}
+
+TaskMetrics* AppController::metrics() const {
+    return m_metrics;
+}
+
+void AppController::setMetrics(TaskMetrics* metrics) {
+    if (m_metrics == metrics) return;
+    m_metrics = metrics;
+    emit metricsChanged();
+}
+
 QString AppController::defaultStoragePath() const {
     QString path = QStandardPaths::writableLocation(QStandardPaths::AppDataLocation);
     QDir().mkpath(path);
@@ -55,65 +193,380 @@ QString AppController::defaultStoragePath() const {
 }
 
 void AppController::updateStoragePath() {
-    QString path = QStandardPaths::writableLocation(QStandardPaths::AppDataLocation);
-    QDir().mkpath(path);
+    if (m_dataDir.isEmpty()) {
+        m_dataDir = QStandardPaths::writableLocation(QStandardPaths::AppDataLocation);
+        QDir().mkpath(m_dataDir);
+    }
     
     if (m_currentUser.isEmpty()) {
-        m_storagePath = path + "/tasks.json";
-    } else {
-        // Sanitize username for filename (replace invalid characters)
-        QString safeUsername = m_currentUser;
-        safeUsername.replace(QRegularExpression("[^a-zA-Z0-9_-]"), "_");
-        m_storagePath = path + "/tasks_" + safeUsername + ".json";
+        m_storagePath = m_dataDir + "/tasks.json";
+        return;
     }
+
+    // Sanitizing the username runs a regex; the result is cached so
+    // returning users skip it
+    auto it = m_storagePaths.constFind(m_currentUser);
+    if (it == m_storagePaths.constEnd()) {
+        it = m_storagePaths.insert(m_currentUser, TaskStorage::userStoragePath(m_dataDir, m_currentUser));
+    }
+    m_storagePath = it.value();
+}
+
+QString AppController::snapshotPath() const {
+    return snapshotPathFor(m_storagePath);
+}
+
+QString AppController::snapshotPathFor(const QString& storagePath) const {
+    return m_binaryStorage ? TaskStorage::binaryPathFor(storagePath) : storagePath;
 }
 
 void AppController::load() {
-    QFile file(m_storagePath);
-    if (!file.exists()) return;
+    QElapsedTimer timer;
+    timer.start();
 
-    if (!file.open(QIODevice::ReadOnly)) return;
+    // Make sure nothing is still being written to the files we are about to read
+    waitForWorker();
 
-    QByteArray data = file.readAll();
-    QJsonDocument doc = QJsonDocument::fromJson(data);
+    // Read whichever snapshot format was written last; a file in the other
+    // format is converted by writing a fresh snapshot right after loading.
+    const QString preferredPath = snapshotPath();
+    const QString sourcePath = newestSnapshotPath();
 
-    if (!doc.isObject()) return;
+    const QString journalPath = TaskJournal::pathForSnapshot(m_storagePath);
+    m_journalBytes = QFileInfo(journalPath).size();
 
-    QJsonArray taskArray = doc.object().value("tasks").toArray();
-    QVector<TaskItem> tasks;
-    for (const QJsonValue& value : taskArray) {
-        QJsonObject obj = value.toObject();
-        tasks.append(TaskItem{obj.value("title").toString(), obj.value("done").toBool()});
+    m_recording = false;
+    bool missingIds = false;
+    BinaryTaskReader* reader = nullptr;
+    if (m_streamingLoad && m_journalBytes == 0 && TaskStorage::isBinaryPath(sourcePath)) {
+        // Nothing to replay: rows are decoded from the map as the view needs them
+        reader = new BinaryTaskReader;
+        if (!reader->open(sourcePath) || reader->version() < 2) {
+            delete reader;
+            reader = nullptr;
+        }
+    }
+
+    if (reader) {
+        m_journalSeq = reader->journalSeq();
+        m_model->setSource(reader);
+    } else {
+        // Snapshot first, then every journal record written after it. This
+        // path parses the whole file up front; with streamingLoad only the
+        // model rows are then filled in batches.
+        QVector<TaskItem> tasks;
+        quint64 snapshotSeq = 0;
+        TaskStorage::readSnapshot(sourcePath, tasks, &snapshotSeq);
+        m_journalSeq = TaskJournal::replay(journalPath, snapshotSeq, tasks);
+        missingIds = std::any_of(tasks.cbegin(), tasks.cend(),
+            [](const TaskItem& task) { return task.id <= 0; });
+
+        if (m_streamingLoad) {
+            m_model->setSource(new VectorTaskSource(tasks));
+        } else {
+            m_model->setItems(tasks);
+        }
+    }
+    m_recording = true;
+
+    m_saveTimer.stop();
+    m_pendingRecords.clear();
+    m_snapshotDirty = false;
+
+    // Persist converted formats and newly assigned ids right away
+    if ((sourcePath != preferredPath && QFile::exists(sourcePath)) || missingIds) {
+        postSnapshot();
     }
-    m_model->setItems(tasks);
+    watchStorage();
+
+    if (m_metrics) m_metrics->recordLoad(timer.nsecsElapsed());
 }
 
-void AppController::save() {
-    QJsonArray taskArray;
-    for (const TaskItem& task : m_model->items()) {
-        QJsonObject obj;
-        obj["title"] = task.title;
-        obj["done"] = task.done;
-        taskArray.append(obj);
+QString AppController::newestSnapshotPath() const {
+    return TaskStorage::newestSnapshotPath(m_storagePath, m_binaryStorage);
+}
+
+QStringList AppController::storageFiles() const {
+    return {m_storagePath, TaskStorage::binaryPathFor(m_storagePath), TaskJournal::pathForSnapshot(m_storagePath)};
+}
+
+QVector<qint64> AppController::storageFingerprint() const {
+    QVector<qint64> fingerprint;
+    if (m_currentUser.isEmpty()) return fingerprint;
+    for (const QString& path : storageFiles()) {
+        fingerprint += TaskStorage::fileStamp(path);
     }
+    return fingerprint;
+}
+
+void AppController::watchStorage() {
+    m_reloadTimer.stop();
+    if (!m_watcher.files().isEmpty()) m_watcher.removePaths(m_watcher.files());
+    if (!m_watcher.directories().isEmpty()) m_watcher.removePaths(m_watcher.directories());
+    m_knownFingerprint = storageFingerprint();
+    m_externalChange = false;
+    if (m_currentUser.isEmpty()) return;
 
-    QJsonObject root;
-    root["tasks"] = taskArray;
+    // The directory catches files being created or replaced by a rename
+    m_watcher.addPath(m_dataDir);
+    for (const QString& path : storageFiles()) {
+        if (QFile::exists(path)) m_watcher.addPath(path);
+    }
+}
 
-    QSaveFile file(m_storagePath);
-    if (!file.open(QIODevice::WriteOnly)) return;
+void AppController::onFileWritten(const QString& path, const QVector<qint64>& before, const QVector<qint64>& after) {
+    // Writes to a previous user's files are of no interest
+    const int file = storageFiles().indexOf(path);
+    if (file < 0 || m_knownFingerprint.size() < (file + 1) * 2) return;
 
-    file.write(QJsonDocument(root).toJson(QJsonDocument::Indented));
-    file.commit();
+    // Stale news if the fingerprint was retaken after this write. Otherwise
+    // anything but our last write found in the file came from elsewhere.
+    const QVector<qint64> known = m_knownFingerprint.mid(file * 2, 2);
+    if (after == known) return;
+    if (before != known) {
+        m_externalChange = true;
+        m_reloadTimer.start();
+    }
+    m_knownFingerprint[file * 2] = after.value(0);
+    m_knownFingerprint[file * 2 + 1] = after.value(1);
 }
 
-void AppController::exportTasks(const QString& filePath) {
-    QFile file(filePath);
-    if (!file.open(QIODevice::WriteOnly)) return;
+void AppController::checkStorage() {
+    if (m_currentUser.isEmpty()) return;
 
-    save();
+    // Let our own writes land first; each one reports the stamps it left
+    if (m_pendingJobs > 0 || m_saveTimer.isActive()) {
+        m_reloadTimer.start();
+        return;
+    }
+    if (m_snapshotDirty || !m_pendingRecords.isEmpty()) {
+        commitPendingSave();
+        m_reloadTimer.start();
+        return;
+    }
+
+    // Files replaced through a rename drop out of the watch list
+    const QStringList watched = m_watcher.files();
+    for (const QString& path : storageFiles()) {
+        if (!watched.contains(path) && QFile::exists(path)) m_watcher.addPath(path);
+    }
+
+    const QVector<qint64> fingerprint = storageFingerprint();
+    if (fingerprint == m_knownFingerprint && !m_externalChange) return;
+    m_knownFingerprint = fingerprint;
+    m_externalChange = false;
+    reloadFromDisk();
+}
+
+void AppController::reloadFromDisk() {
+    QElapsedTimer timer;
+    timer.start();
+
+    QVector<TaskItem> tasks;
+    quint64 snapshotSeq = 0;
+    const QString journalPath = TaskJournal::pathForSnapshot(m_storagePath);
+    TaskStorage::readSnapshot(newestSnapshotPath(), tasks, &snapshotSeq);
+    m_journalSeq = TaskJournal::replay(journalPath, snapshotSeq, tasks);
+    m_journalBytes = QFileInfo(journalPath).size();
+    const bool missingIds = std::any_of(tasks.cbegin(), tasks.cend(),
+        [](const TaskItem& task) { return task.id <= 0; });
+
+    // The rows now match the files, so none of this is journaled
+    m_recording = false;
+    m_model->applyItems(tasks);
+    m_recording = true;
+
+    // Same as load(): ids handed out to the new tasks are written back right away
+    if (missingIds) postSnapshot();
+
+    if (m_metrics) m_metrics->recordLoad(timer.nsecsElapsed());
+}
+
+void AppController::save() {
+    // Saves requested within the debounce window are committed together
+    if (!m_saveTimer.isActive()) {
+        m_saveTimer.start();
+    }
+}
+
+void AppController::flush() {
+    m_saveTimer.stop();
+    commitPendingSave();
+    waitForWorker();
+}
+
+bool AppController::exportTasks(const QString& filePath) {
+    // Rows that have not been fetched yet belong in the export too
+    m_model->fetchAll();
+
+    QSaveFile file(filePath);
+    if (!file.open(QIODevice::WriteOnly)) return false;
+
+    TaskExportWriter writer(&file, TaskExchange::formatForPath(filePath));
+    for (const TaskItem& task : m_model->tasks()) {
+        if (!writer.write(task)) return false;
+    }
+    return writer.finish() && file.commit();
 }
 
 void AppController::clearTasks() {
     m_model->setItems(QVector<TaskItem>());
-}
\ No newline at end of file
+}
+
+bool AppController::recordMutation() {
+    if (!m_recording) return false;
+    if (!m_journaled) {
+        // Without a journal any change means the snapshot has to be rewritten
+        m_snapshotDirty = true;
+        return false;
+    }
+    return true;
+}
+
+void AppController::onRowsInserted(const QModelIndex&, int first, int last) {
+    // Rows appearing through lazy loading are already on disk
+    if (m_model->isFetching()) return;
+    if (m_metrics) m_metrics->recordRowsInserted(last - first + 1);
+    if (!recordMutation()) return;
+    m_pendingRecords += TaskJournal::insertRecord(++m_journalSeq, first,
+        m_model->tasks().mid(first, last - first + 1));
+}
+
+void AppController::onRowsRemoved(const QModelIndex&, int first, int last) {
+    if (m_metrics) m_metrics->recordRowsRemoved(last - first + 1);
+    if (!recordMutation()) return;
+    m_pendingRecords += TaskJournal::removeRecord(++m_journalSeq, first, last - first + 1);
+}
+
+void AppController::onDataChanged(const QModelIndex& topLeft, const QModelIndex& bottomRight) {
+    if (m_metrics) m_metrics->recordRowsChanged(bottomRight.row() - topLeft.row() + 1);
+    if (!recordMutation()) return;
+    const int first = topLeft.row();
+    const int last = bottomRight.row();
+    m_pendingRecords += TaskJournal::updateRecord(++m_journalSeq, first,
+        m_model->tasks().mid(first, last - first + 1));
+}
+
+void AppController::onModelReset() {
+    if (m_metrics) m_metrics->recordReset();
+    if (!m_recording) return;
+    m_pendingRecords.clear();
+    m_snapshotDirty = true;
+}
+
+void AppController::commitPendingSave() {
+    if (m_snapshotDirty) {
+        postSnapshot();
+        return;
+    }
+
+    if (m_pendingRecords.isEmpty()) return;
+
+    queueAppend(m_storagePath, m_pendingRecords);
+    m_journalBytes += m_pendingRecords.size();
+    m_pendingRecords.clear();
+
+    // Compaction is just a snapshot job queued behind the append
+    if (m_journalBytes >= m_compactionThreshold) {
+        postSnapshot();
+    }
+}
+
+void AppController::postSnapshot() {
+    // A snapshot must contain the rows that have not been fetched yet
+    m_model->fetchAll();
+
+    // A copy of the store shares its columns until the model next changes
+    queueSnapshot(m_storagePath, m_model->tasks(), m_journalSeq);
+    m_pendingRecords.clear();
+    m_journalBytes = 0;
+    m_snapshotDirty = false;
+}
+
+void AppController::queueAppend(const QString& storagePath, const QByteArray& records) {
+    const QString journalPath = TaskJournal::pathForSnapshot(storagePath);
+    PersistenceWorker* worker = m_worker;
+    ++m_pendingJobs;
+    QMetaObject::invokeMethod(worker, [worker, journalPath, records]() {
+        worker->appendRecords(journalPath, records);
+    }, Qt::QueuedConnection);
+}
+
+void AppController::queueSnapshot(const QString& storagePath, const TaskStore& tasks, quint64 seq) {
+    const QString path = snapshotPathFor(storagePath);
+    const bool journaled = m_journaled;
+    PersistenceWorker* worker = m_worker;
+    ++m_pendingJobs;
+    QMetaObject::invokeMethod(worker, [worker, path, tasks, seq, journaled]() {
+        worker->writeSnapshot(path, tasks, seq, journaled);
+    }, Qt::QueuedConnection);
+}
+
+void AppController::waitForWorker() {
+    // Jobs run in order, so an empty blocking call returns once all earlier jobs are done
+    QMetaObject::invokeMethod(m_worker, []() {}, Qt::BlockingQueuedConnection);
+}
+
+void AppController::stashSession() {
+    // Switching users always writes the outgoing user's changes, so cached
+    // sessions hold nothing that is not on disk
+    m_saveTimer.stop();
+    commitPendingSave();
+
+    // A session still streaming from its snapshot is cheap to reopen, and
+    // caching it would mean decoding every row now
+    if (m_sessionCacheSize <= 0 || m_model->canFetchMore(QModelIndex())) return;
+
+    // The fingerprint has to describe the files as that write leaves them
+    waitForWorker();
+
+    UserSession session;
+    session.storagePath = m_storagePath;
+    session.tasks = m_model->tasks();
+    session.journalBytes = m_journalBytes;
+    session.journalSeq = m_journalSeq;
+    session.fingerprint = storageFingerprint();
+    session.bytes = session.tasks.memoryUsage();
+
+    m_sessionBytes += session.bytes;
+    m_sessions.insert(m_currentUser, session);
+    m_sessionOrder.append(m_currentUser);
+    trimSessions();
+}
+
+bool AppController::restoreSession() {
+    auto it = m_sessions.find(m_currentUser);
+    if (it == m_sessions.end()) return false;
+
+    QElapsedTimer timer;
+    timer.start();
+
+    const UserSession session = it.value();
+    m_sessions.erase(it);
+    m_sessionOrder.removeOne(m_currentUser);
+    m_sessionBytes -= session.bytes;
+
+    // Another process wrote the files while the session was cached
+    if (storageFingerprint() != session.fingerprint) return false;
+
+    m_recording = false;
+    m_model->setTasks(session.tasks);
+    m_recording = true;
+
+    m_pendingRecords.clear();
+    m_snapshotDirty = false;
+    m_journalBytes = session.journalBytes;
+    m_journalSeq = session.journalSeq;
+    watchStorage();
+
+    if (m_metrics) m_metrics->recordLoad(timer.nsecsElapsed());
+    return true;
+}
+
+void AppController::trimSessions() {
+    while (!m_sessionOrder.isEmpty()
+           && (m_sessionOrder.size() > m_sessionCacheSize || m_sessionBytes > m_sessionCacheBytes)) {
+        const QString username = m_sessionOrder.takeFirst();
+        m_sessionBytes -= m_sessions.take(username).bytes;
+    }
+}
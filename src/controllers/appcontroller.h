@@ -2,36 +2,152 @@
 
 #include <QObject>
 #include <QString>
+#include <QByteArray>
+#include <QFileSystemWatcher>
+#include <QHash>
+#include <QModelIndex>
+#include <QPointer>
+#include <QStringList>
+#include <QThread>
+#include <QTimer>
+#include <QVector>
+#include "../models/taskmodel.h"
+#include "../services/taskmetrics.h"
 
-class TaskModel;
+class PersistenceWorker;
 
 class AppController : public QObject {
     Q_OBJECT
     Q_PROPERTY(TaskModel* model READ model CONSTANT)
     Q_PROPERTY(QString storagePath READ storagePath CONSTANT)
     Q_PROPERTY(QString currentUser READ currentUser WRITE setCurrentUser NOTIFY currentUserChanged)
+    Q_PROPERTY(bool journaled READ journaled WRITE setJournaled NOTIFY journaledChanged)
+    Q_PROPERTY(qint64 compactionThreshold READ compactionThreshold WRITE setCompactionThreshold NOTIFY compactionThresholdChanged)
+    Q_PROPERTY(int saveDelay READ saveDelay WRITE setSaveDelay NOTIFY saveDelayChanged)
+    Q_PROPERTY(bool binaryStorage READ binaryStorage WRITE setBinaryStorage NOTIFY binaryStorageChanged)
+    Q_PROPERTY(bool streamingLoad READ streamingLoad WRITE setStreamingLoad NOTIFY streamingLoadChanged)
+    Q_PROPERTY(int sessionCacheSize READ sessionCacheSize WRITE setSessionCacheSize NOTIFY sessionCacheSizeChanged)
+    Q_PROPERTY(qint64 sessionCacheBytes READ sessionCacheBytes WRITE setSessionCacheBytes NOTIFY sessionCacheBytesChanged)
+    Q_PROPERTY(TaskMetrics* metrics READ metrics WRITE setMetrics NOTIFY metricsChanged)
 
 public:
     explicit AppController(QObject* parent = nullptr);
+    ~AppController() override;
 
     TaskModel* model() const;
     QString storagePath() const;
     QString currentUser() const;
     void setCurrentUser(const QString& username);
 
+    bool journaled() const;
+    void setJournaled(bool journaled);
+    qint64 compactionThreshold() const;
+    void setCompactionThreshold(qint64 bytes);
+    int saveDelay() const;
+    void setSaveDelay(int milliseconds);
+    bool binaryStorage() const;
+    void setBinaryStorage(bool binary);
+    bool streamingLoad() const;
+    void setStreamingLoad(bool streaming);
+    int sessionCacheSize() const;
+    void setSessionCacheSize(int sessions);
+    qint64 sessionCacheBytes() const;
+    void setSessionCacheBytes(qint64 bytes);
+    TaskMetrics* metrics() const;
+    void setMetrics(TaskMetrics* metrics);
+
     Q_INVOKABLE void load();
     Q_INVOKABLE void save();
-    Q_INVOKABLE void exportTasks(const QString& filePath);
+    Q_INVOKABLE void flush();
+    // Format from the extension: .csv, .ndjson/.jsonl, anything else JSON
+    Q_INVOKABLE bool exportTasks(const QString& filePath);
     Q_INVOKABLE void clearTasks();
 
 signals:
     void currentUserChanged();
+    void journaledChanged();
+    void compactionThresholdChanged();
+    void saveDelayChanged();
+    void binaryStorageChanged();
+    void streamingLoadChanged();
+    void sessionCacheSizeChanged();
+    void sessionCacheBytesChanged();
+    void metricsChanged();
+
+private slots:
+    void onRowsInserted(const QModelIndex& parent, int first, int last);
+    void onRowsRemoved(const QModelIndex& parent, int first, int last);
+    void onDataChanged(const QModelIndex& topLeft, const QModelIndex& bottomRight);
+    void onModelReset();
+    void commitPendingSave();
+    void checkStorage();
+    void onFileWritten(const QString& path, const QVector<qint64>& before, const QVector<qint64>& after);
 
 private:
+    // Tasks of a user who is not currently logged in, as last saved. The
+    // fingerprint of their files tells whether the copy is still current.
+    struct UserSession {
+        QString storagePath;
+        TaskStore tasks;
+        qint64 journalBytes = 0;
+        quint64 journalSeq = 0;
+        QVector<qint64> fingerprint;
+        qint64 bytes = 0;
+    };
+
     QString defaultStoragePath() const;
     void updateStoragePath();
+    QString snapshotPath() const;
+    QString snapshotPathFor(const QString& storagePath) const;
+    QString newestSnapshotPath() const;
+    QStringList storageFiles() const;
+    QVector<qint64> storageFingerprint() const;
+    void watchStorage();
+    void reloadFromDisk();
+    bool recordMutation();
+    void postSnapshot();
+    void queueAppend(const QString& storagePath, const QByteArray& records);
+    void queueSnapshot(const QString& storagePath, const TaskStore& tasks, quint64 seq);
+    void waitForWorker();
+    void stashSession();
+    bool restoreSession();
+    void trimSessions();
 
     TaskModel* m_model;
     QString m_storagePath;
     QString m_currentUser;
-};
\ No newline at end of file
+    QString m_dataDir;
+    QHash<QString, QString> m_storagePaths;
+
+    bool m_journaled = true;
+    bool m_binaryStorage = true;
+    bool m_streamingLoad = false;
+    qint64 m_compactionThreshold = 256 * 1024;
+    QByteArray m_pendingRecords;
+    qint64 m_journalBytes = 0;
+    quint64 m_journalSeq = 0;
+    bool m_recording = true;
+    bool m_snapshotDirty = false;
+
+    // Least recently used first
+    QHash<QString, UserSession> m_sessions;
+    QStringList m_sessionOrder;
+    qint64 m_sessionBytes = 0;
+    int m_sessionCacheSize = 4;
+    qint64 m_sessionCacheBytes = 32 * 1024 * 1024;
+
+    QPointer<TaskMetrics> m_metrics;
+
+    // Picks up changes other processes make to the current user's files.
+    // Each of our writes reports the size and mtime it found and left, so a
+    // change that lands between them is still noticed.
+    QFileSystemWatcher m_watcher;
+    QTimer m_reloadTimer;
+    QVector<qint64> m_knownFingerprint;
+    bool m_externalChange = false;
+    int m_pendingJobs = 0;
+
+    QTimer m_saveTimer;
+    QThread m_persistenceThread;
+    PersistenceWorker* m_worker;
+};
@@ -1,28 +1,143 @@
 #include <QGuiApplication>
 #include <QQmlApplicationEngine>
 #include <QCommandLineParser>
+#include <QDir>
+#include <QFile>
+#include <QQuickWindow>
+#include <QSaveFile>
+#include <QStandardPaths>
+#include <cstdio>
+#include <memory>
 #include "controllers/appcontroller.h"
+#include "models/taskfiltermodel.h"
 #include "models/taskmodel.h"
 #include "services/settingsstore.h"
+#include "services/startuptrace.h"
+#include "services/taskexchange.h"
+#include "services/taskmetrics.h"
+#include "services/taskstorage.h"
 
 static QObject* settingsStoreSingletonProvider(QQmlEngine*, QJSEngine*) {
     return new SettingsStore();
 }
 
+// Set application identifiers for QSettings and the data directory
+static void setApplicationIdentifiers(QCoreApplication& app) {
+    app.setOrganizationName("MyOrganization");
+    app.setOrganizationDomain("myorganization.example.com");
+    app.setApplicationName("QtQuickTaskApp");
+}
+
+// Headless bulk import and export of one user's tasks: no window, no QML
+// engine, records streamed between the files in batches. An import must not
+// run while the user is logged in to the app.
+static int runBatch(int argc, char *argv[]) {
+    QCoreApplication app(argc, argv);
+    setApplicationIdentifiers(app);
+
+    QCommandLineParser parser;
+    parser.setApplicationDescription("QtQuickTaskApp batch mode - bulk import and export of a user's tasks");
+    parser.addHelpOption();
+    parser.addVersionOption();
+
+    QCommandLineOption userOption("user", "User whose tasks are imported or exported", "name");
+    QCommandLineOption importOption("import",
+        "Append the tasks in <file> to the user's tasks (- reads stdin)", "file");
+    QCommandLineOption exportOption("export",
+        "Write the user's tasks to <file> (- writes stdout); runs after --import", "file");
+    QCommandLineOption formatOption("format",
+        "json, csv or ndjson (default: from the file extension, otherwise json)", "format");
+    parser.addOptions({userOption, importOption, exportOption, formatOption});
+    parser.process(app);
+
+    const QString user = parser.value(userOption);
+    if (user.isEmpty()) {
+        qWarning("--user is required with --import and --export");
+        return 1;
+    }
+    TaskExchange::Format format = TaskExchange::Format::Json;
+    if (parser.isSet(formatOption) && !TaskExchange::formatFromName(parser.value(formatOption), &format)) {
+        qWarning("Unknown format %s", qPrintable(parser.value(formatOption)));
+        return 1;
+    }
+    auto formatFor = [&](const QString& path) {
+        return parser.isSet(formatOption) ? format : TaskExchange::formatForPath(path);
+    };
+
+    const QString dataDir = QStandardPaths::writableLocation(QStandardPaths::AppDataLocation);
+    QDir().mkpath(dataDir);
+    const QString storagePath = TaskStorage::userStoragePath(dataDir, user);
+    qint64 count = 0;
+    QString error;
+
+    if (parser.isSet(importOption)) {
+        const QString path = parser.value(importOption);
+        QFile input(path);
+        if (!(path == "-" ? input.open(stdin, QIODevice::ReadOnly) : input.open(QIODevice::ReadOnly))) {
+            qWarning("Could not open %s", qPrintable(path));
+            return 1;
+        }
+        if (!TaskExchange::importTasks(storagePath, &input, formatFor(path), &count, &error)) {
+            qWarning("Import failed: %s", qPrintable(error));
+            return 1;
+        }
+        qInfo("Imported %lld tasks for %s", count, qPrintable(user));
+    }
+
+    if (parser.isSet(exportOption)) {
+        const QString path = parser.value(exportOption);
+        QFile standardOutput;
+        QSaveFile file(path);
+        QIODevice* output = &file;
+        if (path == "-") {
+            output = &standardOutput;
+            standardOutput.open(stdout, QIODevice::WriteOnly);
+        } else {
+            file.open(QIODevice::WriteOnly);
+        }
+        if (!output->isOpen()) {
+            qWarning("Could not open %s", qPrintable(path));
+            return 1;
+        }
+        if (!TaskExchange::exportTasks(storagePath, output, formatFor(path), &count, &error)
+            || (path != "-" && !file.commit())) {
+            qWarning("Export failed: %s", qPrintable(error.isEmpty() ? file.errorString() : error));
+            return 1;
+        }
+        qInfo("Exported %lld tasks for %s", count, qPrintable(user));
+    }
+
+    return 0;
+}
+
 int main(int argc, char *argv[]) {
+    StartupTrace trace;
+
     // Enable accessibility by default for automation-scripts and screen reader support
     // NOTE: This must be done BEFORE QGuiApplication is created, but QCommandLineParser requires
     // QGuiApplication to exist. Therefore, we do a simple manual parse first, then set up the
     // proper QCommandLineParser later for help text and documentation.
     
-    // Check if user explicitly disabled accessibility with --no-accessibility flag
+    // Check if user explicitly disabled accessibility with --no-accessibility flag,
+    // whether startup phases should be traced (--startup-trace), and whether
+    // to run headless (--import/--export)
     bool accessibilityDisabled = false;
+    bool batch = false;
     for (int i = 1; i < argc; ++i) {
-        if (QString(argv[i]) == "--no-accessibility") {
+        const QString argument(argv[i]);
+        if (argument == "--no-accessibility") {
             accessibilityDisabled = true;
-            break;
+        } else if (argument == "--startup-trace") {
+            trace.setEnabled(true);
+        } else if (argument == "--import" || argument == "--export"
+                   || argument.startsWith("--import=") || argument.startsWith("--export=")) {
+            batch = true;
         }
     }
+    if (batch) {
+        return runBatch(argc, argv);
+    }
+    trace.mark("process start");
     
     // Enable accessibility by default unless explicitly disabled
     // Note: We check if QT_ACCESSIBILITY is already set to allow users to override
@@ -38,30 +153,46 @@ int main(int argc, char *argv[]) {
     }
     
     QGuiApplication app(argc, argv);
+    trace.mark("application constructed");
 
-    // Set application identifiers for QSettings
-    app.setOrganizationName("MyOrganization");
-    app.setOrganizationDomain("myorganization.example.com");
-    app.setApplicationName("QtQuickTaskApp");
+    setApplicationIdentifiers(app);
     
     // Set up command line parser for help text and documentation
     QCommandLineParser parser;
-    parser.setApplicationDescription("QtQuickTaskApp - A task management application");
+    parser.setApplicationDescription("QtQuickTaskApp - A task management application\n"
+        "Headless batch mode: --user <name> --import|--export <file> [--format json|csv|ndjson]");
     parser.addHelpOption();
     parser.addVersionOption();
     
     QCommandLineOption noAccessibilityOption("no-accessibility",
         "Disable accessibility support (enabled by default)");
     parser.addOption(noAccessibilityOption);
+
+    QCommandLineOption startupTraceOption("startup-trace",
+        "Print timings of the startup phases up to the first rendered frame");
+    parser.addOption(startupTraceOption);
+
+    QCommandLineOption metricsSocketOption("metrics-socket",
+        "Serve performance counters as JSON on the local socket <name>", "name");
+    parser.addOption(metricsSocketOption);
     
     parser.process(app);
 
+    // Declared before the engine so it outlives every QML reference to it
+    TaskMetrics metrics;
+    if (parser.isSet(metricsSocketOption) && !metrics.listen(parser.value(metricsSocketOption))) {
+        qWarning("Could not listen on metrics socket %s", qPrintable(parser.value(metricsSocketOption)));
+    }
+
     QQmlApplicationEngine engine;
+    trace.mark("engine created");
 
     qmlRegisterType<TaskModel>("TaskApp", 1, 0, "TaskModel");
+    qmlRegisterType<TaskFilterModel>("TaskApp", 1, 0, "TaskFilterModel");
     qmlRegisterType<AppController>("TaskApp", 1, 0, "AppController");
     qmlRegisterSingletonType<SettingsStore>("TaskApp", 1, 0, "SettingsStore",
         settingsStoreSingletonProvider);
+    qmlRegisterSingletonInstance("TaskApp", 1, 0, "TaskMetrics", &metrics);
 
     const QUrl url(QStringLiteral("qrc:/screens/AppEntry.qml"));
     QObject::connect(&engine, &QQmlApplicationEngine::objectCreated,
@@ -70,6 +201,23 @@ int main(int argc, char *argv[]) {
                 QCoreApplication::exit(-1);
         }, Qt::QueuedConnection);
 
+    if (trace.isEnabled()) {
+        // Compiled and instantiated; the first swap ends the trace
+        QObject::connect(&engine, &QQmlApplicationEngine::objectCreated,
+            &app, [&trace](QObject *obj, const QUrl&) {
+                trace.mark("QML compiled");
+                auto* window = qobject_cast<QQuickWindow*>(obj);
+                if (!window) return;
+                auto connection = std::make_shared<QMetaObject::Connection>();
+                // Direct: with the threaded render loop this runs on the render thread at swap time
+                *connection = QObject::connect(window, &QQuickWindow::frameSwapped,
+                    window, [&trace, connection]() {
+                        trace.mark("first frame swapped");
+                        QObject::disconnect(*connection);
+                    }, Qt::DirectConnection);
+            });
+    }
+
     engine.load(url);
 
     return app.exec();
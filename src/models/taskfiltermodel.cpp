@@ -0,0 +1,176 @@
+#include "taskfiltermodel.h"
+#include "taskmodel.h"
+
+TaskFilterModel::TaskFilterModel(QObject* parent)
+    : QSortFilterProxyModel(parent) {}
+
+QString TaskFilterModel::searchText() const {
+    return m_searchText;
+}
+
+void TaskFilterModel::setSearchText(const QString& text) {
+    if (m_searchText == text) return;
+    m_searchText = text;
+    updateMatches();
+    invalidateFilter();
+    emit searchTextChanged();
+}
+
+TaskFilterModel::StatusFilter TaskFilterModel::statusFilter() const {
+    return m_statusFilter;
+}
+
+void TaskFilterModel::setStatusFilter(StatusFilter filter) {
+    if (m_statusFilter == filter) return;
+    m_statusFilter = filter;
+    invalidateFilter();
+    emit statusFilterChanged();
+}
+
+void TaskFilterModel::setSourceModel(QAbstractItemModel* model) {
+    for (const QMetaObject::Connection& connection : qAsConst(m_sourceConnections)) {
+        disconnect(connection);
+    }
+    m_sourceConnections.clear();
+
+    // Connected before the base class so the index is current by the time
+    // QSortFilterProxyModel re-runs filterAcceptsRow for the changed rows.
+    if (model) {
+        m_sourceConnections = {
+            connect(model, &QAbstractItemModel::rowsInserted, this,
+                    [this](const QModelIndex&, int first, int last) { indexRows(first, last); }),
+            connect(model, &QAbstractItemModel::rowsAboutToBeRemoved, this,
+                    [this](const QModelIndex&, int first, int last) { unindexRows(first, last); }),
+            connect(model, &QAbstractItemModel::dataChanged, this,
+                    [this](const QModelIndex& topLeft, const QModelIndex& bottomRight, const QVector<int>& roles) {
+                        if (roles.isEmpty() || roles.contains(TaskModel::TitleRole)) {
+                            reindexTitles(topLeft.row(), bottomRight.row());
+                        }
+                    }),
+            connect(model, &QAbstractItemModel::modelReset, this, [this]() { rebuildIndex(); }),
+        };
+    }
+
+    QSortFilterProxyModel::setSourceModel(model);
+    rebuildIndex();
+    invalidateFilter();
+}
+
+bool TaskFilterModel::filterAcceptsRow(int sourceRow, const QModelIndex& sourceParent) const {
+    const QModelIndex index = sourceModel()->index(sourceRow, 0, sourceParent);
+
+    if (m_statusFilter != AllTasks) {
+        const bool done = index.data(TaskModel::DoneRole).toBool();
+        if (done != (m_statusFilter == CompletedTasks)) return false;
+    }
+
+    if (m_foldedQuery.isEmpty()) return true;
+    return m_matches.contains(index.data(TaskModel::IdRole).toInt());
+}
+
+void TaskFilterModel::rebuildIndex() {
+    m_index.clear();
+    m_foldedTitles.clear();
+    m_foldedSpans.clear();
+    m_matches.clear();
+
+    if (sourceModel()) {
+        const int rows = sourceModel()->rowCount();
+        m_foldedSpans.reserve(rows);
+        indexRows(0, rows - 1);
+    }
+    updateMatches();
+}
+
+void TaskFilterModel::indexRows(int first, int last) {
+    for (int row = first; row <= last; ++row) {
+        const QModelIndex index = sourceModel()->index(row, 0);
+        const int id = index.data(TaskModel::IdRole).toInt();
+        const QString folded = TaskSearchIndex::fold(index.data(TaskModel::TitleRole).toString());
+
+        m_index.insert(id, folded);
+        m_foldedSpans.insert(id, m_foldedTitles.store(folded));
+        if (!m_foldedQuery.isEmpty() && folded.contains(m_foldedQuery)) {
+            m_matches.insert(id);
+        }
+    }
+}
+
+void TaskFilterModel::unindexRows(int first, int last) {
+    for (int row = first; row <= last; ++row) {
+        const int id = sourceModel()->index(row, 0).data(TaskModel::IdRole).toInt();
+        const auto stored = m_foldedSpans.constFind(id);
+        if (stored != m_foldedSpans.constEnd()) {
+            m_index.remove(id, m_foldedTitles.title(stored.value()));
+            m_foldedTitles.release(stored.value());
+            m_foldedSpans.erase(stored);
+        }
+        m_matches.remove(id);
+    }
+    compactFolded();
+}
+
+void TaskFilterModel::reindexTitles(int first, int last) {
+    for (int row = first; row <= last; ++row) {
+        const QModelIndex index = sourceModel()->index(row, 0);
+        const int id = index.data(TaskModel::IdRole).toInt();
+        const QString folded = TaskSearchIndex::fold(index.data(TaskModel::TitleRole).toString());
+
+        const auto stored = m_foldedSpans.find(id);
+        if (stored != m_foldedSpans.end()) {
+            const QString previous = m_foldedTitles.title(stored.value());
+            if (previous == folded) continue;
+            m_index.remove(id, previous);
+            m_foldedTitles.replace(stored.value(), folded);
+        } else {
+            m_foldedSpans.insert(id, m_foldedTitles.store(folded));
+        }
+        m_index.insert(id, folded);
+
+        if (!m_foldedQuery.isEmpty() && folded.contains(m_foldedQuery)) {
+            m_matches.insert(id);
+        } else {
+            m_matches.remove(id);
+        }
+    }
+    compactFolded();
+}
+
+void TaskFilterModel::updateMatches() {
+    const QString previousQuery = m_foldedQuery;
+    m_foldedQuery = TaskSearchIndex::fold(m_searchText);
+    if (m_foldedQuery.isEmpty()) {
+        m_matches.clear();
+        return;
+    }
+
+    // While the user keeps typing, the new results are a subset of the old ones
+    QVector<int> candidates;
+    const bool narrowing = !previousQuery.isEmpty() && m_foldedQuery.contains(previousQuery);
+    if (narrowing) {
+        candidates.reserve(m_matches.size());
+        for (int id : qAsConst(m_matches)) candidates.append(id);
+    } else if (!m_index.candidates(m_foldedQuery, candidates)) {
+        candidates = m_foldedSpans.keys().toVector();
+    }
+
+    // Compared as UTF-8, straight from the arena
+    const QByteArray query = m_foldedQuery.toUtf8();
+    QSet<int> matches;
+    matches.reserve(candidates.size());
+    for (int id : qAsConst(candidates)) {
+        const auto stored = m_foldedSpans.constFind(id);
+        if (stored != m_foldedSpans.constEnd() && m_foldedTitles.utf8(stored.value()).contains(query)) {
+            matches.insert(id);
+        }
+    }
+    m_matches.swap(matches);
+}
+
+void TaskFilterModel::compactFolded() {
+    m_foldedTitles.compact([this](auto visit) {
+        for (TitleArena::Span& span : m_foldedSpans) {
+            visit(span);
+        }
+    });
+}
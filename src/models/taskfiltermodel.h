@@ -0,0 +1,62 @@
+#pragma once
+
+#include <QSortFilterProxyModel>
+#include <QHash>
+#include <QSet>
+#include <QString>
+#include <QVector>
+#include "tasksearchindex.h"
+#include "taskstore.h"
+
+// Filter/sort proxy between TaskModel and the task list. Search results come
+// from a trigram index that is updated from the source model's change
+// signals, so a keystroke only verifies the index candidates instead of
+// rescanning every title.
+//
+// The folded titles the matches are confirmed against are kept in a
+// TitleArena, addressed by id, rather than as a QString per task. Even so
+// the search index takes more memory than the task list it covers: each
+// title is held again and every trigram in it costs a posting.
+class TaskFilterModel : public QSortFilterProxyModel {
+    Q_OBJECT
+    Q_PROPERTY(QString searchText READ searchText WRITE setSearchText NOTIFY searchTextChanged)
+    Q_PROPERTY(StatusFilter statusFilter READ statusFilter WRITE setStatusFilter NOTIFY statusFilterChanged)
+
+public:
+    enum StatusFilter { AllTasks, ActiveTasks, CompletedTasks };
+    Q_ENUM(StatusFilter)
+
+    explicit TaskFilterModel(QObject* parent = nullptr);
+
+    QString searchText() const;
+    void setSearchText(const QString& text);
+    StatusFilter statusFilter() const;
+    void setStatusFilter(StatusFilter filter);
+
+    void setSourceModel(QAbstractItemModel* model) override;
+
+signals:
+    void searchTextChanged();
+    void statusFilterChanged();
+
+protected:
+    bool filterAcceptsRow(int sourceRow, const QModelIndex& sourceParent) const override;
+
+private:
+    void rebuildIndex();
+    void indexRows(int first, int last);
+    void unindexRows(int first, int last);
+    void reindexTitles(int first, int last);
+    void updateMatches();
+    void compactFolded();
+
+    StatusFilter m_statusFilter = AllTasks;
+    QString m_searchText;
+    QString m_foldedQuery;
+
+    TaskSearchIndex m_index;
+    TitleArena m_foldedTitles;
+    QHash<int, TitleArena::Span> m_foldedSpans;
+    QSet<int> m_matches;
+    QVector<QMetaObject::Connection> m_sourceConnections;
+};
@@ -1,69 +1,555 @@
 #include "taskmodel.h"
+#include <QElapsedTimer>
+#include <QSet>
+#include <algorithm>
+#include <limits>
+
+namespace {
+
+// Above this many separate removals, moves and insertions applyItems()
+// resets the model instead
+const int MaxDiffSteps = 64;
+
+// Rows exposed per fetchMore() call, roughly a few screenfuls of delegates
+const int FetchBatchSize = 200;
+
+// Time slice spent on background population per idle timer tick
+const int IdleFetchBudgetMs = 4;
+
+QVector<QPair<int, int>> contiguousRuns(const QVector<int>& sortedRows) {
+    QVector<QPair<int, int>> runs;
+    for (int row : sortedRows) {
+        if (!runs.isEmpty() && runs.last().second + 1 == row) {
+            runs.last().second = row;
+        } else {
+            runs.append({row, row});
+        }
+    }
+    return runs;
+}
+
+// Marks the members of one longest strictly increasing subsequence of values
+QVector<bool> longestIncreasing(const QVector<int>& values) {
+    QVector<int> tails;         // index of the last element of the best run of each length
+    QVector<int> previous(values.size(), -1);
+    for (int i = 0; i < values.size(); ++i) {
+        auto it = std::lower_bound(tails.begin(), tails.end(), values.at(i),
+            [&values](int index, int value) { return values.at(index) < value; });
+        if (it != tails.begin()) previous[i] = *(it - 1);
+        if (it == tails.end()) {
+            tails.append(i);
+        } else {
+            *it = i;
+        }
+    }
+
+    QVector<bool> member(values.size(), false);
+    for (int i = tails.isEmpty() ? -1 : tails.constLast(); i >= 0; i = previous.at(i)) {
+        member[i] = true;
+    }
+    return member;
+}
+
+}
 
 TaskModel::TaskModel(QObject* parent)
-    : QAbstractListModel(parent) {}
+    : QAbstractListModel(parent) {
+    m_idleFetchTimer.setInterval(0);
+    connect(&m_idleFetchTimer, &QTimer::timeout, this, &TaskModel::fetchWhileIdle);
+}
 
 int TaskModel::rowCount(const QModelIndex& parent) const {
-    return parent.isValid() ? 0 : m_items.size();
+    return parent.isValid() ? 0 : m_tasks.size();
 }
 
 QVariant TaskModel::data(const QModelIndex& index, int role) const {
-    if (!index.isValid() || index.row() >= m_items.size()) return {};
+    if (!index.isValid() || index.row() >= m_tasks.size()) return {};
 
-    const TaskItem& task = m_items[index.row()];
     switch (role) {
-    case TitleRole: return task.title;
-    case DoneRole: return task.done;
+    case TitleRole: return m_tasks.title(index.row());
+    case DoneRole: return m_tasks.isDone(index.row());
+    case IdRole: return m_tasks.id(index.row());
     }
 
     return {};
 }
 
 QHash<int, QByteArray> TaskModel::roleNames() const {
-    return {{TitleRole, "title"}, {DoneRole, "done"}};
+    // "id" is reserved in QML delegates, so the role is exposed as taskId
+    return {{TitleRole, "title"}, {DoneRole, "done"}, {IdRole, "taskId"}};
+}
+
+bool TaskModel::canFetchMore(const QModelIndex& parent) const {
+    return !parent.isValid() && m_source != nullptr;
+}
+
+void TaskModel::fetchMore(const QModelIndex& parent) {
+    if (parent.isValid() || !m_source) return;
+
+    QVector<TaskItem> batch;
+    m_source->read(batch, FetchBatchSize);
+    appendFetched(batch);
+}
+
+void TaskModel::fetchAll() {
+    if (!m_source) return;
+
+    QVector<TaskItem> rest;
+    rest.reserve(m_sourceCount - m_tasks.size());
+    m_source->read(rest, std::numeric_limits<int>::max());
+    appendFetched(rest);
+}
+
+bool TaskModel::isFetching() const {
+    return m_fetching;
+}
+
+bool TaskModel::loading() const {
+    return m_source != nullptr;
+}
+
+qreal TaskModel::loadProgress() const {
+    if (!m_source || m_sourceCount <= 0) return 1.0;
+    return qreal(m_tasks.size()) / m_sourceCount;
+}
+
+void TaskModel::setSource(TaskSource* source) {
+    const int oldTotal = m_tasks.size();
+    const int oldCompleted = m_completedCount;
+    const bool wasLoading = loading();
+
+    beginResetModel();
+    m_tasks.clear();
+    m_completedCount = 0;
+    // Rows without an id are numbered as they arrive, after every stored id
+    m_nextId = source ? std::max(source->maxId(), 0) + 1 : 1;
+    m_rowById.clear();
+    m_indexDirtyFrom = std::numeric_limits<int>::max();
+    m_source.reset(source);
+    m_sourceCount = source ? source->count() : 0;
+    if (m_source) m_tasks.reserve(m_sourceCount);
+    endResetModel();
+    notifyCounts(oldTotal, oldCompleted);
+
+    if (wasLoading != loading()) emit loadingChanged();
+    emit loadProgressChanged();
+
+    // First screenful now, the rest in idle time or as the view scrolls
+    if (m_source) {
+        fetchMore(QModelIndex());
+        if (m_source) m_idleFetchTimer.start();
+    }
+}
+
+void TaskModel::appendFetched(QVector<TaskItem> batch) {
+    if (!batch.isEmpty()) {
+        const int oldTotal = m_tasks.size();
+        const int oldCompleted = m_completedCount;
+
+        // Journaling and search indexing treat these as loaded, not added
+        m_fetching = true;
+        beginInsertRows(QModelIndex(), m_tasks.size(), m_tasks.size() + batch.size() - 1);
+        for (TaskItem& task : batch) {
+            if (task.id <= 0) task.id = m_nextId++;
+            if (task.done) ++m_completedCount;
+            m_rowById.insert(task.id, m_tasks.size());
+            m_tasks.append(task);
+        }
+        endInsertRows();
+        m_fetching = false;
+
+        notifyCounts(oldTotal, oldCompleted);
+        emit loadProgressChanged();
+    }
+
+    if (m_tasks.size() >= m_sourceCount || batch.isEmpty()) {
+        finishLoading();
+    }
+}
+
+void TaskModel::finishLoading() {
+    if (!m_source) return;
+    m_idleFetchTimer.stop();
+    m_source.reset();
+    emit loadingChanged();
+    emit loadProgressChanged();
+}
+
+void TaskModel::fetchWhileIdle() {
+    QElapsedTimer budget;
+    budget.start();
+    while (m_source && budget.elapsed() < IdleFetchBudgetMs) {
+        fetchMore(QModelIndex());
+    }
+}
+
+int TaskModel::totalCount() const {
+    return m_tasks.size();
+}
+
+int TaskModel::activeCount() const {
+    return m_tasks.size() - m_completedCount;
+}
+
+int TaskModel::completedCount() const {
+    return m_completedCount;
 }
 
 void TaskModel::addTask(const QString& title) {
-    beginInsertRows(QModelIndex(), m_items.size(), m_items.size());
-    m_items.append(TaskItem(title, false));
+    // New tasks go after every loaded task and need an unused id
+    fetchAll();
+    const int oldTotal = m_tasks.size();
+    const int id = m_nextId++;
+    beginInsertRows(QModelIndex(), m_tasks.size(), m_tasks.size());
+    m_tasks.append(TaskItem(title, false, id));
+    m_rowById.insert(id, m_tasks.size() - 1);
     endInsertRows();
+    notifyCounts(oldTotal, m_completedCount);
 }
 
 void TaskModel::removeTask(int row) {
-    if (row < 0 || row >= m_items.size()) return;
+    if (row < 0 || row >= m_tasks.size()) return;
+    const int oldTotal = m_tasks.size();
+    const int oldCompleted = m_completedCount;
     beginRemoveRows(QModelIndex(), row, row);
-    m_items.remove(row);
+    if (m_tasks.isDone(row)) --m_completedCount;
+    m_rowById.remove(m_tasks.id(row));
+    m_tasks.remove(row);
+    markIndexDirty(row);
     endRemoveRows();
+    notifyCounts(oldTotal, oldCompleted);
 }
 
 void TaskModel::toggleTask(int row) {
-    if (row < 0 || row >= m_items.size()) return;
-    m_items[row].done = !m_items[row].done;
+    if (row < 0 || row >= m_tasks.size()) return;
+    const int oldCompleted = m_completedCount;
+    const bool done = !m_tasks.isDone(row);
+    m_tasks.setDone(row, done);
+    m_completedCount += done ? 1 : -1;
     emit dataChanged(index(row), index(row), {DoneRole});
-    emit completedTasksChanged();
+    notifyCounts(m_tasks.size(), oldCompleted);
 }
 
 void TaskModel::clearCompleted() {
-    for (int i = m_items.size() - 1; i >= 0; --i) {
-        if (m_items[i].done) removeTask(i);
+    fetchAll();
+    QVector<int> rows;
+    for (int i = 0; i < m_tasks.size(); ++i) {
+        if (m_tasks.isDone(i)) rows.append(i);
+    }
+    if (rows.isEmpty()) return;
+
+    const int oldTotal = m_tasks.size();
+    const int oldCompleted = m_completedCount;
+    removeSortedRows(rows);
+    notifyCounts(oldTotal, oldCompleted);
+}
+
+void TaskModel::addTasks(const QStringList& titles) {
+    if (titles.isEmpty()) return;
+    fetchAll();
+
+    const int first = m_tasks.size();
+    const int oldTotal = first;
+    beginInsertRows(QModelIndex(), first, first + titles.size() - 1);
+    m_tasks.reserve(first + titles.size());
+    for (const QString& title : titles) {
+        const int id = m_nextId++;
+        m_tasks.append(TaskItem(title, false, id));
+        m_rowById.insert(id, m_tasks.size() - 1);
     }
-    emit completedTasksChanged();
+    endInsertRows();
+    notifyCounts(oldTotal, m_completedCount);
+}
+
+void TaskModel::removeTasks(const QList<int>& rows) {
+    QVector<int> sorted;
+    sorted.reserve(rows.size());
+    for (int row : rows) {
+        if (row >= 0 && row < m_tasks.size()) sorted.append(row);
+    }
+    if (sorted.isEmpty()) return;
+
+    std::sort(sorted.begin(), sorted.end());
+    sorted.erase(std::unique(sorted.begin(), sorted.end()), sorted.end());
+
+    const int oldTotal = m_tasks.size();
+    const int oldCompleted = m_completedCount;
+    removeSortedRows(sorted);
+    notifyCounts(oldTotal, oldCompleted);
+}
+
+void TaskModel::setDone(const QList<int>& rows, bool done) {
+    const int oldCompleted = m_completedCount;
+    QVector<int> changed;
+    for (int row : rows) {
+        if (row < 0 || row >= m_tasks.size() || m_tasks.isDone(row) == done) continue;
+        m_tasks.setDone(row, done);
+        changed.append(row);
+    }
+    if (changed.isEmpty()) return;
+
+    m_completedCount += done ? changed.size() : -changed.size();
+    std::sort(changed.begin(), changed.end());
+    for (const QPair<int, int>& run : contiguousRuns(changed)) {
+        emit dataChanged(index(run.first), index(run.second), {DoneRole});
+    }
+    notifyCounts(m_tasks.size(), oldCompleted);
 }
 
 bool TaskModel::hasCompletedTasks() const {
-    for (const TaskItem& task : m_items) {
-        if (task.done) return true;
+    return m_completedCount > 0;
+}
+
+int TaskModel::find(int id) const {
+    auto it = m_rowById.constFind(id);
+    if (it != m_rowById.constEnd() && it.value() < m_indexDirtyFrom) return it.value();
+    if (m_indexDirtyFrom >= m_tasks.size()) return it != m_rowById.constEnd() ? it.value() : -1;
+
+    // Refresh only the rows that shifted since the last lookup
+    for (int row = m_indexDirtyFrom; row < m_tasks.size(); ++row) {
+        m_rowById.insert(m_tasks.id(row), row);
     }
-    return false;
+    m_indexDirtyFrom = std::numeric_limits<int>::max();
+    return m_rowById.value(id, -1);
+}
+
+void TaskModel::toggleById(int id) {
+    const int row = find(id);
+    if (row >= 0) toggleTask(row);
+}
+
+void TaskModel::removeById(int id) {
+    const int row = find(id);
+    if (row >= 0) removeTask(row);
+}
+
+void TaskModel::renameById(int id, const QString& title) {
+    const int row = find(id);
+    if (row < 0 || m_tasks.title(row) == title) return;
+    m_tasks.setTitle(row, title);
+    emit dataChanged(index(row), index(row), {TitleRole});
 }
 
-QVector<TaskItem> TaskModel::items() const {
-    return m_items;
+// While loading lazily this holds only the rows fetched so far
+const TaskStore& TaskModel::tasks() const {
+    return m_tasks;
+}
+
+void TaskModel::removeSortedRows(const QVector<int>& rows) {
+    const QVector<QPair<int, int>> runs = contiguousRuns(rows);
+
+    // Bottom-up so earlier runs keep their row numbers. TaskStore leaves a
+    // gap behind each run, so every surviving row is shifted at most once.
+    for (int i = runs.size() - 1; i >= 0; --i) {
+        const int first = runs.at(i).first;
+        const int last = runs.at(i).second;
+        beginRemoveRows(QModelIndex(), first, last);
+        for (int row = first; row <= last; ++row) {
+            if (m_tasks.isDone(row)) --m_completedCount;
+            m_rowById.remove(m_tasks.id(row));
+        }
+        m_tasks.remove(first, last - first + 1);
+        markIndexDirty(first);
+        endRemoveRows();
+    }
 }
 
 void TaskModel::setItems(const QVector<TaskItem>& items) {
+    setTasks(TaskStore(items));
+}
+
+void TaskModel::setTasks(const TaskStore& tasks) {
+    const int oldTotal = m_tasks.size();
+    const int oldCompleted = m_completedCount;
+    const bool wasLoading = loading();
+    m_idleFetchTimer.stop();
     beginResetModel();
-    m_items = items;
+    m_source.reset();
+    m_tasks = tasks;
+    // Tasks from files written before ids existed get fresh ones
+    m_nextId = 1;
+    bool missingIds = false;
+    m_completedCount = 0;
+    for (int row = 0; row < m_tasks.size(); ++row) {
+        m_nextId = std::max(m_nextId, m_tasks.id(row) + 1);
+        if (m_tasks.id(row) <= 0) missingIds = true;
+        if (m_tasks.isDone(row)) ++m_completedCount;
+    }
+    if (missingIds) {
+        for (int row = 0; row < m_tasks.size(); ++row) {
+            if (m_tasks.id(row) <= 0) m_tasks.setId(row, m_nextId++);
+        }
+    }
+    m_rowById.clear();
+    m_indexDirtyFrom = 0;
     endResetModel();
-    emit completedTasksChanged();
+    notifyCounts(oldTotal, oldCompleted);
+    if (wasLoading) {
+        emit loadingChanged();
+        emit loadProgressChanged();
+    }
+}
+
+void TaskModel::applyItems(const QVector<TaskItem>& newItems) {
+    // A diff needs every current row
+    if (m_source) {
+        setItems(newItems);
+        return;
+    }
+
+    // Tasks without an id take over the id of a current task with the same
+    // title that no other new task claims by id; the rest are numbered as
+    // new tasks
+    QVector<TaskItem> items = newItems;
+    QSet<int> claimedIds;
+    int maxId = 0;
+    bool missingIds = false;
+    for (const TaskItem& task : items) {
+        if (task.id > 0) {
+            claimedIds.insert(task.id);
+            maxId = std::max(maxId, task.id);
+        } else {
+            missingIds = true;
+        }
+    }
+    if (missingIds) {
+        // Built from the bottom so takeLast() hands out the topmost row first
+        QHash<QString, QVector<int>> unclaimedIds;
+        for (int row = m_tasks.size() - 1; row >= 0; --row) {
+            if (!claimedIds.contains(m_tasks.id(row))) unclaimedIds[m_tasks.title(row)].append(m_tasks.id(row));
+        }
+        int nextId = std::max(m_nextId, maxId + 1);
+        for (TaskItem& task : items) {
+            if (task.id > 0) continue;
+            auto it = unclaimedIds.find(task.title);
+            task.id = it != unclaimedIds.end() && !it->isEmpty() ? it->takeLast() : nextId++;
+        }
+    }
+
+    QHash<int, int> targetRows;
+    targetRows.reserve(items.size());
+    for (int row = 0; row < items.size(); ++row) {
+        const int id = items.at(row).id;
+        if (targetRows.contains(id)) {
+            setItems(items);
+            return;
+        }
+        targetRows.insert(id, row);
+    }
+
+    // Plan: rows to remove, survivors that have to move, runs of new rows.
+    // Survivors on one longest increasing run of target rows stay put.
+    QVector<int> removed;
+    QVector<int> survivorTargets;
+    QHash<int, bool> survivorIds;
+    for (int row = 0; row < m_tasks.size(); ++row) {
+        const int id = m_tasks.id(row);
+        auto it = targetRows.constFind(id);
+        if (it == targetRows.constEnd()) {
+            removed.append(row);
+        } else {
+            survivorTargets.append(it.value());
+            survivorIds.insert(id, true);
+        }
+    }
+    const QVector<bool> stable = longestIncreasing(survivorTargets);
+    int steps = contiguousRuns(removed).size() + static_cast<int>(std::count(stable.cbegin(), stable.cend(), false));
+    for (int row = 0; row < items.size(); ++row) {
+        const bool isNew = !survivorIds.contains(items.at(row).id);
+        if (isNew && (row == 0 || survivorIds.contains(items.at(row - 1).id))) ++steps;
+    }
+    if (steps > MaxDiffSteps) {
+        setItems(items);
+        return;
+    }
+    for (int k = 0; k < survivorTargets.size(); ++k) {
+        survivorIds[items.at(survivorTargets.at(k)).id] = stable.at(k);
+    }
+
+    const int oldTotal = m_tasks.size();
+    const int oldCompleted = m_completedCount;
+
+    if (!removed.isEmpty()) removeSortedRows(removed);
+
+    // Each moving task goes right after the task that precedes it in the new
+    // order; processed in that order, this leaves the survivors sorted.
+    int previousId = 0;
+    for (const TaskItem& target : items) {
+        auto it = survivorIds.constFind(target.id);
+        if (it == survivorIds.constEnd()) continue;
+        if (!it.value()) {
+            const int from = scanRow(target.id);
+            const int destination = previousId ? scanRow(previousId) + 1 : 0;
+            if (destination != from && destination != from + 1) {
+                beginMoveRows(QModelIndex(), from, from, QModelIndex(), destination);
+                m_tasks.move(from, from < destination ? destination - 1 : destination);
+                markIndexDirty(std::min(from, destination));
+                endMoveRows();
+            }
+        }
+        previousId = target.id;
+    }
+
+    for (int row = 0; row < items.size();) {
+        if (survivorIds.contains(items.at(row).id)) {
+            ++row;
+            continue;
+        }
+        int end = row;
+        while (end < items.size() && !survivorIds.contains(items.at(end).id)) ++end;
+        beginInsertRows(QModelIndex(), row, end - 1);
+        for (int i = row; i < end; ++i) {
+            m_tasks.insert(i, items.at(i));
+            m_rowById.insert(items.at(i).id, i);
+            m_nextId = std::max(m_nextId, items.at(i).id + 1);
+        }
+        markIndexDirty(row);
+        endInsertRows();
+        row = end;
+    }
+
+    QVector<int> retitled;
+    QVector<int> toggled;
+    m_completedCount = 0;
+    for (int row = 0; row < m_tasks.size(); ++row) {
+        const TaskItem& target = items.at(row);
+        if (m_tasks.title(row) != target.title) {
+            m_tasks.setTitle(row, target.title);
+            retitled.append(row);
+        }
+        if (m_tasks.isDone(row) != target.done) {
+            m_tasks.setDone(row, target.done);
+            toggled.append(row);
+        }
+        if (target.done) ++m_completedCount;
+    }
+    for (const QPair<int, int>& run : contiguousRuns(retitled)) {
+        emit dataChanged(index(run.first), index(run.second), {TitleRole});
+    }
+    for (const QPair<int, int>& run : contiguousRuns(toggled)) {
+        emit dataChanged(index(run.first), index(run.second), {DoneRole});
+    }
+    notifyCounts(oldTotal, oldCompleted);
+}
+
+// Row of id by linear search, for use while rows are being moved
+int TaskModel::scanRow(int id) const {
+    for (int row = 0; row < m_tasks.size(); ++row) {
+        if (m_tasks.id(row) == id) return row;
+    }
+    return -1;
+}
+
+void TaskModel::markIndexDirty(int row) {
+    m_indexDirtyFrom = std::min(m_indexDirtyFrom, row);
+}
+
+void TaskModel::notifyCounts(int oldTotal, int oldCompleted) {
+    const int total = m_tasks.size();
+    if (total != oldTotal) emit totalCountChanged();
+    if (m_completedCount != oldCompleted) {
+        emit completedCountChanged();
+        emit completedTasksChanged();
+    }
+    if (total - m_completedCount != oldTotal - oldCompleted) emit activeCountChanged();
 }
\ No newline at end of file
@@ -1,41 +1,147 @@
 #pragma once
 
 #include <QAbstractListModel>
+#include <QHash>
 #include <QObject>
+#include <QList>
 #include <QString>
+#include <QStringList>
+#include <QTimer>
 #include <QVector>
+#include <algorithm>
+#include <memory>
+#include "taskstore.h"
 
 struct TaskItem {
     QString title;
     bool done;
-    TaskItem(const QString& title = "", bool done = false)
-        : title(title), done(done) {}
+    int id;
+    TaskItem(const QString& title = "", bool done = false, int id = 0)
+        : title(title), done(done), id(id) {}
+};
+Q_DECLARE_TYPEINFO(TaskItem, Q_MOVABLE_TYPE);
+
+// Supplies tasks to TaskModel in batches for lazy population
+class TaskSource {
+public:
+    virtual ~TaskSource() = default;
+    // Total number of tasks the source delivers
+    virtual int count() const = 0;
+    // Appends up to max tasks to out and returns how many were appended
+    virtual int read(QVector<TaskItem>& out, int max) = 0;
+    // Largest id among all tasks, so tasks without one can be numbered
+    // before the rest have been read
+    virtual int maxId() const = 0;
+};
+
+class VectorTaskSource : public TaskSource {
+public:
+    explicit VectorTaskSource(const QVector<TaskItem>& items)
+        : m_items(items) {
+        for (const TaskItem& task : items) m_maxId = std::max(m_maxId, task.id);
+    }
+
+    int count() const override { return m_items.size(); }
+    int maxId() const override { return m_maxId; }
+    int read(QVector<TaskItem>& out, int max) override {
+        const int n = qMin(max, m_items.size() - m_position);
+        out.append(m_items.mid(m_position, n));
+        m_position += n;
+        return n;
+    }
+
+private:
+    QVector<TaskItem> m_items;
+    int m_position = 0;
+    int m_maxId = 0;
 };
 
 class TaskModel : public QAbstractListModel {
     Q_OBJECT
+    Q_PROPERTY(int totalCount READ totalCount NOTIFY totalCountChanged)
+    Q_PROPERTY(int activeCount READ activeCount NOTIFY activeCountChanged)
+    Q_PROPERTY(int completedCount READ completedCount NOTIFY completedCountChanged)
+    Q_PROPERTY(bool loading READ loading NOTIFY loadingChanged)
+    Q_PROPERTY(qreal loadProgress READ loadProgress NOTIFY loadProgressChanged)
 
 public:
-    enum Roles { TitleRole = Qt::UserRole + 1, DoneRole };
+    enum Roles { TitleRole = Qt::UserRole + 1, DoneRole, IdRole };
 
     explicit TaskModel(QObject* parent = nullptr);
 
     int rowCount(const QModelIndex& parent = QModelIndex()) const override;
     QVariant data(const QModelIndex& index, int role) const override;
     QHash<int, QByteArray> roleNames() const override;
+    bool canFetchMore(const QModelIndex& parent) const override;
+    void fetchMore(const QModelIndex& parent) override;
+
+    int totalCount() const;
+    int activeCount() const;
+    int completedCount() const;
+    bool loading() const;
+    qreal loadProgress() const;
 
     Q_INVOKABLE void addTask(const QString& title);
     Q_INVOKABLE void removeTask(int row);
     Q_INVOKABLE void toggleTask(int row);
     Q_INVOKABLE void clearCompleted();
+    Q_INVOKABLE void addTasks(const QStringList& titles);
+    Q_INVOKABLE void removeTasks(const QList<int>& rows);
+    Q_INVOKABLE void setDone(const QList<int>& rows, bool done);
     Q_INVOKABLE bool hasCompletedTasks() const;
 
-    QVector<TaskItem> items() const;
+    // Tasks keep their id across edits, removals of other rows and reloads.
+    // find() is a hash lookup, except that the first lookup after a removal
+    // at row r re-indexes rows r..end: O(n - r) after a removal.
+    Q_INVOKABLE int find(int id) const;
+    Q_INVOKABLE void toggleById(int id);
+    Q_INVOKABLE void removeById(int id);
+    Q_INVOKABLE void renameById(int id, const QString& title);
+
+    // Read-only view of the rows; copy it to keep a snapshot
+    const TaskStore& tasks() const;
+    void setTasks(const TaskStore& tasks);
     void setItems(const QVector<TaskItem>& items);
+    // Like setItems(), but matches tasks by id and emits only the removals,
+    // moves, insertions and dataChanged needed to get there. Tasks without an
+    // id are matched by title to current tasks not claimed by id, or added
+    // with a fresh id. Falls back to a reset for large diffs and duplicate ids.
+    void applyItems(const QVector<TaskItem>& newItems);
+
+    // Resets the model to empty and fills it from source: the first batch
+    // right away, the rest on fetchMore() or when the event loop is idle.
+    void setSource(TaskSource* source);
+    Q_INVOKABLE void fetchAll();
+    bool isFetching() const;
 
 signals:
     void completedTasksChanged();
+    void totalCountChanged();
+    void activeCountChanged();
+    void completedCountChanged();
+    void loadingChanged();
+    void loadProgressChanged();
 
 private:
-    QVector<TaskItem> m_items;
+    void removeSortedRows(const QVector<int>& rows);
+    int scanRow(int id) const;
+    void notifyCounts(int oldTotal, int oldCompleted);
+    void markIndexDirty(int row);
+    void appendFetched(QVector<TaskItem> batch);
+    void finishLoading();
+    void fetchWhileIdle();
+
+    TaskStore m_tasks;
+    int m_completedCount = 0;
+    int m_nextId = 1;
+
+    // id -> row; entries at or after m_indexDirtyFrom may be stale after a
+    // removal and are refreshed on the next lookup that needs them.
+    mutable QHash<int, int> m_rowById;
+    mutable int m_indexDirtyFrom = 0;
+
+    std::unique_ptr<TaskSource> m_source;
+    int m_sourceCount = 0;
+    bool m_fetching = false;
+    QTimer m_idleFetchTimer;
 };
\ No newline at end of file
@@ -0,0 +1,79 @@
+#include "tasksearchindex.h"
+#include <algorithm>
+#include <iterator>
+
+QString TaskSearchIndex::fold(const QString& text) {
+    return text.toCaseFolded();
+}
+
+QVector<quint64> TaskSearchIndex::trigrams(QStringView folded) {
+    QVector<quint64> result;
+    if (folded.size() < 3) return result;
+
+    result.reserve(int(folded.size()) - 2);
+    const QChar* data = folded.data();
+    for (int i = 0; i + 2 < folded.size(); ++i) {
+        result.append(quint64(data[i].unicode()) << 32
+                      | quint64(data[i + 1].unicode()) << 16
+                      | quint64(data[i + 2].unicode()));
+    }
+    std::sort(result.begin(), result.end());
+    result.erase(std::unique(result.begin(), result.end()), result.end());
+    return result;
+}
+
+void TaskSearchIndex::clear() {
+    m_postings.clear();
+}
+
+void TaskSearchIndex::insert(int id, QStringView foldedTitle) {
+    for (quint64 trigram : trigrams(foldedTitle)) {
+        QVector<int>& ids = m_postings[trigram];
+        if (ids.isEmpty() || ids.constLast() < id) {
+            ids.append(id);
+        } else {
+            auto it = std::lower_bound(ids.begin(), ids.end(), id);
+            if (it == ids.end() || *it != id) ids.insert(it, id);
+        }
+    }
+}
+
+void TaskSearchIndex::remove(int id, QStringView foldedTitle) {
+    for (quint64 trigram : trigrams(foldedTitle)) {
+        auto posting = m_postings.find(trigram);
+        if (posting == m_postings.end()) continue;
+
+        QVector<int>& ids = posting.value();
+        auto it = std::lower_bound(ids.begin(), ids.end(), id);
+        if (it != ids.end() && *it == id) ids.erase(it);
+        if (ids.isEmpty()) m_postings.erase(posting);
+    }
+}
+
+bool TaskSearchIndex::candidates(const QString& foldedQuery, QVector<int>& ids) const {
+    ids.clear();
+    const QVector<quint64> queryTrigrams = trigrams(foldedQuery);
+    if (queryTrigrams.isEmpty()) return false;
+
+    // Intersect the shortest posting lists first
+    QVector<const QVector<int>*> lists;
+    lists.reserve(queryTrigrams.size());
+    for (quint64 trigram : queryTrigrams) {
+        auto posting = m_postings.constFind(trigram);
+        if (posting == m_postings.constEnd()) return true;
+        lists.append(&posting.value());
+    }
+    std::sort(lists.begin(), lists.end(), [](const QVector<int>* a, const QVector<int>* b) {
+        return a->size() < b->size();
+    });
+
+    ids = *lists.constFirst();
+    QVector<int> next;
+    for (int i = 1; i < lists.size() && !ids.isEmpty(); ++i) {
+        next.clear();
+        std::set_intersection(ids.cbegin(), ids.cend(), lists.at(i)->cbegin(), lists.at(i)->cend(),
+                              std::back_inserter(next));
+        ids.swap(next);
+    }
+    return true;
+}
@@ -0,0 +1,27 @@
+#pragma once
+
+#include <QHash>
+#include <QString>
+#include <QStringView>
+#include <QVector>
+
+// Trigram index over task titles, keyed by task id. Posting lists are kept
+// sorted by id; since new tasks get increasing ids, adding a task appends.
+class TaskSearchIndex {
+public:
+    static QString fold(const QString& text);
+
+    void clear();
+    void insert(int id, QStringView foldedTitle);
+    void remove(int id, QStringView foldedTitle);
+
+    // Returns false when the query is too short to use the index. Otherwise
+    // fills ids with every task whose title contains all of the query's
+    // trigrams; callers still confirm the substring match.
+    bool candidates(const QString& foldedQuery, QVector<int>& ids) const;
+
+private:
+    static QVector<quint64> trigrams(QStringView folded);
+
+    QHash<quint64, QVector<int>> m_postings;
+};
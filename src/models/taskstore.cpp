@@ -0,0 +1,265 @@
+#include "taskstore.h"
+#include "taskmodel.h"
+#include <cstring>
+
+namespace {
+
+// Arenas smaller than this are never compacted
+const int MinCompactionBytes = 4096;
+
+// The done column packs one flag per row, least significant bit first
+
+bool bitAt(const uchar* bits, int i) {
+    return (bits[i >> 3] >> (i & 7)) & 1;
+}
+
+void putBit(uchar* bits, int i, bool on) {
+    const uchar mask = uchar(1u << (i & 7));
+    bits[i >> 3] = on ? uchar(bits[i >> 3] | mask) : uchar(bits[i >> 3] & ~mask);
+}
+
+// The 8 flags starting at bit i; byteCount bounds the second byte read
+uchar byteAt(const uchar* bits, int byteCount, int i) {
+    const int index = i >> 3;
+    const int shift = i & 7;
+    unsigned value = bits[index];
+    if (shift && index + 1 < byteCount) value |= unsigned(bits[index + 1]) << 8;
+    return uchar(value >> shift);
+}
+
+// memmove() for bit ranges: copies count flags from bit from to bit to.
+// Single bits are copied only up to the first destination byte boundary and
+// after the last one; everything in between goes a whole byte at a time.
+void moveBits(uchar* bits, int byteCount, int to, int from, int count) {
+    if (count <= 0 || to == from) return;
+    if (to < from) {
+        int i = 0;
+        for (; i < count && ((to + i) & 7); ++i) putBit(bits, to + i, bitAt(bits, from + i));
+        for (; i + 8 <= count; i += 8) bits[(to + i) >> 3] = byteAt(bits, byteCount, from + i);
+        for (; i < count; ++i) putBit(bits, to + i, bitAt(bits, from + i));
+    } else {
+        int n = count;
+        for (; n > 0 && ((to + n) & 7); --n) putBit(bits, to + n - 1, bitAt(bits, from + n - 1));
+        for (; n >= 8; n -= 8) bits[(to + n - 8) >> 3] = byteAt(bits, byteCount, from + n - 8);
+        for (; n > 0; --n) putBit(bits, to + n - 1, bitAt(bits, from + n - 1));
+    }
+}
+
+int bitBytes(int count) {
+    return (count + 7) / 8;
+}
+
+}
+
+TaskItem TaskStore::const_iterator::operator*() const {
+    return m_store->at(m_row);
+}
+
+TaskStore::TaskStore(const QVector<TaskItem>& items) {
+    reserve(items.size());
+    for (const TaskItem& task : items) {
+        append(task);
+    }
+}
+
+int TaskStore::size() const {
+    return m_ids.size() - m_gapLength;
+}
+
+bool TaskStore::isEmpty() const {
+    return size() == 0;
+}
+
+TaskItem TaskStore::at(int row) const {
+    return TaskItem(title(row), isDone(row), id(row));
+}
+
+QString TaskStore::title(int row) const {
+    return m_arena.title(m_spans.at(physical(row)));
+}
+
+bool TaskStore::isDone(int row) const {
+    return bitAt(reinterpret_cast<const uchar*>(m_done.constData()), physical(row));
+}
+
+int TaskStore::id(int row) const {
+    return m_ids.at(physical(row));
+}
+
+TaskStore::const_iterator TaskStore::begin() const {
+    return const_iterator(this, 0);
+}
+
+TaskStore::const_iterator TaskStore::end() const {
+    return const_iterator(this, size());
+}
+
+QVector<TaskItem> TaskStore::mid(int row, int count) const {
+    QVector<TaskItem> items;
+    items.reserve(count);
+    for (int i = row; i < row + count; ++i) {
+        items.append(at(i));
+    }
+    return items;
+}
+
+QVector<TaskItem> TaskStore::toVector() const {
+    return mid(0, size());
+}
+
+void TaskStore::reserve(int count) {
+    m_spans.reserve(count);
+    m_ids.reserve(count);
+    m_done.reserve(bitBytes(count));
+}
+
+void TaskStore::clear() {
+    m_arena.clear();
+    m_spans.clear();
+    m_ids.clear();
+    m_done.clear();
+    m_gapStart = 0;
+    m_gapLength = 0;
+}
+
+void TaskStore::append(const TaskItem& task) {
+    insert(size(), task);
+}
+
+void TaskStore::insert(int row, const TaskItem& task) {
+    closeGap();
+    m_spans.insert(row, m_arena.store(task.title));
+    m_ids.insert(row, task.id);
+    const int count = size();
+    m_done.resize(bitBytes(count));
+    uchar* bits = reinterpret_cast<uchar*>(m_done.data());
+    moveBits(bits, m_done.size(), row + 1, row, count - 1 - row);
+    putBit(bits, row, task.done);
+}
+
+void TaskStore::remove(int row, int count) {
+    moveGap(row + count);
+    for (int i = row; i < row + count; ++i) {
+        m_arena.release(m_spans.at(i));
+    }
+    m_gapStart = row;
+    m_gapLength += count;
+    compactArena();
+}
+
+void TaskStore::move(int from, int to) {
+    if (from == to) return;
+    closeGap();
+    m_spans.move(from, to);
+    m_ids.move(from, to);
+    uchar* bits = reinterpret_cast<uchar*>(m_done.data());
+    const bool done = bitAt(bits, from);
+    if (from < to) {
+        moveBits(bits, m_done.size(), from, from + 1, to - from);
+    } else {
+        moveBits(bits, m_done.size(), to + 1, to, from - to);
+    }
+    putBit(bits, to, done);
+}
+
+void TaskStore::setTitle(int row, const QString& title) {
+    m_arena.replace(m_spans[physical(row)], title);
+    compactArena();
+}
+
+void TaskStore::setDone(int row, bool done) {
+    putBit(reinterpret_cast<uchar*>(m_done.data()), physical(row), done);
+}
+
+void TaskStore::setId(int row, int id) {
+    m_ids[physical(row)] = id;
+}
+
+qint64 TaskStore::memoryUsage() const {
+    return m_arena.capacity()
+        + qint64(m_spans.capacity()) * qint64(sizeof(Span))
+        + qint64(m_ids.capacity()) * qint64(sizeof(qint32))
+        + qint64(m_done.capacity());
+}
+
+void TaskStore::moveGap(int row) {
+    if (m_gapLength == 0 || row == m_gapStart) {
+        m_gapStart = row;
+        return;
+    }
+
+    // The rows between row and the gap trade places with it
+    const int from = row < m_gapStart ? row : m_gapStart + m_gapLength;
+    const int to = row < m_gapStart ? row + m_gapLength : m_gapStart;
+    const int count = row < m_gapStart ? m_gapStart - row : row - m_gapStart;
+    Span* spans = m_spans.data();
+    qint32* ids = m_ids.data();
+    std::memmove(spans + to, spans + from, size_t(count) * sizeof(Span));
+    std::memmove(ids + to, ids + from, size_t(count) * sizeof(qint32));
+    moveBits(reinterpret_cast<uchar*>(m_done.data()), m_done.size(), to, from, count);
+    m_gapStart = row;
+}
+
+void TaskStore::closeGap() {
+    if (m_gapLength == 0) return;
+    const int count = size();
+    moveGap(count);
+    m_spans.resize(count);
+    m_ids.resize(count);
+    m_done.resize(bitBytes(count));
+    m_gapLength = 0;
+}
+
+void TaskStore::compactArena() {
+    m_arena.compact([this](auto visit) {
+        for (int row = 0; row < size(); ++row) {
+            visit(m_spans[physical(row)]);
+        }
+    });
+}
+
+TitleArena::Span TitleArena::store(const QString& title) {
+    const QByteArray bytes = title.toUtf8();
+    const Span span{quint32(m_bytes.size()), quint32(bytes.size())};
+    m_bytes.append(bytes);
+    return span;
+}
+
+QString TitleArena::title(const Span& span) const {
+    return QString::fromUtf8(m_bytes.constData() + span.offset, static_cast<int>(span.length));
+}
+
+QByteArray TitleArena::utf8(const Span& span) const {
+    return QByteArray::fromRawData(m_bytes.constData() + span.offset, static_cast<int>(span.length));
+}
+
+void TitleArena::replace(Span& span, const QString& title) {
+    const QByteArray bytes = title.toUtf8();
+    if (quint32(bytes.size()) <= span.length) {
+        // Shorter or equal titles overwrite the old bytes
+        std::memcpy(m_bytes.data() + span.offset, bytes.constData(), size_t(bytes.size()));
+        m_deadBytes += span.length - quint32(bytes.size());
+        span.length = quint32(bytes.size());
+    } else {
+        m_deadBytes += span.length;
+        span = Span{quint32(m_bytes.size()), quint32(bytes.size())};
+        m_bytes.append(bytes);
+    }
+}
+
+void TitleArena::release(const Span& span) {
+    m_deadBytes += span.length;
+}
+
+void TitleArena::clear() {
+    m_bytes.clear();
+    m_deadBytes = 0;
+}
+
+qint64 TitleArena::capacity() const {
+    return m_bytes.capacity();
+}
+
+bool TitleArena::compactionDue() const {
+    return m_bytes.size() >= MinCompactionBytes && m_deadBytes * 2 > m_bytes.size();
+}
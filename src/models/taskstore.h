@@ -0,0 +1,140 @@
+#pragma once
+
+#include <QByteArray>
+#include <QString>
+#include <QVector>
+#include <iterator>
+
+struct TaskItem;
+
+// Titles as UTF-8, packed into one byte array and addressed by Span. Titles
+// that are replaced or released leave dead bytes behind; compact() rewrites
+// the live ones into a fresh array once dead bytes make up more than half.
+class TitleArena {
+public:
+    struct Span {
+        quint32 offset;
+        quint32 length;
+    };
+
+    Span store(const QString& title);
+    QString title(const Span& span) const;
+    // The title's bytes without a copy; valid until the arena next changes
+    QByteArray utf8(const Span& span) const;
+    // Overwrites the old bytes when the new title fits, else stores it anew
+    void replace(Span& span, const QString& title);
+    void release(const Span& span);
+    void clear();
+    qint64 capacity() const;
+
+    // forEachSpan(visit) must call visit(Span&) for every live span; each
+    // is moved to its offset in the new array
+    template <typename ForEachSpan>
+    void compact(ForEachSpan forEachSpan);
+
+private:
+    bool compactionDue() const;
+
+    QByteArray m_bytes;
+    qint64 m_deadBytes = 0;
+};
+
+Q_DECLARE_TYPEINFO(TitleArena::Span, Q_PRIMITIVE_TYPE);
+
+template <typename ForEachSpan>
+void TitleArena::compact(ForEachSpan forEachSpan) {
+    if (!compactionDue()) return;
+
+    QByteArray bytes;
+    bytes.reserve(int(m_bytes.size() - m_deadBytes));
+    forEachSpan([&](Span& span) {
+        const quint32 offset = quint32(bytes.size());
+        bytes.append(m_bytes.constData() + span.offset, int(span.length));
+        span.offset = offset;
+    });
+    m_bytes = bytes;
+    m_deadBytes = 0;
+}
+
+// Column storage behind TaskModel: titles in a TitleArena, done
+// flags in a bitset and ids in a flat array. That is 12 bytes and a bit per
+// task plus the title bytes, where a QVector<TaskItem> spends a padded
+// 16-byte element and a separate UTF-16 QString allocation per task. Every
+// column is implicitly shared, so copies handed to the persistence thread
+// or the session cache cost next to nothing.
+//
+// Removed rows become a gap in the columns rather than being shifted out
+// right away. The next removal only moves the rows between it and the gap,
+// so removing several runs from the last to the first shifts every
+// remaining row at most once. Inserts and moves close the gap first.
+class TaskStore {
+public:
+    using Span = TitleArena::Span;
+
+    // Read-only forward iteration; dereferencing decodes one TaskItem
+    class const_iterator {
+    public:
+        using iterator_category = std::forward_iterator_tag;
+        using value_type = TaskItem;
+        using difference_type = int;
+        using pointer = void;
+        using reference = TaskItem;
+
+        const_iterator(const TaskStore* store, int row)
+            : m_store(store), m_row(row) {}
+
+        TaskItem operator*() const;
+        const_iterator& operator++() { ++m_row; return *this; }
+        bool operator==(const const_iterator& other) const { return m_row == other.m_row; }
+        bool operator!=(const const_iterator& other) const { return m_row != other.m_row; }
+        int row() const { return m_row; }
+
+    private:
+        const TaskStore* m_store;
+        int m_row;
+    };
+
+    TaskStore() = default;
+    explicit TaskStore(const QVector<TaskItem>& items);
+
+    int size() const;
+    bool isEmpty() const;
+    TaskItem at(int row) const;
+    QString title(int row) const;
+    bool isDone(int row) const;
+    int id(int row) const;
+    const_iterator begin() const;
+    const_iterator end() const;
+    // Rows [row, row + count) as TaskItems, e.g. for journal records
+    QVector<TaskItem> mid(int row, int count) const;
+    QVector<TaskItem> toVector() const;
+
+    void reserve(int count);
+    void clear();
+    void append(const TaskItem& task);
+    void insert(int row, const TaskItem& task);
+    void remove(int row, int count = 1);
+    // Same semantics as QVector::move(): the task ends up at row to
+    void move(int from, int to);
+    void setTitle(int row, const QString& title);
+    void setDone(int row, bool done);
+    void setId(int row, int id);
+
+    // Heap bytes held by the columns, including reserved capacity
+    qint64 memoryUsage() const;
+
+private:
+    int physical(int row) const { return row < m_gapStart ? row : row + m_gapLength; }
+    // Shifts the rows between the gap and row so that the gap starts at row
+    void moveGap(int row);
+    void closeGap();
+    void compactArena();
+
+    TitleArena m_arena;
+    QVector<Span> m_spans;
+    QVector<qint32> m_ids;
+    // One done flag per row, least significant bit first
+    QByteArray m_done;
+    int m_gapStart = 0;
+    int m_gapLength = 0;
+};
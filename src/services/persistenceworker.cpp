@@ -0,0 +1,58 @@
+#include "persistenceworker.h"
+#include "taskstorage.h"
+#include "../models/taskmodel.h"
+#include <QElapsedTimer>
+#include <QFile>
+#include <QFileInfo>
+#include <QStringList>
+
+PersistenceWorker::PersistenceWorker(QObject* parent)
+    : QObject(parent) {}
+
+void PersistenceWorker::appendRecords(const QString& journalPath, const QByteArray& records) {
+    QElapsedTimer timer;
+    timer.start();
+    const QVector<qint64> before = TaskStorage::fileStamp(journalPath);
+    m_journal.setPath(journalPath);
+    const bool ok = m_journal.append(records);
+    emit fileWritten(journalPath, before, TaskStorage::fileStamp(journalPath));
+    if (!ok) {
+        emit saveFailed();
+        return;
+    }
+    emit saveFinished(timer.nsecsElapsed(), records.size());
+}
+
+void PersistenceWorker::writeSnapshot(const QString& snapshotPath, const TaskStore& tasks,
+                                      quint64 journalSeq, bool journaled) {
+    QElapsedTimer timer;
+    timer.start();
+    const QStringList paths = {snapshotPath, TaskStorage::otherFormatPath(snapshotPath),
+                               TaskJournal::pathForSnapshot(snapshotPath)};
+    QVector<QVector<qint64>> before;
+    for (const QString& path : paths) {
+        before.append(TaskStorage::fileStamp(path));
+    }
+
+    // QSaveFile leaves the old snapshot in place when writing fails
+    if (!TaskStorage::writeSnapshot(snapshotPath, tasks, journalSeq)) {
+        emit saveFailed();
+        return;
+    }
+    // A snapshot in the other format is stale now; dropping it completes a
+    // format migration instead of leaving the next load to compare mtimes
+    QFile::remove(paths.at(1));
+
+    // Every record up to journalSeq was queued before this job, so the
+    // journal holds nothing the snapshot does not already contain.
+    m_journal.setPath(paths.at(2));
+    if (journaled) {
+        m_journal.truncate();
+    } else {
+        m_journal.remove();
+    }
+    for (int i = 0; i < paths.size(); ++i) {
+        emit fileWritten(paths.at(i), before.at(i), TaskStorage::fileStamp(paths.at(i)));
+    }
+    emit saveFinished(timer.nsecsElapsed(), QFileInfo(snapshotPath).size());
+}
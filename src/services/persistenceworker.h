@@ -0,0 +1,33 @@
+#pragma once
+
+#include <QObject>
+#include <QString>
+#include <QByteArray>
+#include <QVector>
+#include "taskjournal.h"
+
+class TaskStore;
+
+// Performs all task file I/O on a dedicated thread. Jobs are posted from the
+// GUI thread with queued invocations and run strictly in submission order, so
+// a snapshot written at journal sequence N can safely truncate the journal.
+class PersistenceWorker : public QObject {
+    Q_OBJECT
+
+public:
+    explicit PersistenceWorker(QObject* parent = nullptr);
+
+    void appendRecords(const QString& journalPath, const QByteArray& records);
+    void writeSnapshot(const QString& snapshotPath, const TaskStore& tasks,
+                       quint64 journalSeq, bool journaled);
+
+signals:
+    void saveFinished(qint64 nsecs, qint64 bytes);
+    void saveFailed();
+    // A file a job touched, with its TaskStorage::fileStamp() right before
+    // and right after; emitted ahead of saveFinished/saveFailed
+    void fileWritten(const QString& path, const QVector<qint64>& before, const QVector<qint64>& after);
+
+private:
+    TaskJournal m_journal;
+};
@@ -7,6 +7,7 @@ SettingsStore::SettingsStore(QObject* parent)
 {
     const QSettings s;
     m_username = s.value("user/username", "User").toString();
+    m_slimDelegates = s.value("ui/slimDelegates", false).toBool();
 }
 
 QString SettingsStore::username() const
@@ -25,4 +26,22 @@ void SettingsStore::setUsername(const QString& value)
     s.sync();
 
     emit usernameChanged();
-}
\ No newline at end of file
+}
+
+bool SettingsStore::slimDelegates() const
+{
+    return m_slimDelegates;
+}
+
+void SettingsStore::setSlimDelegates(bool value)
+{
+    if (value == m_slimDelegates)
+        return;
+    m_slimDelegates = value;
+
+    QSettings s;
+    s.setValue("ui/slimDelegates", m_slimDelegates);
+    s.sync();
+
+    emit slimDelegatesChanged();
+}
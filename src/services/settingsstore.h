@@ -7,15 +7,21 @@ class SettingsStore final : public QObject
 {
     Q_OBJECT
     Q_PROPERTY(QString username READ username WRITE setUsername NOTIFY usernameChanged)
+    Q_PROPERTY(bool slimDelegates READ slimDelegates WRITE setSlimDelegates NOTIFY slimDelegatesChanged)
 public:
     explicit SettingsStore(QObject* parent = nullptr);
 
     QString username() const;
     void setUsername(const QString& value);
 
+    bool slimDelegates() const;
+    void setSlimDelegates(bool value);
+
     signals:
         void usernameChanged();
+        void slimDelegatesChanged();
 
 private:
     QString m_username;
+    bool m_slimDelegates;
 };
\ No newline at end of file
@@ -0,0 +1,21 @@
+#include "startuptrace.h"
+#include <QtGlobal>
+
+StartupTrace::StartupTrace() {
+    m_timer.start();
+}
+
+bool StartupTrace::isEnabled() const {
+    return m_enabled;
+}
+
+void StartupTrace::setEnabled(bool enabled) {
+    m_enabled = enabled;
+}
+
+void StartupTrace::mark(const char* phase) {
+    if (!m_enabled) return;
+    const qint64 nsecs = m_timer.nsecsElapsed();
+    const qint64 lastNsecs = m_lastNsecs.exchange(nsecs);
+    qInfo("[startup] %9.2f ms (+%8.2f ms)  %s", nsecs / 1e6, (nsecs - lastNsecs) / 1e6, phase);
+}
@@ -0,0 +1,22 @@
+#pragma once
+
+#include <QElapsedTimer>
+#include <atomic>
+
+// Prints how long each startup phase took, measured from the start of main().
+// Disabled traces cost one timer read per phase. mark() may be called from
+// the render thread.
+class StartupTrace {
+public:
+    StartupTrace();
+
+    bool isEnabled() const;
+    void setEnabled(bool enabled);
+
+    void mark(const char* phase);
+
+private:
+    QElapsedTimer m_timer;
+    std::atomic<qint64> m_lastNsecs{0};
+    bool m_enabled = false;
+};
@@ -0,0 +1,624 @@
+#include "taskexchange.h"
+#include "taskjournal.h"
+#include "taskstorage.h"
+#include <QFile>
+#include <QFileInfo>
+#include <QIODevice>
+#include <QJsonDocument>
+#include <QJsonObject>
+#include <algorithm>
+#include <cctype>
+#include <memory>
+
+namespace {
+
+// Tasks moved between the stored snapshot and the exchange file per step
+const int BatchSize = 4096;
+
+// Bytes pulled from the input device per refill
+const qint64 ReadChunkSize = 64 * 1024;
+
+bool fail(QString* error, const QString& message) {
+    if (error) *error = message;
+    return false;
+}
+
+// The stored rows with journal records applied, as runs of snapshot rows
+// and of tasks taken from the records. Only the records' tasks are held, so
+// memory follows the size of the journal rather than the task count.
+class JournalOverlay {
+public:
+    struct Run {
+        // First snapshot row, or -1 for a run of tasks
+        int first;
+        int count;
+        QVector<TaskItem> tasks;
+    };
+
+    explicit JournalOverlay(int snapshotCount)
+        : m_size(snapshotCount) {
+        if (snapshotCount > 0) m_runs.append(Run{0, snapshotCount, {}});
+    }
+
+    // Returns false, changing nothing, if the record does not fit the rows
+    bool apply(const TaskJournalRecord& record) {
+        const int row = record.row;
+        if (record.op == TaskJournalRecord::Insert) {
+            if (row < 0 || row > m_size) return false;
+            if (record.count > 0) m_runs.insert(split(row), Run{-1, record.count, record.tasks});
+            m_size += record.count;
+        } else if (record.op == TaskJournalRecord::Remove) {
+            if (row < 0 || record.count < 0 || row + record.count > m_size) return false;
+            erase(row, record.count);
+            m_size -= record.count;
+        } else {
+            if (row < 0 || row + record.count > m_size) return false;
+            const int at = erase(row, record.count);
+            if (record.count > 0) m_runs.insert(at, Run{-1, record.count, record.tasks});
+        }
+        return true;
+    }
+
+    const QVector<Run>& runs() const {
+        return m_runs;
+    }
+
+private:
+    // Splits the run that contains row so that one starts there; returns
+    // its index, or the run count if row is the end
+    int split(int row) {
+        int start = 0;
+        for (int i = 0; i < m_runs.size(); ++i) {
+            const Run& run = m_runs.at(i);
+            if (row == start) return i;
+            if (row < start + run.count) {
+                const int head = row - start;
+                Run tail{run.first < 0 ? -1 : run.first + head, run.count - head, run.tasks.mid(head)};
+                Run& front = m_runs[i];
+                front.count = head;
+                if (front.first < 0) front.tasks.resize(head);
+                m_runs.insert(i + 1, tail);
+                return i + 1;
+            }
+            start += run.count;
+        }
+        return m_runs.size();
+    }
+
+    // Removes count rows from row on; returns the index they were at
+    int erase(int row, int count) {
+        const int first = split(row);
+        const int last = split(row + count);
+        m_runs.remove(first, last - first);
+        return first;
+    }
+
+    QVector<Run> m_runs;
+    int m_size;
+};
+
+// The tasks stored for a user, read in order without changing any file. A
+// binary snapshot is decoded straight from the map and a JSON snapshot is
+// scanned one task at a time; a pending journal is applied on the way
+// through a JournalOverlay.
+class StoredTasks {
+public:
+    bool open(const QString& storagePath, QString* error) {
+        const QString snapshotPath = TaskStorage::newestSnapshotPath(storagePath, true);
+        if (QFile::exists(snapshotPath) && !openSnapshot(snapshotPath, error)) return false;
+
+        const QString journalPath = TaskJournal::pathForSnapshot(storagePath);
+        if (QFileInfo(journalPath).size() <= 0) return true;
+
+        // Journal records address rows by position, so the overlay needs the
+        // snapshot's row count and sequence number up front. A JSON snapshot
+        // has neither in a header and is scanned once for them.
+        int snapshotCount = 0;
+        if (m_binary) {
+            snapshotCount = m_binary->count();
+        } else if (m_json) {
+            TaskImportReader counter(&m_file, TaskExchange::Format::Json);
+            TaskItem task;
+            while (counter.read(task)) ++snapshotCount;
+            if (!counter.errorString().isEmpty()) return fail(error, counter.errorString());
+            m_journalSeq = counter.journalSeq();
+            if (!openSnapshot(snapshotPath, error)) return false;
+        }
+
+        m_overlay.reset(new JournalOverlay(snapshotCount));
+        TaskJournalReader journal(journalPath, m_journalSeq);
+        TaskJournalRecord record;
+        while (journal.next(record) && m_overlay->apply(record)) {
+            m_journalSeq = record.seq;
+        }
+        return true;
+    }
+
+    // Appends up to max tasks to out; 0 at the end and after an error
+    int read(QVector<TaskItem>& out, int max) {
+        if (!m_overlay) return readSnapshot(out, max);
+
+        int n = 0;
+        const QVector<JournalOverlay::Run>& runs = m_overlay->runs();
+        while (n < max && m_run < runs.size()) {
+            const JournalOverlay::Run& run = runs.at(m_run);
+            const int count = std::min(max - n, run.count - m_offset);
+            if (run.first < 0) {
+                out.append(run.tasks.mid(m_offset, count));
+            } else {
+                // Skip the snapshot rows removed since, then copy the run
+                QVector<TaskItem> skipped;
+                while (m_snapshotRow < run.first + m_offset) {
+                    skipped.clear();
+                    const int read = readSnapshot(skipped, std::min(BatchSize, run.first + m_offset - m_snapshotRow));
+                    if (read == 0) return shortSnapshot(n);
+                    m_snapshotRow += read;
+                }
+                const int read = readSnapshot(out, count);
+                m_snapshotRow += read;
+                if (read < count) return shortSnapshot(n + read);
+            }
+            n += count;
+            m_offset += count;
+            if (m_offset == run.count) {
+                ++m_run;
+                m_offset = 0;
+            }
+        }
+        return n;
+    }
+
+    QString errorString() const {
+        if (!m_error.isEmpty()) return m_error;
+        return m_json ? m_json->errorString() : QString();
+    }
+
+    // The sequence number of the last journal record applied
+    quint64 journalSeq() const {
+        return m_journalSeq;
+    }
+
+    // Unmaps and closes the snapshot so it can be replaced
+    void close() {
+        m_binary.reset();
+        m_json.reset();
+        m_file.close();
+    }
+
+private:
+    bool openSnapshot(const QString& path, QString* error) {
+        close();
+        if (TaskStorage::isBinaryPath(path)) {
+            m_binary.reset(new BinaryTaskReader);
+            if (!m_binary->open(path)) return fail(error, "Cannot read " + path);
+            m_journalSeq = m_binary->journalSeq();
+            return true;
+        }
+        m_file.setFileName(path);
+        if (!m_file.open(QIODevice::ReadOnly)) return fail(error, "Cannot read " + path);
+        m_json.reset(new TaskImportReader(&m_file, TaskExchange::Format::Json));
+        return true;
+    }
+
+    int readSnapshot(QVector<TaskItem>& out, int max) {
+        if (m_binary) return m_binary->read(out, max);
+        if (!m_json) return 0;
+        int n = 0;
+        TaskItem task;
+        while (n < max && m_json->read(task)) {
+            out.append(task);
+            ++n;
+        }
+        return n;
+    }
+
+    // The snapshot ended before the rows the journal was applied to
+    int shortSnapshot(int n) {
+        if (errorString().isEmpty()) m_error = "Snapshot changed while it was read";
+        m_run = m_overlay->runs().size();
+        return n;
+    }
+
+    std::unique_ptr<BinaryTaskReader> m_binary;
+    QFile m_file;
+    std::unique_ptr<TaskImportReader> m_json;
+    quint64 m_journalSeq = 0;
+    std::unique_ptr<JournalOverlay> m_overlay;
+    int m_run = 0;
+    int m_offset = 0;
+    int m_snapshotRow = 0;
+    QString m_error;
+};
+
+QByteArray jsonRecord(const TaskItem& task) {
+    QJsonObject obj;
+    obj["title"] = task.title;
+    obj["done"] = task.done;
+    obj["id"] = task.id;
+    return QJsonDocument(obj).toJson(QJsonDocument::Compact);
+}
+
+QByteArray csvField(const QString& value) {
+    QByteArray field = value.toUtf8();
+    if (field.contains(',') || field.contains('"') || field.contains('\n') || field.contains('\r')) {
+        field.replace("\"", "\"\"");
+        field = '"' + field + '"';
+    }
+    return field;
+}
+
+bool parseBool(const QString& value) {
+    const QString v = value.trimmed().toLower();
+    return v == "true" || v == "1" || v == "yes";
+}
+
+}
+
+namespace TaskExchange {
+
+bool formatFromName(const QString& name, Format* format) {
+    const QString n = name.toLower();
+    if (n == "json") {
+        *format = Format::Json;
+    } else if (n == "ndjson" || n == "jsonl") {
+        *format = Format::Ndjson;
+    } else if (n == "csv") {
+        *format = Format::Csv;
+    } else {
+        return false;
+    }
+    return true;
+}
+
+Format formatForPath(const QString& path) {
+    Format format = Format::Json;
+    formatFromName(QFileInfo(path).suffix(), &format);
+    return format;
+}
+
+bool importTasks(const QString& storagePath, QIODevice* input, Format format, qint64* count, QString* error) {
+    StoredTasks existing;
+    if (!existing.open(storagePath, error)) return false;
+
+    const QString snapshotPath = TaskStorage::binaryPathFor(storagePath);
+    BinaryTaskWriter writer(snapshotPath);
+    if (!writer.open(existing.journalSeq())) return fail(error, "Cannot write " + snapshotPath);
+
+    int nextId = 1;
+    QVector<TaskItem> batch;
+    batch.reserve(BatchSize);
+    while (existing.read(batch, BatchSize) > 0) {
+        for (const TaskItem& task : qAsConst(batch)) {
+            nextId = std::max(nextId, task.id + 1);
+            if (!writer.write(task)) return fail(error, "Cannot write " + snapshotPath);
+        }
+        batch.clear();
+    }
+    if (!existing.errorString().isEmpty()) return fail(error, existing.errorString());
+    // Unmap the old snapshot before it is replaced
+    existing.close();
+
+    TaskImportReader reader(input, format);
+    TaskItem task;
+    qint64 imported = 0;
+    while (reader.read(task)) {
+        task.id = nextId++;
+        if (!writer.write(task)) return fail(error, "Cannot write " + snapshotPath);
+        ++imported;
+    }
+    if (!reader.errorString().isEmpty()) return fail(error, reader.errorString());
+    if (!writer.commit()) return fail(error, "Cannot write " + snapshotPath);
+
+    // The JSON snapshot and the journal records up to journalSeq are part of
+    // the new snapshot; records after a gap or torn line are dropped with
+    // the journal, as the app's own load would skip them
+    QFile::remove(TaskStorage::otherFormatPath(snapshotPath));
+    TaskJournal(TaskJournal::pathForSnapshot(storagePath)).remove();
+    if (count) *count = imported;
+    return true;
+}
+
+bool exportTasks(const QString& storagePath, QIODevice* output, Format format, qint64* count, QString* error) {
+    StoredTasks source;
+    if (!source.open(storagePath, error)) return false;
+
+    TaskExportWriter writer(output, format);
+    qint64 exported = 0;
+    QVector<TaskItem> batch;
+    batch.reserve(BatchSize);
+    while (source.read(batch, BatchSize) > 0) {
+        for (const TaskItem& task : qAsConst(batch)) {
+            if (!writer.write(task)) return fail(error, output->errorString());
+        }
+        exported += batch.size();
+        batch.clear();
+    }
+    if (!source.errorString().isEmpty()) return fail(error, source.errorString());
+    if (!writer.finish()) return fail(error, output->errorString());
+
+    if (count) *count = exported;
+    return true;
+}
+
+}
+
+
+TaskExportWriter::TaskExportWriter(QIODevice* device, TaskExchange::Format format)
+    : m_device(device), m_format(format) {}
+
+bool TaskExportWriter::write(const TaskItem& task) {
+    QByteArray record;
+    switch (m_format) {
+    case TaskExchange::Format::Json:
+        record = (m_count == 0 ? "{\"tasks\": [\n    " : ",\n    ") + jsonRecord(task);
+        break;
+    case TaskExchange::Format::Ndjson:
+        record = jsonRecord(task) + '\n';
+        break;
+    case TaskExchange::Format::Csv:
+        if (m_count == 0) record = "id,title,done\n";
+        record += QByteArray::number(task.id) + ',' + csvField(task.title) + ','
+            + (task.done ? "true" : "false") + '\n';
+        break;
+    }
+    ++m_count;
+    return put(record);
+}
+
+bool TaskExportWriter::finish() {
+    switch (m_format) {
+    case TaskExchange::Format::Json:
+        return put(m_count == 0 ? "{\"tasks\": []}\n" : "\n]}\n");
+    case TaskExchange::Format::Ndjson:
+        return true;
+    case TaskExchange::Format::Csv:
+        return m_count > 0 || put("id,title,done\n");
+    }
+    return true;
+}
+
+bool TaskExportWriter::put(const QByteArray& data) {
+    return m_device->write(data) == data.size();
+}
+
+
+TaskImportReader::TaskImportReader(QIODevice* device, TaskExchange::Format format)
+    : m_device(device), m_format(format) {}
+
+bool TaskImportReader::read(TaskItem& task) {
+    if (!m_error.isEmpty()) return false;
+    switch (m_format) {
+    case TaskExchange::Format::Json:
+        return readJson(task);
+    case TaskExchange::Format::Ndjson:
+        return readNdjson(task);
+    case TaskExchange::Format::Csv:
+        return readCsv(task);
+    }
+    return false;
+}
+
+QString TaskImportReader::errorString() const {
+    return m_error;
+}
+
+quint64 TaskImportReader::journalSeq() const {
+    return m_journalSeq;
+}
+
+bool TaskImportReader::nextChar(char* c) {
+    if (!peekChar(c)) return false;
+    ++m_position;
+    return true;
+}
+
+bool TaskImportReader::peekChar(char* c) {
+    if (m_position >= m_buffer.size()) {
+        m_buffer = m_device->read(ReadChunkSize);
+        m_position = 0;
+        if (m_buffer.isEmpty()) return false;
+    }
+    *c = m_buffer.at(m_position);
+    return true;
+}
+
+bool TaskImportReader::readJson(TaskItem& task) {
+    if (m_finished) return false;
+    if (!m_inArray && !findTaskArray()) return false;
+
+    // Only one element is held at a time: scan for its closing brace while
+    // keeping track of nesting and strings
+    QByteArray element;
+    int depth = 0;
+    bool inString = false;
+    bool escaped = false;
+    char c;
+    while (nextChar(&c)) {
+        if (depth > 0) element.append(c);
+        if (inString) {
+            if (escaped) {
+                escaped = false;
+            } else if (c == '\\') {
+                escaped = true;
+            } else if (c == '"') {
+                inString = false;
+            }
+            continue;
+        }
+        if (depth == 0) {
+            if (c == '{') {
+                element.append(c);
+                depth = 1;
+            } else if (c == ']') {
+                m_finished = true;
+                return false;
+            } else if (c != ',' && !QChar::isSpace(c)) {
+                return fail(QString("Record %1: expected a task object").arg(m_record + 1));
+            }
+        } else if (c == '"') {
+            inString = true;
+        } else if (c == '{' || c == '[') {
+            ++depth;
+        } else if ((c == '}' || c == ']') && --depth == 0) {
+            return parseObject(element, task);
+        }
+    }
+    return fail("Unexpected end of input");
+}
+
+bool TaskImportReader::findTaskArray() {
+    int depth = 0;
+    bool inString = false;
+    bool escaped = false;
+    // The last string closed directly inside the top-level object, and
+    // whether it was followed by a colon, i.e. was a key
+    QByteArray key;
+    bool keyClosed = false;
+    bool tasksValue = false;
+    // The number after a snapshot's "journalSeq" key, while it is read
+    bool seqValue = false;
+    QByteArray number;
+    char c;
+    while (nextChar(&c)) {
+        if (inString) {
+            if (escaped) {
+                escaped = false;
+            } else if (c == '\\') {
+                escaped = true;
+            } else if (c == '"') {
+                inString = false;
+                keyClosed = depth == 1;
+                continue;
+            }
+            if (depth == 1) key.append(c);
+            continue;
+        }
+        if (QChar::isSpace(c)) continue;
+        if (seqValue) {
+            if (std::isdigit(uchar(c)) || c == '.' || c == 'e' || c == 'E' || c == '+' || c == '-') {
+                number.append(c);
+                continue;
+            }
+            m_journalSeq = static_cast<quint64>(number.toDouble());
+            seqValue = false;
+        }
+
+        if (depth == 0) {
+            // A bare top-level array is the task list itself
+            if (c == '[') {
+                m_inArray = true;
+                return true;
+            }
+            if (c != '{') return fail("Expected a JSON object or array");
+            depth = 1;
+        } else if (tasksValue) {
+            if (c != '[') return fail("\"tasks\" is not an array");
+            m_inArray = true;
+            return true;
+        } else if (c == ':' && keyClosed) {
+            tasksValue = key == "tasks";
+            seqValue = key == "journalSeq";
+        } else if (c == '"') {
+            inString = true;
+            key.clear();
+        } else if (c == '{' || c == '[') {
+            ++depth;
+        } else if ((c == '}' || c == ']') && --depth == 0) {
+            break;
+        }
+        keyClosed = false;
+    }
+    return fail("No \"tasks\" array found");
+}
+
+bool TaskImportReader::readNdjson(TaskItem& task) {
+    QByteArray line;
+    char c;
+    bool more = true;
+    while (more) {
+        more = nextChar(&c);
+        if (more && c != '\n') {
+            line.append(c);
+            continue;
+        }
+        if (!line.trimmed().isEmpty()) return parseObject(line, task);
+        line.clear();
+    }
+    return false;
+}
+
+bool TaskImportReader::readCsv(TaskItem& task) {
+    QStringList fields;
+    if (m_titleColumn < 0) {
+        if (!readCsvRecord(fields)) return m_error.isEmpty() ? fail("Missing CSV header") : false;
+        for (QString& field : fields) field = field.trimmed().toLower();
+        m_titleColumn = fields.indexOf("title");
+        m_doneColumn = fields.indexOf("done");
+        if (m_titleColumn < 0) return fail("CSV header has no title column");
+    }
+
+    while (readCsvRecord(fields)) {
+        if (fields.size() == 1 && fields.constFirst().isEmpty()) continue;
+        ++m_record;
+        if (m_titleColumn >= fields.size()) {
+            return fail(QString("Record %1: missing title").arg(m_record));
+        }
+        const bool done = m_doneColumn >= 0 && m_doneColumn < fields.size() && parseBool(fields.at(m_doneColumn));
+        task = TaskItem(fields.at(m_titleColumn), done, 0);
+        return true;
+    }
+    return false;
+}
+
+bool TaskImportReader::readCsvRecord(QStringList& fields) {
+    fields.clear();
+    QByteArray field;
+    bool quoted = false;
+    bool any = false;
+    char c;
+    while (nextChar(&c)) {
+        any = true;
+        if (quoted) {
+            if (c != '"') {
+                field.append(c);
+            } else if (peekChar(&c) && c == '"') {
+                field.append('"');
+                ++m_position;
+            } else {
+                quoted = false;
+            }
+        } else if (c == '"') {
+            quoted = true;
+        } else if (c == ',') {
+            fields.append(QString::fromUtf8(field));
+            field.clear();
+        } else if (c == '\n') {
+            fields.append(QString::fromUtf8(field));
+            return true;
+        } else if (c != '\r') {
+            field.append(c);
+        }
+    }
+    if (quoted) return fail(QString("Record %1: unterminated quoted field").arg(m_record + 1));
+    if (!any) return false;
+    fields.append(QString::fromUtf8(field));
+    return true;
+}
+
+bool TaskImportReader::parseObject(const QByteArray& json, TaskItem& task) {
+    ++m_record;
+    QJsonParseError error;
+    const QJsonDocument doc = QJsonDocument::fromJson(json, &error);
+    if (!doc.isObject()) {
+        return fail(QString("Record %1: %2").arg(m_record)
+            .arg(error.error == QJsonParseError::NoError ? QString("not an object") : error.errorString()));
+    }
+    const QJsonObject obj = doc.object();
+    task = TaskItem(obj.value("title").toString(), obj.value("done").toBool(), obj.value("id").toInt());
+    return true;
+}
+
+bool TaskImportReader::fail(const QString& message) {
+    m_error = message;
+    return false;
+}
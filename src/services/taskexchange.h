@@ -0,0 +1,97 @@
+#pragma once
+
+#include <QByteArray>
+#include <QString>
+#include <QStringList>
+#include "../models/taskmodel.h"
+
+class QIODevice;
+
+// Interchange formats for bulk import and export. Records are read and
+// written one at a time, so files of any size pass through in bounded memory:
+//
+//   json    {"tasks": [{"done": ..., "id": ..., "title": ...}, ...]}, the
+//           snapshot layout; on import other top-level members are skipped,
+//           and a bare top-level array works too
+//   ndjson  one {"done": ..., "id": ..., "title": ...} object per line
+//   csv     RFC 4180 with an "id,title,done" header row; on import only the
+//           title column is required and columns may come in any order
+namespace TaskExchange {
+
+enum class Format { Json, Ndjson, Csv };
+
+bool formatFromName(const QString& name, Format* format);
+// From the file extension: .csv, .ndjson or .jsonl, anything else is JSON
+Format formatForPath(const QString& path);
+
+// Import must not run while the app has the same user logged in: it
+// replaces the snapshot and removes the journal, which would drop records
+// the app appends in the meantime. Export only reads, applying a pending
+// journal on the fly.
+
+// Appends the tasks read from input to the tasks stored at storagePath
+// (a tasks_<user>.json path). The result is written as a fresh binary
+// snapshot that replaces the JSON snapshot and the journal; imported tasks
+// get new ids.
+bool importTasks(const QString& storagePath, QIODevice* input, Format format,
+                 qint64* count = nullptr, QString* error = nullptr);
+// Writes the tasks stored at storagePath to output
+bool exportTasks(const QString& storagePath, QIODevice* output, Format format,
+                 qint64* count = nullptr, QString* error = nullptr);
+
+}
+
+class TaskExportWriter {
+public:
+    TaskExportWriter(QIODevice* device, TaskExchange::Format format);
+
+    bool write(const TaskItem& task);
+    // Completes the document; the device is left open
+    bool finish();
+
+private:
+    bool put(const QByteArray& data);
+
+    QIODevice* m_device;
+    TaskExchange::Format m_format;
+    qint64 m_count = 0;
+};
+
+class TaskImportReader {
+public:
+    TaskImportReader(QIODevice* device, TaskExchange::Format format);
+
+    // Returns false at the end of the input and on a malformed record;
+    // errorString() is empty only in the first case
+    bool read(TaskItem& task);
+    QString errorString() const;
+    // The top-level "journalSeq" of a JSON snapshot, 0 if there is none. It
+    // is known once the first task has been read; QJsonDocument writes keys
+    // in order, so it comes before "tasks".
+    quint64 journalSeq() const;
+
+private:
+    bool nextChar(char* c);
+    bool peekChar(char* c);
+    bool readJson(TaskItem& task);
+    // Skips ahead to the task array: the value of the top-level "tasks" key
+    // or the document itself if it is an array
+    bool findTaskArray();
+    bool readNdjson(TaskItem& task);
+    bool readCsv(TaskItem& task);
+    bool readCsvRecord(QStringList& fields);
+    bool parseObject(const QByteArray& json, TaskItem& task);
+    bool fail(const QString& message);
+
+    QIODevice* m_device;
+    TaskExchange::Format m_format;
+    QByteArray m_buffer;
+    int m_position = 0;
+    qint64 m_record = 0;
+    bool m_inArray = false;
+    bool m_finished = false;
+    quint64 m_journalSeq = 0;
+    int m_titleColumn = -1;
+    int m_doneColumn = -1;
+    QString m_error;
+};
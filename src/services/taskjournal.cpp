@@ -0,0 +1,174 @@
+#include "taskjournal.h"
+#include "../models/taskmodel.h"
+#include <QJsonDocument>
+#include <QJsonObject>
+#include <QJsonArray>
+#include <algorithm>
+
+namespace {
+
+QJsonArray tasksToJson(const QVector<TaskItem>& tasks) {
+    QJsonArray array;
+    for (const TaskItem& task : tasks) {
+        QJsonObject obj;
+        obj["title"] = task.title;
+        obj["done"] = task.done;
+        obj["id"] = task.id;
+        array.append(obj);
+    }
+    return array;
+}
+
+QByteArray toLine(const QJsonObject& record) {
+    return QJsonDocument(record).toJson(QJsonDocument::Compact) + '\n';
+}
+
+}
+
+TaskJournal::TaskJournal(const QString& path)
+    : m_file(path) {}
+
+QString TaskJournal::path() const {
+    return m_file.fileName();
+}
+
+void TaskJournal::setPath(const QString& path) {
+    if (m_file.fileName() == path) return;
+    m_file.close();
+    m_file.setFileName(path);
+}
+
+bool TaskJournal::ensureOpen() {
+    if (m_file.isOpen()) return true;
+    if (m_file.fileName().isEmpty()) return false;
+    return m_file.open(QIODevice::WriteOnly | QIODevice::Append);
+}
+
+bool TaskJournal::append(const QByteArray& records) {
+    if (records.isEmpty()) return true;
+    if (!ensureOpen()) return false;
+    if (m_file.write(records) != records.size()) return false;
+    return m_file.flush();
+}
+
+qint64 TaskJournal::size() const {
+    return m_file.isOpen() ? m_file.size() : QFile(m_file.fileName()).size();
+}
+
+bool TaskJournal::truncate() {
+    if (!ensureOpen()) return false;
+    return m_file.resize(0);
+}
+
+bool TaskJournal::remove() {
+    m_file.close();
+    return !m_file.exists() || m_file.remove();
+}
+
+QString TaskJournal::pathForSnapshot(const QString& snapshotPath) {
+    QString path = snapshotPath;
+    if (path.endsWith(".json")) {
+        path.chop(5);
+    } else if (path.endsWith(".bin")) {
+        path.chop(4);
+    }
+    return path + ".journal";
+}
+
+QByteArray TaskJournal::insertRecord(quint64 seq, int row, const QVector<TaskItem>& tasks) {
+    QJsonObject record;
+    record["seq"] = static_cast<double>(seq);
+    record["op"] = "insert";
+    record["row"] = row;
+    record["tasks"] = tasksToJson(tasks);
+    return toLine(record);
+}
+
+QByteArray TaskJournal::removeRecord(quint64 seq, int row, int count) {
+    QJsonObject record;
+    record["seq"] = static_cast<double>(seq);
+    record["op"] = "remove";
+    record["row"] = row;
+    record["count"] = count;
+    return toLine(record);
+}
+
+QByteArray TaskJournal::updateRecord(quint64 seq, int row, const QVector<TaskItem>& tasks) {
+    QJsonObject record;
+    record["seq"] = static_cast<double>(seq);
+    record["op"] = "update";
+    record["row"] = row;
+    record["tasks"] = tasksToJson(tasks);
+    return toLine(record);
+}
+
+quint64 TaskJournal::replay(const QString& path, quint64 afterSeq, QVector<TaskItem>& items) {
+    quint64 lastSeq = afterSeq;
+
+    TaskJournalReader reader(path, afterSeq);
+    TaskJournalRecord record;
+    while (reader.next(record)) {
+        const int row = record.row;
+        if (record.op == TaskJournalRecord::Insert) {
+            if (row < 0 || row > items.size()) break;
+            items.insert(row, record.count, TaskItem());
+            std::copy(record.tasks.cbegin(), record.tasks.cend(), items.begin() + row);
+        } else if (record.op == TaskJournalRecord::Remove) {
+            if (row < 0 || record.count < 0 || row + record.count > items.size()) break;
+            items.remove(row, record.count);
+        } else {
+            if (row < 0 || row + record.count > items.size()) break;
+            std::copy(record.tasks.cbegin(), record.tasks.cend(), items.begin() + row);
+        }
+        lastSeq = record.seq;
+    }
+
+    return lastSeq;
+}
+
+TaskJournalReader::TaskJournalReader(const QString& path, quint64 afterSeq)
+    : m_file(path)
+    , m_lastSeq(afterSeq) {
+    m_file.open(QIODevice::ReadOnly);
+}
+
+bool TaskJournalReader::next(TaskJournalRecord& record) {
+    if (!m_file.isOpen()) return false;
+
+    while (!m_file.atEnd()) {
+        const QByteArray line = m_file.readLine();
+        const QJsonDocument doc = QJsonDocument::fromJson(line);
+        // A torn final line from an interrupted append ends the replay.
+        if (!doc.isObject()) return false;
+
+        const QJsonObject object = doc.object();
+        const quint64 seq = static_cast<quint64>(object.value("seq").toDouble());
+        if (seq <= m_lastSeq) continue;
+        // So does a missing record: the ones after it address rows of a
+        // list that was never rebuilt.
+        if (seq != m_lastSeq + 1) return false;
+
+        const QString op = object.value("op").toString();
+        record.seq = seq;
+        record.row = object.value("row").toInt(-1);
+        record.tasks.clear();
+        if (op == "remove") {
+            record.op = TaskJournalRecord::Remove;
+            record.count = object.value("count").toInt();
+        } else if (op == "insert" || op == "update") {
+            record.op = op == "insert" ? TaskJournalRecord::Insert : TaskJournalRecord::Update;
+            const QJsonArray tasks = object.value("tasks").toArray();
+            record.tasks.reserve(tasks.size());
+            for (const QJsonValue& value : tasks) {
+                const QJsonObject obj = value.toObject();
+                record.tasks.append(TaskItem{obj.value("title").toString(), obj.value("done").toBool(), obj.value("id").toInt()});
+            }
+            record.count = record.tasks.size();
+        } else {
+            return false;
+        }
+        m_lastSeq = seq;
+        return true;
+    }
+    return false;
+}
@@ -0,0 +1,64 @@
+#pragma once
+
+#include <QByteArray>
+#include <QFile>
+#include <QString>
+#include <QVector>
+#include "../models/taskmodel.h"
+
+// Append-only log of model mutations stored next to the task snapshot.
+// Each line is a compact JSON record tagged with a monotonically increasing
+// sequence number; records at or below the snapshot's journalSeq are already
+// folded into the snapshot and are skipped on replay. Replay stops at the
+// first gap in the sequence, since later records address rows by position.
+class TaskJournal {
+public:
+    explicit TaskJournal(const QString& path = QString());
+
+    QString path() const;
+    void setPath(const QString& path);
+
+    bool append(const QByteArray& records);
+    qint64 size() const;
+    bool truncate();
+    bool remove();
+
+    static QString pathForSnapshot(const QString& snapshotPath);
+
+    static QByteArray insertRecord(quint64 seq, int row, const QVector<TaskItem>& tasks);
+    static QByteArray removeRecord(quint64 seq, int row, int count);
+    static QByteArray updateRecord(quint64 seq, int row, const QVector<TaskItem>& tasks);
+
+    static quint64 replay(const QString& path, quint64 afterSeq, QVector<TaskItem>& items);
+
+private:
+    bool ensureOpen();
+
+    QFile m_file;
+};
+
+struct TaskJournalRecord {
+    enum Op { Insert, Remove, Update };
+
+    quint64 seq = 0;
+    Op op = Insert;
+    int row = -1;
+    // Rows removed; for inserts and updates the size of tasks
+    int count = 0;
+    QVector<TaskItem> tasks;
+};
+
+// Reads the records after afterSeq one at a time. Whether a record fits the
+// rows it addresses is for the caller to check.
+class TaskJournalReader {
+public:
+    TaskJournalReader(const QString& path, quint64 afterSeq);
+
+    // Returns false at the end of the journal, at a torn line, at a gap in
+    // the sequence and at an unknown record
+    bool next(TaskJournalRecord& record);
+
+private:
+    QFile m_file;
+    quint64 m_lastSeq;
+};
@@ -0,0 +1,185 @@
+#include "taskmetrics.h"
+#include <QJsonArray>
+#include <QJsonDocument>
+#include <QLocalServer>
+#include <QLocalSocket>
+#include <algorithm>
+#include <cmath>
+
+void LatencyHistogram::record(qint64 nsecs) {
+    const qint64 usecs = nsecs / 1000;
+    const auto bound = std::lower_bound(BucketBoundsUsecs.cbegin(), BucketBoundsUsecs.cend(), usecs);
+    ++m_buckets[bound - BucketBoundsUsecs.cbegin()];
+    ++m_count;
+    m_totalNsecs += nsecs;
+    m_lastNsecs = nsecs;
+    m_maxNsecs = std::max(m_maxNsecs, nsecs);
+}
+
+int LatencyHistogram::count() const {
+    return m_count;
+}
+
+double LatencyHistogram::lastMs() const {
+    return m_lastNsecs / 1e6;
+}
+
+double LatencyHistogram::meanMs() const {
+    return m_count > 0 ? m_totalNsecs / 1e6 / m_count : 0.0;
+}
+
+double LatencyHistogram::maxMs() const {
+    return m_maxNsecs / 1e6;
+}
+
+double LatencyHistogram::percentileMs(double percentile) const {
+    if (m_count == 0) return 0.0;
+    const int rank = std::max(1, int(std::ceil(percentile / 100.0 * m_count)));
+    int seen = 0;
+    for (size_t i = 0; i < BucketBoundsUsecs.size(); ++i) {
+        seen += m_buckets[i];
+        if (seen >= rank) {
+            // Never report more than the slowest sample actually seen
+            return std::min(BucketBoundsUsecs[i] / 1e3, maxMs());
+        }
+    }
+    return maxMs();
+}
+
+QJsonObject LatencyHistogram::toJson() const {
+    QJsonArray buckets;
+    for (size_t i = 0; i < m_buckets.size(); ++i) {
+        QJsonObject bucket;
+        bucket["leMs"] = i < BucketBoundsUsecs.size() ? QJsonValue(BucketBoundsUsecs[i] / 1e3) : QJsonValue("inf");
+        bucket["count"] = m_buckets[i];
+        buckets.append(bucket);
+    }
+
+    QJsonObject json;
+    json["count"] = m_count;
+    json["lastMs"] = lastMs();
+    json["meanMs"] = meanMs();
+    json["p50Ms"] = percentileMs(50);
+    json["p95Ms"] = percentileMs(95);
+    json["maxMs"] = maxMs();
+    json["buckets"] = buckets;
+    return json;
+}
+
+TaskMetrics::TaskMetrics(QObject* parent)
+    : QObject(parent) {}
+
+int TaskMetrics::saveCount() const {
+    return m_saveLatency.count();
+}
+
+int TaskMetrics::saveFailures() const {
+    return m_saveFailures;
+}
+
+qint64 TaskMetrics::bytesWritten() const {
+    return m_bytesWritten;
+}
+
+double TaskMetrics::lastSaveMs() const {
+    return m_saveLatency.lastMs();
+}
+
+double TaskMetrics::saveP95Ms() const {
+    return m_saveLatency.percentileMs(95);
+}
+
+int TaskMetrics::loadCount() const {
+    return m_loadLatency.count();
+}
+
+double TaskMetrics::lastLoadMs() const {
+    return m_loadLatency.lastMs();
+}
+
+double TaskMetrics::loadP95Ms() const {
+    return m_loadLatency.percentileMs(95);
+}
+
+qint64 TaskMetrics::mutationCount() const {
+    return m_insertedRows + m_removedRows + m_changedRows;
+}
+
+int TaskMetrics::resetCount() const {
+    return m_resets;
+}
+
+void TaskMetrics::recordSave(qint64 nsecs, qint64 bytes) {
+    m_saveLatency.record(nsecs);
+    m_bytesWritten += bytes;
+    emit updated();
+}
+
+void TaskMetrics::recordSaveFailure() {
+    ++m_saveFailures;
+    emit updated();
+}
+
+void TaskMetrics::recordLoad(qint64 nsecs) {
+    m_loadLatency.record(nsecs);
+    emit updated();
+}
+
+void TaskMetrics::recordRowsInserted(int count) {
+    m_insertedRows += count;
+    emit updated();
+}
+
+void TaskMetrics::recordRowsRemoved(int count) {
+    m_removedRows += count;
+    emit updated();
+}
+
+void TaskMetrics::recordRowsChanged(int count) {
+    m_changedRows += count;
+    emit updated();
+}
+
+void TaskMetrics::recordReset() {
+    ++m_resets;
+    emit updated();
+}
+
+QJsonObject TaskMetrics::snapshot() const {
+    QJsonObject save = m_saveLatency.toJson();
+    save["failures"] = m_saveFailures;
+    save["bytesWritten"] = m_bytesWritten;
+
+    QJsonObject model;
+    model["insertedRows"] = m_insertedRows;
+    model["removedRows"] = m_removedRows;
+    model["changedRows"] = m_changedRows;
+    model["resets"] = m_resets;
+
+    QJsonObject json;
+    json["save"] = save;
+    json["load"] = m_loadLatency.toJson();
+    json["model"] = model;
+    return json;
+}
+
+bool TaskMetrics::listen(const QString& serverName) {
+    if (!m_server) {
+        m_server = new QLocalServer(this);
+        connect(m_server, &QLocalServer::newConnection, this, &TaskMetrics::sendSnapshot);
+    }
+    m_server->close();
+    // A socket left behind by a crashed instance would make listen() fail
+    QLocalServer::removeServer(serverName);
+    return m_server->listen(serverName);
+}
+
+void TaskMetrics::sendSnapshot() {
+    // Every connection receives one JSON document and is then closed
+    while (QLocalSocket* socket = m_server->nextPendingConnection()) {
+        connect(socket, &QLocalSocket::disconnected, socket, &QObject::deleteLater);
+        socket->write(QJsonDocument(snapshot()).toJson(QJsonDocument::Compact));
+        socket->write("\n");
+        socket->disconnectFromServer();
+    }
+}
@@ -0,0 +1,93 @@
+#pragma once
+
+#include <QObject>
+#include <QJsonObject>
+#include <QString>
+#include <array>
+
+class QLocalServer;
+
+// Latency distribution over fixed, roughly logarithmic buckets. Percentiles
+// are reported as the upper bound of the bucket they fall into.
+class LatencyHistogram {
+public:
+    void record(qint64 nsecs);
+
+    int count() const;
+    double lastMs() const;
+    double meanMs() const;
+    double maxMs() const;
+    double percentileMs(double percentile) const;
+
+    QJsonObject toJson() const;
+
+private:
+    static constexpr std::array<qint64, 13> BucketBoundsUsecs = {
+        100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000
+    };
+
+    std::array<int, BucketBoundsUsecs.size() + 1> m_buckets = {};
+    int m_count = 0;
+    qint64 m_totalNsecs = 0;
+    qint64 m_lastNsecs = 0;
+    qint64 m_maxNsecs = 0;
+};
+
+// Performance counters for persistence and the task model. AppController
+// reports into it; QML reads the properties, and listen() serves the same
+// numbers as a JSON document to anyone connecting to a local socket.
+class TaskMetrics : public QObject {
+    Q_OBJECT
+    Q_PROPERTY(int saveCount READ saveCount NOTIFY updated)
+    Q_PROPERTY(int saveFailures READ saveFailures NOTIFY updated)
+    Q_PROPERTY(qint64 bytesWritten READ bytesWritten NOTIFY updated)
+    Q_PROPERTY(double lastSaveMs READ lastSaveMs NOTIFY updated)
+    Q_PROPERTY(double saveP95Ms READ saveP95Ms NOTIFY updated)
+    Q_PROPERTY(int loadCount READ loadCount NOTIFY updated)
+    Q_PROPERTY(double lastLoadMs READ lastLoadMs NOTIFY updated)
+    Q_PROPERTY(double loadP95Ms READ loadP95Ms NOTIFY updated)
+    Q_PROPERTY(qint64 mutationCount READ mutationCount NOTIFY updated)
+    Q_PROPERTY(int resetCount READ resetCount NOTIFY updated)
+
+public:
+    explicit TaskMetrics(QObject* parent = nullptr);
+
+    int saveCount() const;
+    int saveFailures() const;
+    qint64 bytesWritten() const;
+    double lastSaveMs() const;
+    double saveP95Ms() const;
+    int loadCount() const;
+    double lastLoadMs() const;
+    double loadP95Ms() const;
+    qint64 mutationCount() const;
+    int resetCount() const;
+
+    void recordSave(qint64 nsecs, qint64 bytes);
+    void recordSaveFailure();
+    void recordLoad(qint64 nsecs);
+    void recordRowsInserted(int count);
+    void recordRowsRemoved(int count);
+    void recordRowsChanged(int count);
+    void recordReset();
+
+    Q_INVOKABLE QJsonObject snapshot() const;
+    Q_INVOKABLE bool listen(const QString& serverName);
+
+signals:
+    void updated();
+
+private:
+    void sendSnapshot();
+
+    LatencyHistogram m_saveLatency;
+    LatencyHistogram m_loadLatency;
+    int m_saveFailures = 0;
+    qint64 m_bytesWritten = 0;
+    qint64 m_insertedRows = 0;
+    qint64 m_removedRows = 0;
+    qint64 m_changedRows = 0;
+    int m_resets = 0;
+
+    QLocalServer* m_server = nullptr;
+};
@@ -0,0 +1,346 @@
+#include "taskstorage.h"
+#include <QFile>
+#include <QSaveFile>
+#include <QJsonDocument>
+#include <QJsonObject>
+#include <QJsonArray>
+#include <QFileInfo>
+#include <QRegularExpression>
+#include <QtEndian>
+#include <algorithm>
+#include <cstring>
+#include <limits>
+
+namespace {
+
+const char BinaryMagic[4] = {'Q', 'T', 'T', 'B'};
+// Version 2 appended the task id array; version 1 files load with ids assigned afresh
+const quint32 BinaryVersion = 2;
+const qint64 BinaryHeaderSize = 4 + 4 + 8 + 4;
+const qint64 BinaryCountOffset = 16;
+
+template <typename T>
+bool writeLittleEndian(QIODevice& device, T value) {
+    const T le = qToLittleEndian(value);
+    return device.write(reinterpret_cast<const char*>(&le), sizeof(T)) == sizeof(T);
+}
+
+// Shared by the QVector<TaskItem> and TaskStore overloads
+template <typename Tasks>
+bool writeJson(const QString& path, const Tasks& tasks, quint64 journalSeq) {
+    QJsonArray taskArray;
+    for (const TaskItem& task : tasks) {
+        QJsonObject obj;
+        obj["title"] = task.title;
+        obj["done"] = task.done;
+        obj["id"] = task.id;
+        taskArray.append(obj);
+    }
+
+    QJsonObject root;
+    root["tasks"] = taskArray;
+    if (journalSeq > 0) {
+        root["journalSeq"] = static_cast<double>(journalSeq);
+    }
+
+    QSaveFile file(path);
+    if (!file.open(QIODevice::WriteOnly)) return false;
+
+    file.write(QJsonDocument(root).toJson(QJsonDocument::Indented));
+    return file.commit();
+}
+
+template <typename Tasks>
+bool writeBinary(const QString& path, const Tasks& tasks, quint64 journalSeq) {
+    BinaryTaskWriter writer(path);
+    if (!writer.open(journalSeq)) return false;
+
+    writer.reserve(tasks.size());
+    for (const TaskItem& task : tasks) {
+        if (!writer.write(task)) return false;
+    }
+    return writer.commit();
+}
+
+}
+
+namespace TaskStorage {
+
+QString userStoragePath(const QString& dataDir, const QString& username) {
+    static const QRegularExpression invalidCharacters("[^a-zA-Z0-9_-]");
+    QString safeUsername = username;
+    safeUsername.replace(invalidCharacters, "_");
+    return dataDir + "/tasks_" + safeUsername + ".json";
+}
+
+QString binaryPathFor(const QString& jsonPath) {
+    QString path = jsonPath;
+    if (path.endsWith(".json")) path.chop(5);
+    return path + ".bin";
+}
+
+bool isBinaryPath(const QString& path) {
+    return path.endsWith(".bin");
+}
+
+QString otherFormatPath(const QString& snapshotPath) {
+    if (!isBinaryPath(snapshotPath)) return binaryPathFor(snapshotPath);
+    QString path = snapshotPath;
+    path.chop(4);
+    return path + ".json";
+}
+
+QString newestSnapshotPath(const QString& jsonPath, bool preferBinary) {
+    const QString preferredPath = preferBinary ? binaryPathFor(jsonPath) : jsonPath;
+    const QString otherPath = preferBinary ? jsonPath : binaryPathFor(jsonPath);
+    const QFileInfo preferredInfo(preferredPath);
+    const QFileInfo otherInfo(otherPath);
+    if (otherInfo.exists() && (!preferredInfo.exists() || otherInfo.lastModified() > preferredInfo.lastModified())) {
+        return otherPath;
+    }
+    return preferredPath;
+}
+
+QVector<qint64> fileStamp(const QString& path) {
+    const QFileInfo info(path);
+    return {info.exists() ? info.size() : -1, info.lastModified().toMSecsSinceEpoch()};
+}
+
+bool readSnapshot(const QString& path, QVector<TaskItem>& items, quint64* journalSeq) {
+    return isBinaryPath(path) ? readBinarySnapshot(path, items, journalSeq)
+                              : readJsonSnapshot(path, items, journalSeq);
+}
+
+bool writeSnapshot(const QString& path, const QVector<TaskItem>& items, quint64 journalSeq) {
+    return isBinaryPath(path) ? writeBinarySnapshot(path, items, journalSeq)
+                              : writeJsonSnapshot(path, items, journalSeq);
+}
+
+bool writeSnapshot(const QString& path, const TaskStore& tasks, quint64 journalSeq) {
+    return isBinaryPath(path) ? writeBinarySnapshot(path, tasks, journalSeq)
+                              : writeJsonSnapshot(path, tasks, journalSeq);
+}
+
+bool readJsonSnapshot(const QString& path, QVector<TaskItem>& items, quint64* journalSeq) {
+    QFile file(path);
+    if (!file.exists()) return false;
+
+    if (!file.open(QIODevice::ReadOnly)) return false;
+
+    QByteArray data = file.readAll();
+    QJsonDocument doc = QJsonDocument::fromJson(data);
+
+    if (!doc.isObject()) return false;
+
+    const QJsonObject root = doc.object();
+    QJsonArray taskArray = root.value("tasks").toArray();
+    items.clear();
+    items.reserve(taskArray.size());
+    for (const QJsonValue& value : taskArray) {
+        QJsonObject obj = value.toObject();
+        items.append(TaskItem{obj.value("title").toString(), obj.value("done").toBool(), obj.value("id").toInt()});
+    }
+    if (journalSeq) {
+        *journalSeq = static_cast<quint64>(root.value("journalSeq").toDouble());
+    }
+    return true;
+}
+
+bool writeJsonSnapshot(const QString& path, const QVector<TaskItem>& items, quint64 journalSeq) {
+    return writeJson(path, items, journalSeq);
+}
+
+bool writeJsonSnapshot(const QString& path, const TaskStore& tasks, quint64 journalSeq) {
+    return writeJson(path, tasks, journalSeq);
+}
+
+bool readBinarySnapshot(const QString& path, QVector<TaskItem>& items, quint64* journalSeq) {
+    BinaryTaskReader reader;
+    if (!reader.open(path)) return false;
+
+    QVector<TaskItem> loaded;
+    loaded.reserve(reader.count());
+    if (reader.read(loaded, reader.count()) != reader.count()) return false;
+
+    items = loaded;
+    if (journalSeq) *journalSeq = reader.journalSeq();
+    return true;
+}
+
+bool writeBinarySnapshot(const QString& path, const QVector<TaskItem>& items, quint64 journalSeq) {
+    return writeBinary(path, items, journalSeq);
+}
+
+bool writeBinarySnapshot(const QString& path, const TaskStore& tasks, quint64 journalSeq) {
+    return writeBinary(path, tasks, journalSeq);
+}
+
+}
+
+
+BinaryTaskWriter::BinaryTaskWriter(const QString& path)
+    : m_file(path) {}
+
+bool BinaryTaskWriter::open(quint64 journalSeq) {
+    // The count is patched in by commit()
+    m_ok = m_file.open(QIODevice::WriteOnly)
+        && m_file.write(BinaryMagic, sizeof(BinaryMagic)) == sizeof(BinaryMagic)
+        && writeLittleEndian<quint32>(m_file, BinaryVersion)
+        && writeLittleEndian<quint64>(m_file, journalSeq)
+        && writeLittleEndian<quint32>(m_file, 0);
+    return m_ok;
+}
+
+void BinaryTaskWriter::reserve(int count) {
+    m_flags.reserve((count + 7) / 8);
+    m_ids.reserve(count);
+}
+
+bool BinaryTaskWriter::write(const TaskItem& task) {
+    if (!m_ok) return false;
+    if (m_count == quint32(std::numeric_limits<int>::max())) {
+        m_ok = false;
+        return false;
+    }
+
+    const QString& title = task.title;
+    m_ok = writeLittleEndian<quint32>(m_file, static_cast<quint32>(title.size()));
+#if Q_BYTE_ORDER == Q_LITTLE_ENDIAN
+    const qint64 bytes = qint64(title.size()) * 2;
+    m_ok = m_ok && m_file.write(reinterpret_cast<const char*>(title.utf16()), bytes) == bytes;
+#else
+    for (int c = 0; m_ok && c < title.size(); ++c) {
+        m_ok = writeLittleEndian<quint16>(m_file, title.at(c).unicode());
+    }
+#endif
+
+    if (m_count % 8 == 0) m_flags.append('\0');
+    if (task.done) m_flags.back() = static_cast<char>(m_flags.back() | (1 << (m_count % 8)));
+    m_ids.append(task.id);
+    ++m_count;
+    return m_ok;
+}
+
+bool BinaryTaskWriter::commit() {
+    bool ok = m_ok && m_file.write(m_flags) == m_flags.size();
+#if Q_BYTE_ORDER == Q_LITTLE_ENDIAN
+    const qint64 idBytes = qint64(m_ids.size()) * 4;
+    ok = ok && m_file.write(reinterpret_cast<const char*>(m_ids.constData()), idBytes) == idBytes;
+#else
+    for (int i = 0; ok && i < m_ids.size(); ++i) {
+        ok = writeLittleEndian<qint32>(m_file, m_ids.at(i));
+    }
+#endif
+    ok = ok && m_file.seek(BinaryCountOffset) && writeLittleEndian<quint32>(m_file, m_count);
+
+    m_ok = false;
+    if (!ok) {
+        m_file.cancelWriting();
+        return false;
+    }
+    return m_file.commit();
+}
+
+
+BinaryTaskReader::~BinaryTaskReader() {
+    close();
+}
+
+void BinaryTaskReader::close() {
+    if (m_data) m_file.unmap(const_cast<uchar*>(m_data));
+    m_file.close();
+    m_data = m_cursor = m_flags = m_ids = nullptr;
+    m_count = m_position = m_maxId = 0;
+}
+
+bool BinaryTaskReader::open(const QString& path) {
+    close();
+    m_file.setFileName(path);
+    if (!m_file.open(QIODevice::ReadOnly)) return false;
+
+    const qint64 size = m_file.size();
+    if (size < BinaryHeaderSize) return false;
+
+    m_data = m_file.map(0, size);
+    if (!m_data) return false;
+
+    const uchar* const end = m_data + size;
+    m_version = qFromLittleEndian<quint32>(m_data + 4);
+    if (memcmp(m_data, BinaryMagic, sizeof(BinaryMagic)) != 0 || m_version < 1 || m_version > BinaryVersion) {
+        close();
+        return false;
+    }
+    m_journalSeq = qFromLittleEndian<quint64>(m_data + 8);
+    const quint32 count = qFromLittleEndian<quint32>(m_data + 16);
+    if (count > quint32(std::numeric_limits<int>::max())) {
+        close();
+        return false;
+    }
+
+    // Hop over the length prefixes once so read() can trust every offset
+    const uchar* p = m_data + BinaryHeaderSize;
+    for (quint32 i = 0; i < count; ++i) {
+        if (end - p < 4) { close(); return false; }
+        const quint32 length = qFromLittleEndian<quint32>(p);
+        p += 4;
+        if (static_cast<quint64>(end - p) < quint64(length) * 2) { close(); return false; }
+        p += quint64(length) * 2;
+    }
+
+    const quint64 flagBytes = (quint64(count) + 7) / 8;
+    const quint64 idBytes = m_version >= 2 ? quint64(count) * 4 : 0;
+    if (static_cast<quint64>(end - p) < flagBytes + idBytes) {
+        close();
+        return false;
+    }
+
+    m_cursor = m_data + BinaryHeaderSize;
+    m_flags = p;
+    m_ids = m_version >= 2 ? p + flagBytes : nullptr;
+    m_maxId = 0;
+    for (quint32 i = 0; m_ids && i < count; ++i) {
+        m_maxId = std::max(m_maxId, qFromLittleEndian<qint32>(m_ids + qint64(i) * 4));
+    }
+    m_count = static_cast<int>(count);
+    m_position = 0;
+    return true;
+}
+
+quint32 BinaryTaskReader::version() const {
+    return m_version;
+}
+
+quint64 BinaryTaskReader::journalSeq() const {
+    return m_journalSeq;
+}
+
+int BinaryTaskReader::count() const {
+    return m_count;
+}
+
+int BinaryTaskReader::maxId() const {
+    return m_maxId;
+}
+
+int BinaryTaskReader::read(QVector<TaskItem>& out, int max) {
+    const int n = qMin(max, m_count - m_position);
+    for (int i = 0; i < n; ++i, ++m_position) {
+        const int length = static_cast<int>(qFromLittleEndian<quint32>(m_cursor));
+        m_cursor += 4;
+#if Q_BYTE_ORDER == Q_LITTLE_ENDIAN
+        // Offsets stay 2-byte aligned, so the UTF-16 data can be copied straight from the map
+        QString title(reinterpret_cast<const QChar*>(m_cursor), length);
+#else
+        QString title(length, Qt::Uninitialized);
+        for (int c = 0; c < length; ++c) {
+            title[c] = QChar(qFromLittleEndian<quint16>(m_cursor + c * 2));
+        }
+#endif
+        m_cursor += length * 2;
+
+        const bool done = (m_flags[m_position / 8] >> (m_position % 8)) & 1;
+        const int id = m_ids ? qFromLittleEndian<qint32>(m_ids + qint64(m_position) * 4) : 0;
+        out.append(TaskItem(title, done, id));
+    }
+    return n;
+}
@@ -0,0 +1,98 @@
+#pragma once
+
+#include <QByteArray>
+#include <QFile>
+#include <QSaveFile>
+#include <QString>
+#include <QVector>
+#include "../models/taskmodel.h"
+
+// Reading and writing of the full task snapshot. Two formats are supported:
+// indented JSON (tasks_<user>.json) and a compact binary layout
+// (tasks_<user>.bin) that is loaded through a memory map:
+//
+//   magic "QTTB" | uint32 version | uint64 journalSeq | uint32 count
+//   count x (uint32 length | length x UTF-16 code units)
+//   ceil(count / 8) bytes of packed done flags
+//   count x int32 task id (version 2)
+//
+// All integers and code units are little endian.
+namespace TaskStorage {
+
+// tasks_<user>.json in dataDir, with characters other than [a-zA-Z0-9_-]
+// in the username replaced by '_'
+QString userStoragePath(const QString& dataDir, const QString& username);
+QString binaryPathFor(const QString& jsonPath);
+bool isBinaryPath(const QString& path);
+// The same snapshot in the other format: tasks_<user>.bin <-> tasks_<user>.json
+QString otherFormatPath(const QString& snapshotPath);
+// Whichever of the JSON and binary snapshot was written last; ties go to the
+// preferred format
+QString newestSnapshotPath(const QString& jsonPath, bool preferBinary);
+// {size, mtime in ms}, with size -1 for a missing file
+QVector<qint64> fileStamp(const QString& path);
+
+// Dispatch on the file extension
+bool readSnapshot(const QString& path, QVector<TaskItem>& items, quint64* journalSeq = nullptr);
+bool writeSnapshot(const QString& path, const QVector<TaskItem>& items, quint64 journalSeq = 0);
+bool writeSnapshot(const QString& path, const TaskStore& tasks, quint64 journalSeq = 0);
+
+bool readJsonSnapshot(const QString& path, QVector<TaskItem>& items, quint64* journalSeq = nullptr);
+bool writeJsonSnapshot(const QString& path, const QVector<TaskItem>& items, quint64 journalSeq = 0);
+bool writeJsonSnapshot(const QString& path, const TaskStore& tasks, quint64 journalSeq = 0);
+bool readBinarySnapshot(const QString& path, QVector<TaskItem>& items, quint64* journalSeq = nullptr);
+bool writeBinarySnapshot(const QString& path, const QVector<TaskItem>& items, quint64 journalSeq = 0);
+bool writeBinarySnapshot(const QString& path, const TaskStore& tasks, quint64 journalSeq = 0);
+
+}
+
+// Writes a binary snapshot one task at a time. Titles go straight to the
+// file; only the done flags and ids are held until commit(), which appends
+// them and patches the task count into the header.
+class BinaryTaskWriter {
+public:
+    explicit BinaryTaskWriter(const QString& path);
+
+    bool open(quint64 journalSeq = 0);
+    void reserve(int count);
+    bool write(const TaskItem& task);
+    bool commit();
+
+private:
+    QSaveFile m_file;
+    QByteArray m_flags;
+    QVector<qint32> m_ids;
+    quint32 m_count = 0;
+    bool m_ok = false;
+};
+
+// Incremental reader over a memory-mapped binary snapshot. open() validates
+// the string table and locates the flag and id arrays; read() then decodes
+// tasks batch by batch straight from the map.
+class BinaryTaskReader : public TaskSource {
+public:
+    BinaryTaskReader() = default;
+    ~BinaryTaskReader() override;
+
+    bool open(const QString& path);
+    quint32 version() const;
+    quint64 journalSeq() const;
+
+    int count() const override;
+    int read(QVector<TaskItem>& out, int max) override;
+    int maxId() const override;
+
+private:
+    void close();
+
+    QFile m_file;
+    const uchar* m_data = nullptr;
+    const uchar* m_cursor = nullptr;
+    const uchar* m_flags = nullptr;
+    const uchar* m_ids = nullptr;
+    quint32 m_version = 0;
+    quint64 m_journalSeq = 0;
+    int m_count = 0;
+    int m_position = 0;
+    int m_maxId = 0;
+};
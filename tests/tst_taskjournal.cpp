@@ -0,0 +1,228 @@
+// Replaying the journal on top of a snapshot must give the same tasks as a
+// full snapshot of the final state, and export must apply a pending journal
+// the same way without touching the user's files.
+
+#include <QBuffer>
+#include <QFile>
+#include <QJsonDocument>
+#include <QJsonObject>
+#include <QTemporaryDir>
+#include <QtTest>
+#include "../src/models/taskmodel.h"
+#include "../src/services/taskexchange.h"
+#include "../src/services/taskjournal.h"
+#include "../src/services/taskstorage.h"
+
+namespace {
+
+QStringList describe(const QVector<TaskItem>& items) {
+    QStringList rows;
+    for (const TaskItem& task : items) {
+        rows.append(QString("%1:%2:%3").arg(task.id).arg(task.title).arg(int(task.done)));
+    }
+    return rows;
+}
+
+QVector<TaskItem> initialTasks() {
+    QVector<TaskItem> items;
+    for (int i = 0; i < 10; ++i) {
+        items.append(TaskItem(QString("task %1").arg(i), i % 3 == 0, i + 1));
+    }
+    return items;
+}
+
+// One of each kind of record, touching the start, the middle and the end
+QVector<TaskJournalRecord> journalRecords() {
+    auto record = [](quint64 seq, TaskJournalRecord::Op op, int row, int count, const QVector<TaskItem>& tasks) {
+        TaskJournalRecord r;
+        r.seq = seq;
+        r.op = op;
+        r.row = row;
+        r.count = op == TaskJournalRecord::Remove ? count : tasks.size();
+        r.tasks = tasks;
+        return r;
+    };
+    return {
+        record(1, TaskJournalRecord::Insert, 2, 0, {TaskItem("new 1", false, 11), TaskItem("new 2", true, 12)}),
+        record(2, TaskJournalRecord::Remove, 0, 1, {}),
+        record(3, TaskJournalRecord::Update, 1, 0, {TaskItem("new 1 renamed", true, 11)}),
+        record(4, TaskJournalRecord::Insert, 11, 0, {TaskItem("new 3", false, 13)}),
+        record(5, TaskJournalRecord::Remove, 3, 2, {}),
+        record(6, TaskJournalRecord::Update, 0, 0, {TaskItem("task 1 renamed", true, 2), TaskItem("first", false, 11)}),
+    };
+}
+
+QByteArray encode(const TaskJournalRecord& record) {
+    switch (record.op) {
+    case TaskJournalRecord::Insert:
+        return TaskJournal::insertRecord(record.seq, record.row, record.tasks);
+    case TaskJournalRecord::Remove:
+        return TaskJournal::removeRecord(record.seq, record.row, record.count);
+    case TaskJournalRecord::Update:
+        return TaskJournal::updateRecord(record.seq, record.row, record.tasks);
+    }
+    return QByteArray();
+}
+
+// The tasks after the first count records, applied directly
+QVector<TaskItem> stateAfter(int count) {
+    QVector<TaskItem> items = initialTasks();
+    const QVector<TaskJournalRecord> records = journalRecords();
+    for (int i = 0; i < count; ++i) {
+        const TaskJournalRecord& record = records.at(i);
+        if (record.op == TaskJournalRecord::Insert) {
+            for (int k = 0; k < record.tasks.size(); ++k) items.insert(record.row + k, record.tasks.at(k));
+        } else if (record.op == TaskJournalRecord::Remove) {
+            items.remove(record.row, record.count);
+        } else {
+            for (int k = 0; k < record.tasks.size(); ++k) items[record.row + k] = record.tasks.at(k);
+        }
+    }
+    return items;
+}
+
+bool writeJournal(const QString& path, const QVector<TaskJournalRecord>& records) {
+    QByteArray bytes;
+    for (const TaskJournalRecord& record : records) bytes += encode(record);
+    return TaskJournal(path).append(bytes);
+}
+
+QByteArray readAll(const QString& path) {
+    QFile file(path);
+    return file.open(QIODevice::ReadOnly) ? file.readAll() : QByteArray();
+}
+
+}
+
+class TaskJournalTest : public QObject {
+    Q_OBJECT
+
+private slots:
+    void replayMatchesFullSnapshot_data();
+    void replayMatchesFullSnapshot();
+    void replaySkipsRecordsInSnapshot();
+    void replayStopsAtGap();
+    void replayStopsAtTornLine();
+    void exportAppliesJournal_data();
+    void exportAppliesJournal();
+};
+
+void TaskJournalTest::replayMatchesFullSnapshot_data() {
+    QTest::addColumn<bool>("binary");
+    QTest::newRow("json") << false;
+    QTest::newRow("binary") << true;
+}
+
+void TaskJournalTest::replayMatchesFullSnapshot() {
+    QFETCH(bool, binary);
+    QTemporaryDir dir;
+    QVERIFY(dir.isValid());
+    const QString jsonPath = dir.filePath("tasks_test.json");
+    const QString snapshotPath = binary ? TaskStorage::binaryPathFor(jsonPath) : jsonPath;
+    const QString fullPath = dir.filePath(binary ? "full.bin" : "full.json");
+
+    QVERIFY(TaskStorage::writeSnapshot(snapshotPath, initialTasks(), 0));
+    QVERIFY(writeJournal(TaskJournal::pathForSnapshot(jsonPath), journalRecords()));
+    QVERIFY(TaskStorage::writeSnapshot(fullPath, stateAfter(journalRecords().size()), 0));
+
+    QVector<TaskItem> replayed;
+    quint64 snapshotSeq = 0;
+    QVERIFY(TaskStorage::readSnapshot(snapshotPath, replayed, &snapshotSeq));
+    const quint64 lastSeq = TaskJournal::replay(TaskJournal::pathForSnapshot(jsonPath), snapshotSeq, replayed);
+
+    QVector<TaskItem> full;
+    QVERIFY(TaskStorage::readSnapshot(fullPath, full));
+    QCOMPARE(lastSeq, quint64(journalRecords().size()));
+    QCOMPARE(describe(replayed), describe(full));
+}
+
+void TaskJournalTest::replaySkipsRecordsInSnapshot() {
+    QTemporaryDir dir;
+    QVERIFY(dir.isValid());
+    const QString journalPath = dir.filePath("tasks_test.journal");
+    QVERIFY(writeJournal(journalPath, journalRecords()));
+
+    // A snapshot taken after record 3 that the journal was not truncated to
+    QVector<TaskItem> items = stateAfter(3);
+    const quint64 lastSeq = TaskJournal::replay(journalPath, 3, items);
+
+    QCOMPARE(lastSeq, quint64(journalRecords().size()));
+    QCOMPARE(describe(items), describe(stateAfter(journalRecords().size())));
+}
+
+void TaskJournalTest::replayStopsAtGap() {
+    QTemporaryDir dir;
+    QVERIFY(dir.isValid());
+    const QString journalPath = dir.filePath("tasks_test.journal");
+    QVector<TaskJournalRecord> records = journalRecords();
+    records.remove(2);
+    QVERIFY(writeJournal(journalPath, records));
+
+    QVector<TaskItem> items = initialTasks();
+    const quint64 lastSeq = TaskJournal::replay(journalPath, 0, items);
+
+    QCOMPARE(lastSeq, quint64(2));
+    QCOMPARE(describe(items), describe(stateAfter(2)));
+}
+
+void TaskJournalTest::replayStopsAtTornLine() {
+    QTemporaryDir dir;
+    QVERIFY(dir.isValid());
+    const QString journalPath = dir.filePath("tasks_test.journal");
+    const QVector<TaskJournalRecord> records = journalRecords();
+    QVERIFY(writeJournal(journalPath, records.mid(0, 4)));
+    const QByteArray next = encode(records.at(4));
+    QVERIFY(TaskJournal(journalPath).append(next.left(next.size() / 2)));
+
+    QVector<TaskItem> items = initialTasks();
+    const quint64 lastSeq = TaskJournal::replay(journalPath, 0, items);
+
+    QCOMPARE(lastSeq, quint64(4));
+    QCOMPARE(describe(items), describe(stateAfter(4)));
+}
+
+void TaskJournalTest::exportAppliesJournal_data() {
+    QTest::addColumn<bool>("binary");
+    QTest::newRow("json") << false;
+    QTest::newRow("binary") << true;
+}
+
+void TaskJournalTest::exportAppliesJournal() {
+    QFETCH(bool, binary);
+    QTemporaryDir dir;
+    QVERIFY(dir.isValid());
+    const QString jsonPath = dir.filePath("tasks_test.json");
+    const QString snapshotPath = binary ? TaskStorage::binaryPathFor(jsonPath) : jsonPath;
+    const QString journalPath = TaskJournal::pathForSnapshot(jsonPath);
+
+    // Records 1 and 2 are already part of the snapshot
+    QVERIFY(TaskStorage::writeSnapshot(snapshotPath, stateAfter(2), 2));
+    QVERIFY(writeJournal(journalPath, journalRecords()));
+    const QByteArray snapshotBytes = readAll(snapshotPath);
+    const QByteArray journalBytes = readAll(journalPath);
+
+    QBuffer output;
+    output.open(QIODevice::WriteOnly);
+    qint64 count = 0;
+    QString error;
+    QVERIFY2(TaskExchange::exportTasks(jsonPath, &output, TaskExchange::Format::Ndjson, &count, &error),
+             qPrintable(error));
+
+    QVector<TaskItem> exported;
+    for (const QByteArray& line : output.data().split('\n')) {
+        if (line.isEmpty()) continue;
+        const QJsonObject obj = QJsonDocument::fromJson(line).object();
+        exported.append(TaskItem(obj.value("title").toString(), obj.value("done").toBool(), obj.value("id").toInt()));
+    }
+    const QVector<TaskItem> expected = stateAfter(journalRecords().size());
+    QCOMPARE(count, qint64(expected.size()));
+    QCOMPARE(describe(exported), describe(expected));
+
+    // Export only reads
+    QCOMPARE(readAll(snapshotPath), snapshotBytes);
+    QCOMPARE(readAll(journalPath), journalBytes);
+    QVERIFY(!QFile::exists(TaskStorage::otherFormatPath(snapshotPath)));
+}
+
+QTEST_GUILESS_MAIN(TaskJournalTest)
+#include "tst_taskjournal.moc"
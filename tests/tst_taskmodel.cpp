@@ -0,0 +1,153 @@
+// TaskModel::applyItems(): the model must end up with the target rows, in
+// order and with the expected ids, whether it diffs or falls back to a reset.
+
+#include <QAbstractItemModelTester>
+#include <QRandomGenerator>
+#include <QSignalSpy>
+#include <QtTest>
+#include "../src/models/taskmodel.h"
+#include <algorithm>
+#include <random>
+
+namespace {
+
+QStringList describe(const QVector<TaskItem>& items) {
+    QStringList rows;
+    for (const TaskItem& task : items) {
+        rows.append(QString("%1:%2:%3").arg(task.id).arg(task.title).arg(int(task.done)));
+    }
+    return rows;
+}
+
+QStringList describe(const TaskModel& model) {
+    return describe(model.tasks().toVector());
+}
+
+QVector<TaskItem> tasks(const QStringList& titles, int firstId = 1) {
+    QVector<TaskItem> items;
+    for (int i = 0; i < titles.size(); ++i) {
+        items.append(TaskItem(titles.at(i), false, firstId + i));
+    }
+    return items;
+}
+
+}
+
+class TaskModelTest : public QObject {
+    Q_OBJECT
+
+private slots:
+    void reordersRemovesAndInserts();
+    void updatesChangedRows();
+    void matchesIdlessRowsByTitle();
+    void matchesDuplicateTitlesTopFirst();
+    void numbersUnmatchedRowsAfterLargestId();
+    void resetsOnDuplicateIds();
+    void reachesRandomTargets();
+};
+
+void TaskModelTest::reordersRemovesAndInserts() {
+    TaskModel model;
+    QAbstractItemModelTester tester(&model, QAbstractItemModelTester::FailureReportingMode::QtTest);
+    model.setItems(tasks({"a", "b", "c", "d"}));
+
+    QSignalSpy resets(&model, &QAbstractItemModel::modelReset);
+    const QVector<TaskItem> target = {TaskItem("d", false, 4), TaskItem("b", false, 2),
+                                      TaskItem("e", false, 7), TaskItem("a", false, 1)};
+    model.applyItems(target);
+
+    QCOMPARE(describe(model), describe(target));
+    QCOMPARE(resets.count(), 0);
+}
+
+void TaskModelTest::updatesChangedRows() {
+    TaskModel model;
+    QAbstractItemModelTester tester(&model, QAbstractItemModelTester::FailureReportingMode::QtTest);
+    model.setItems(tasks({"a", "b", "c"}));
+
+    QSignalSpy changes(&model, &QAbstractItemModel::dataChanged);
+    const QVector<TaskItem> target = {TaskItem("a", false, 1), TaskItem("b renamed", true, 2),
+                                      TaskItem("c", false, 3)};
+    model.applyItems(target);
+
+    QCOMPARE(describe(model), describe(target));
+    QVERIFY(!changes.isEmpty());
+    QCOMPARE(model.completedCount(), 1);
+}
+
+void TaskModelTest::matchesIdlessRowsByTitle() {
+    TaskModel model;
+    model.setItems(tasks({"a", "b"}));
+
+    model.applyItems({TaskItem("b"), TaskItem("a"), TaskItem("x")});
+
+    QCOMPARE(describe(model), QStringList({"2:b:0", "1:a:0", "3:x:0"}));
+}
+
+void TaskModelTest::matchesDuplicateTitlesTopFirst() {
+    TaskModel model;
+    model.setItems(tasks({"same", "other", "same"}));
+
+    // The first id-less "same" takes the topmost unclaimed one, id 1
+    model.applyItems({TaskItem("same"), TaskItem("same"), TaskItem("other", false, 2)});
+
+    QCOMPARE(describe(model), QStringList({"1:same:0", "3:same:0", "2:other:0"}));
+}
+
+void TaskModelTest::numbersUnmatchedRowsAfterLargestId() {
+    TaskModel model;
+    model.setItems(tasks({"a"}));
+
+    // Claimed by id 1, so the id-less "a" is a new task
+    model.applyItems({TaskItem("a", false, 1), TaskItem("b", false, 10), TaskItem("a")});
+
+    QCOMPARE(describe(model), QStringList({"1:a:0", "10:b:0", "11:a:0"}));
+}
+
+void TaskModelTest::resetsOnDuplicateIds() {
+    TaskModel model;
+    model.setItems(tasks({"a", "b"}));
+
+    QSignalSpy resets(&model, &QAbstractItemModel::modelReset);
+    const QVector<TaskItem> target = {TaskItem("a", false, 1), TaskItem("b", false, 1)};
+    model.applyItems(target);
+
+    QCOMPARE(resets.count(), 1);
+    QCOMPARE(model.rowCount(), 2);
+    QCOMPARE(model.tasks().title(1), QString("b"));
+}
+
+void TaskModelTest::reachesRandomTargets() {
+    QRandomGenerator random(7);
+    for (int round = 0; round < 200; ++round) {
+        TaskModel model;
+        QAbstractItemModelTester tester(&model, QAbstractItemModelTester::FailureReportingMode::QtTest);
+        const int count = random.bounded(40);
+        QVector<TaskItem> items;
+        for (int i = 0; i < count; ++i) {
+            items.append(TaskItem(QString("task %1").arg(i), random.bounded(2) == 1, i + 1));
+        }
+        model.setItems(items);
+
+        // Drop some rows, shuffle, edit and add a few
+        QVector<TaskItem> target;
+        for (const TaskItem& task : qAsConst(items)) {
+            if (random.bounded(4) != 0) target.append(task);
+        }
+        std::shuffle(target.begin(), target.end(), std::mt19937(random.generate()));
+        for (TaskItem& task : target) {
+            if (random.bounded(5) == 0) task.done = !task.done;
+            if (random.bounded(7) == 0) task.title += " edited";
+        }
+        const int added = random.bounded(5);
+        for (int i = 0; i < added; ++i) {
+            target.insert(random.bounded(target.size() + 1), TaskItem(QString("new %1").arg(i), false, count + 1 + i));
+        }
+
+        model.applyItems(target);
+        QCOMPARE(describe(model), describe(target));
+    }
+}
+
+QTEST_GUILESS_MAIN(TaskModelTest)
+#include "tst_taskmodel.moc"